@@ -1,62 +1,90 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, Tuple, Callable
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import re
-import time
+from concurrent.futures import ThreadPoolExecutor
+from src.canonical import URLCanonicalizer, default_canonicalizer
+from src.discovery import SitemapDiscovery
+from src.fetch import get_client
+from src.pagination import find_last_page, infer_templates, page_template, page_url
+from src.parsing import parse_html, response_encoding, PARSE_FULL, PARSE_LINKS
+from src.url_pattern import URLPattern, is_excluded
 
 
 class HTMLAnalyzer:
-    def __init__(self, base_url: str):
-        """Initialize with base URL and create requests session."""
+    def __init__(self, base_url: str, url_pattern: Optional[URLPattern] = None,
+                 canonicalizer: Optional[URLCanonicalizer] = None):
+        """Initialize with base URL and the shared keep-alive HTTP client.
+        
+        Args:
+            base_url: Site homepage
+            url_pattern: Article URL templates learned for the site; replaces the
+                generic URL heuristics of is_article_url when given
+            canonicalizer: The site's URL canonicalization rules; every discovered
+                and fetched URL is canonicalized, so variants are fetched once
+        """
         self.base_url = base_url.rstrip('/')  # Remove trailing slash
+        self.url_pattern = url_pattern or None
+        self.canonicalizer = canonicalizer or default_canonicalizer
         self.domain = urlparse(base_url).netloc
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (compatible; ScraperBot/1.0)'
-        })
-        
-    def fetch_page(self, url: str) -> Optional[BeautifulSoup]:
-        """Fetch and parse HTML page."""
+        self.client = get_client()
+        self.session = self.client.session
+        self.page_cache: Dict[str, bytes] = {}  # URL -> raw HTML of every page fetched in this run
+        self.page_encodings: Dict[str, str] = {}  # URL -> encoding resolved when it was fetched
+        self.final_urls: Dict[str, str] = {}  # URL -> canonical URL it was served from after redirects
+        
+    def fetch_page(self, url: str, parse_mode: str = PARSE_FULL,
+                   quiet: bool = False) -> Optional[BeautifulSoup]:
+        """Fetch and parse HTML page, reusing the page cache.
+        
+        Args:
+            url: Page URL (relative URLs are resolved against the base URL)
+            parse_mode: PARSE_FULL, or PARSE_LINKS to build only <a href> elements
+            quiet: Do not report failures (probing pages that may not exist)
+        """
         try:
             # Convert relative URLs to absolute
             if not url.startswith('http'):
                 url = urljoin(self.base_url, url)
+            url = self.canonicalizer.canonicalize(url)
             
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
+            html = self.page_cache.get(url)
+            if html is None:
+                response = self.client.get(url, timeout=10)
+                response.raise_for_status()
+                # Keep the raw bytes: lxml decodes them once with the sniffed encoding
+                html = self.page_cache[url] = response.content
+                self.page_encodings[url] = response_encoding(response)
+                self.final_urls[url] = self.canonicalizer.canonicalize(str(response.url))
             
             # Parse HTML with lxml parser
-            soup = BeautifulSoup(response.text, 'lxml')
+            soup = parse_html(html, parse_mode, from_encoding=self.page_encodings.get(url))
             return soup
             
         except (requests.exceptions.RequestException, Exception) as e:
-            print(f"Error fetching {url}: {e}")
+            if not quiet:
+                print(f"Error fetching {url}: {e}")
             return None
+    
+    def fetch_pages(self, urls: List[str], parse_mode: str = PARSE_FULL,
+                    quiet: bool = False) -> Dict[str, BeautifulSoup]:
+        """Fetch and parse pages in parallel; returns the ones that succeeded, in input order."""
+        workers = max(1, min(len(urls), self.client.max_workers(self.base_url)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            soups = list(executor.map(lambda url: self.fetch_page(url, parse_mode, quiet), urls))
+        return {url: soup for url, soup in zip(urls, soups) if soup is not None}
         
     def is_article_url(self, url: str) -> bool:
         """Check if URL looks like an article."""
+        if self.url_pattern is not None:
+            return self.url_pattern.matches(url)
+        
         url_lower = url.lower()
         
         # Check exclude patterns first
-        exclude_patterns = [
-            r'/about',
-            r'/contact',
-            r'/privacy',
-            r'/terms',
-            r'/category',
-            r'/categories',
-            r'/tag',
-            r'/tags',
-            r'/author',
-            r'/authors',
-            r'/page/\d+',  # pagination
-            r'/(blog|articles|posts|reviews|stories)/?$',  # index pages
-        ]
-        
-        for pattern in exclude_patterns:
-            if re.search(pattern, url_lower):
-                return False
+        if is_excluded(url_lower):
+            return False
         
         # Check include patterns
         include_patterns = [
@@ -88,7 +116,7 @@ class HTMLAnalyzer:
                 continue
                 
             # Convert to absolute URL
-            absolute_url = urljoin(self.base_url, href)
+            absolute_url = self.canonicalizer.canonicalize(urljoin(self.base_url, href))
             
             # Check if it's from the same domain
             parsed_url = urlparse(absolute_url)
@@ -114,16 +142,15 @@ class HTMLAnalyzer:
                 continue
                 
             # Convert to absolute URL
-            absolute_url = urljoin(self.base_url, href)
+            absolute_url = self.canonicalizer.canonicalize(urljoin(self.base_url, href))
             
             # Check if it's from the same domain
             parsed_url = urlparse(absolute_url)
             if parsed_url.netloc != self.domain:
                 continue
                 
-            # Check if it's a pagination URL
-            url_lower = absolute_url.lower()
-            if re.search(r'/page/\d+', url_lower):
+            # Check if it's a pagination URL (/page/N/ or ?page=N)
+            if page_template(absolute_url):
                 pagination_urls.add(absolute_url)
         
         return list(pagination_urls)
@@ -141,7 +168,7 @@ class HTMLAnalyzer:
                 continue
                 
             # Convert to absolute URL
-            absolute_url = urljoin(self.base_url, href)
+            absolute_url = self.canonicalizer.canonicalize(urljoin(self.base_url, href))
             
             # Check if it's from the same domain
             parsed_url = urlparse(absolute_url)
@@ -166,10 +193,140 @@ class HTMLAnalyzer:
         
         return list(content_sections)
     
-    def analyze_homepage(self) -> Dict[str, Any]:
-        """Analyze homepage structure."""
+    def crawl_pagination(self, pagination_links: Set[str], crawled_pages: Set[str], max_pages: int,
+                         known_urls: Optional[Callable[[List[str]], Set[str]]] = None,
+                         stop_after_known_pages: int = 0) -> Tuple[Set[str], int]:
+        """Fetch every numbered page of the listings behind some pagination links.
+        
+        The page template (/page/{n}/ or ?page={n}) and highest page number are
+        inferred from the links; the last page is found by probing past it
+        (O(log N) requests, see pagination.find_last_page) and the pages in
+        between are fetched in parallel rather than one link hop at a time.
+        
+        With known_urls and stop_after_known_pages, listings are walked in
+        order instead and stop early (see _crawl_until_known).
+        
+        Returns:
+            (article links found, number of pages crawled)
+        """
+        article_links = set()
+        pages_crawled = 0
+        
+        for template, known_last in infer_templates(sorted(pagination_links)).items():
+            budget = max_pages - pages_crawled
+            if budget <= 0:
+                break
+            
+            if known_urls is not None and stop_after_known_pages > 0:
+                links, pages = self._crawl_until_known(template, known_last, crawled_pages, budget,
+                                                       known_urls, stop_after_known_pages)
+                article_links.update(links)
+                pages_crawled += pages
+                continue
+            
+            page_links: Dict[int, Optional[frozenset]] = {}
+            
+            def links_of(number: int) -> Optional[frozenset]:
+                """Article links of a page; None if it fails, redirects elsewhere or has none."""
+                if number not in page_links:
+                    url = self.canonicalizer.canonicalize(page_url(template, number))
+                    soup = self.fetch_page(url, PARSE_LINKS, quiet=True)
+                    links = frozenset(self.find_article_links(soup)) if soup is not None else None
+                    # Out-of-range pages often redirect to page 1 or the last page
+                    if self.final_urls.get(url, url) != url:
+                        links = None
+                    page_links[number] = links or None
+                return page_links[number]
+            
+            def page_exists(number: int) -> bool:
+                # Sites that serve page 1 or the last page for any higher number
+                # repeat the links of an earlier page
+                links = links_of(number)
+                return links is not None and all(
+                    links != links_of(earlier) for earlier in {1, number - 1} if 0 < earlier < number)
+            
+            # Page 1 is the listing itself
+            last_page = find_last_page(page_exists, known_last, budget + 1)
+            urls = [page_url(template, number) for number in range(2, last_page + 1)]
+            urls = [url for url in urls if url not in crawled_pages][:budget]
+            print(f"Crawling {len(urls)} pagination pages of {template} (last page {last_page})")
+            
+            # Pages fetched while probing come from the page cache
+            for url, soup in self.fetch_pages(urls, PARSE_LINKS).items():
+                crawled_pages.add(url)
+                pages_crawled += 1
+                article_links.update(self.find_article_links(soup))
+        
+        return article_links, pages_crawled
+    
+    def _crawl_until_known(self, template: str, known_last: int, crawled_pages: Set[str], budget: int,
+                           known_urls: Callable[[List[str]], Set[str]],
+                           stop_after_known_pages: int) -> Tuple[Set[str], int]:
+        """Walk a newest-first listing until enough consecutive pages hold only known articles.
+        
+        Pages are fetched in parallel batches, starting with the linked ones
+        and doubling up to the host's worker count; each batch's article URLs
+        are checked against the database in one lookup. The walk ends at the
+        first missing or empty page, or after stop_after_known_pages pages in
+        a row whose articles are all known already.
+        """
+        article_links = set()
+        pages_crawled = 0
+        known_run = 0
+        max_batch = max(1, self.client.max_workers(self.base_url))
+        batch_size = min(max(1, known_last - 1), max_batch)
+        number = 2  # Page 1 is the listing itself
+        
+        while pages_crawled < budget:
+            numbers = range(number, number + min(batch_size, budget - pages_crawled))
+            urls = [page_url(template, n) for n in numbers]
+            # Pages past the linked ones may not exist
+            soups = self.fetch_pages([url for url in urls if url not in crawled_pages], PARSE_LINKS,
+                                     quiet=numbers[-1] > known_last)
+            page_links = {url: self.find_article_links(soups[url]) for url in soups}
+            known = known_urls([link for links in page_links.values() for link in links])
+            
+            for url in urls:
+                if url in crawled_pages:
+                    continue
+                if not page_links.get(url):
+                    return article_links, pages_crawled  # Past the last page
+                crawled_pages.add(url)
+                pages_crawled += 1
+                article_links.update(page_links[url])
+                known_run = known_run + 1 if known.issuperset(page_links[url]) else 0
+                if known_run >= stop_after_known_pages:
+                    print(f"⏹️  Stopping {template} after {known_run} pages of known articles")
+                    return article_links, pages_crawled
+            number += len(numbers)
+            batch_size = min(batch_size * 2, max_batch)
+        
+        return article_links, pages_crawled
+    
+    def analyze_homepage(self, max_pages: int = 15, use_sitemaps: bool = True,
+                         known_urls: Optional[Callable[[List[str]], Set[str]]] = None,
+                         stop_after_known_pages: int = 0) -> Dict[str, Any]:
+        """Analyze homepage structure.
+        
+        Args:
+            max_pages: Maximum number of listing pages to crawl
+            use_sitemaps: Try robots.txt sitemaps before crawling listing pages
+            known_urls: Batch lookup returning which of some article URLs are
+                already stored (e.g. Database.filter_known_urls)
+            stop_after_known_pages: Stop paginating a listing after this many
+                consecutive pages of known articles (0 crawls everything)
+        """
         print(f"Analyzing homepage: {self.base_url}")
         
+        # Sitemaps list every article in a few requests; crawl HTML only without them
+        if use_sitemaps:
+            sitemap_result = self.discover_from_sitemaps()
+            if sitemap_result:
+                return sitemap_result
+        
+        # Homepage and its sections get two thirds of the page budget, pagination the rest
+        section_page_limit = max_pages * 2 // 3
+        
         all_article_links = set()
         pages_crawled = 0
         
@@ -177,15 +334,18 @@ class HTMLAnalyzer:
         pages_to_crawl = [self.base_url]
         crawled_pages = set()
         content_sections_to_check = set()
+        pagination_to_check = set()
         
-        while pages_to_crawl and pages_crawled < 10:  # Limit to prevent infinite loops
+        while pages_to_crawl and pages_crawled < section_page_limit:  # Limit to prevent infinite loops
             current_url = pages_to_crawl.pop(0)
             
             if current_url in crawled_pages:
                 continue
                 
             print(f"Crawling page: {current_url}")
-            soup = self.fetch_page(current_url)
+            # Listing pages only need their links; the homepage is also sampled for the LLM
+            parse_mode = PARSE_FULL if current_url == self.base_url else PARSE_LINKS
+            soup = self.fetch_page(current_url, parse_mode)
             if not soup:
                 continue
                 
@@ -197,10 +357,7 @@ class HTMLAnalyzer:
             all_article_links.update(article_links)
             
             # Find pagination links (only from listing pages)
-            pagination_links = self.find_pagination_links(soup)
-            for page_url in pagination_links:
-                if page_url not in crawled_pages:
-                    pages_to_crawl.append(page_url)
+            pagination_to_check.update(self.find_pagination_links(soup))
             
             # Find content section links (only from homepage)
             if current_url == self.base_url:
@@ -211,9 +368,9 @@ class HTMLAnalyzer:
         
         # Now check content sections we discovered
         for section_url in content_sections_to_check:
-            if section_url not in crawled_pages and pages_crawled < 10:
+            if section_url not in crawled_pages and pages_crawled < section_page_limit:
                 print(f"Checking content section: {section_url}")
-                soup = self.fetch_page(section_url)
+                soup = self.fetch_page(section_url, PARSE_LINKS)
                 if soup:
                     crawled_pages.add(section_url)
                     pages_crawled += 1
@@ -223,29 +380,15 @@ class HTMLAnalyzer:
                     all_article_links.update(article_links)
                     
                     # Find pagination in this section
-                    pagination_links = self.find_pagination_links(soup)
-                    for page_url in pagination_links:
-                        if page_url not in crawled_pages:
-                            pages_to_crawl.append(page_url)
+                    pagination_to_check.update(self.find_pagination_links(soup))
         
-        # Continue with any remaining pagination pages
-        while pages_to_crawl and pages_crawled < 15:  # Increased limit
-            current_url = pages_to_crawl.pop(0)
-            
-            if current_url in crawled_pages:
-                continue
-                
-            print(f"Crawling pagination page: {current_url}")
-            soup = self.fetch_page(current_url)
-            if not soup:
-                continue
-                
-            crawled_pages.add(current_url)
-            pages_crawled += 1
-            
-            # Find article links on this page
-            article_links = self.find_article_links(soup)
-            all_article_links.update(article_links)
+        # Enumerate the numbered pages of every listing with the remaining budget
+        article_links, pagination_pages = self.crawl_pagination(
+            pagination_to_check, crawled_pages, max_pages - pages_crawled,
+            known_urls, stop_after_known_pages
+        )
+        all_article_links.update(article_links)
+        pages_crawled += pagination_pages
         
         article_links_list = list(all_article_links)
         print(f"Found {len(article_links_list)} total article links across {pages_crawled} pages")
@@ -259,7 +402,30 @@ class HTMLAnalyzer:
             'article_links': article_links_list,
             'sample_article_urls': sample_articles,
             'homepage_html': homepage_html if 'homepage_html' in locals() else '',
-            'pages_crawled': pages_crawled
+            'pages_crawled': pages_crawled,
+            'discovery_method': 'crawl'
+        }
+    
+    def discover_from_sitemaps(self) -> Optional[Dict[str, Any]]:
+        """Build homepage analysis from robots.txt sitemaps, or None if the site has none."""
+        discovery = SitemapDiscovery(self.base_url, self.client, self.is_article_url,
+                                     canonicalize=self.canonicalizer.canonicalize).discover()
+        if not discovery['complete'] or not discovery['article_urls']:
+            return None
+        
+        article_links_list = discovery['article_urls']
+        print(f"Found {len(article_links_list)} article links in {len(discovery['sources'])} sitemaps")
+        
+        soup = self.fetch_page(self.base_url)
+        
+        return {
+            'homepage_url': self.base_url,
+            'total_article_links': len(article_links_list),
+            'article_links': article_links_list,
+            'sample_article_urls': article_links_list[:5],
+            'homepage_html': str(soup)[:5000] if soup else '',
+            'pages_crawled': 1 if soup else 0,
+            'discovery_method': 'sitemap'
         }
         
     def analyze_article_page(self, url: str) -> Dict[str, Any]:
@@ -339,7 +505,6 @@ class HTMLAnalyzer:
             print(f"Analyzing article {i}/{len(sample_urls)}: {article_url}")
             article_analysis = self.analyze_article_page(article_url)
             sample_articles.append(article_analysis)
-            time.sleep(0.5)  # Be respectful with requests
         
         print(f"Site analysis complete!")
         
@@ -0,0 +1,220 @@
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlparse
+import gzip
+import mmap
+import os
+import re
+import socket
+import sqlite3
+import threading
+
+
+SEGMENT_SIZE = 64 * 1024 * 1024  # Roll over to a new segment file after this many bytes
+_SEGMENT_NAME = re.compile(r'^segment-(\d+)\.warc\.gz$')
+
+
+class PageArchive:
+    """Append-only, compressed archive of fetched pages.
+
+    Pages are written as WARC-like response records to segment files
+    (segment-00001.warc.gz, ...). Every record is its own gzip member, so it
+    can be decompressed on its own from its offset; offsets live in a SQLite
+    index next to the segments. Segment numbers are handed out by the index,
+    so each writing process appends to segments of its own and several
+    workers can share one archive directory. Segments are read through mmap, which lets
+    many processes re-extract pages from the same archive without copying
+    segment files into memory.
+    """
+
+    def __init__(self, directory: str, segment_size: int = SEGMENT_SIZE):
+        """Open (or create) an archive directory."""
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self.index_path = self.directory / 'index.db'
+        self._write_lock = threading.Lock()
+        self._map_lock = threading.Lock()
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._segment_file = None
+        self._segment: Optional[int] = None  # Allocated on the first append
+        self._init_index()
+
+    @contextmanager
+    def _connection(self):
+        conn = sqlite3.connect(self.index_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_index(self):
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS records (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL,
+                    host TEXT NOT NULL,
+                    segment INTEGER NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    fetched_at TIMESTAMP NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_records_url ON records(url)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_records_host ON records(host)")
+            # One row per segment file, owned by the process that writes it
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS segments (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    owner TEXT NOT NULL
+                )
+            """)
+            # Segments written before they were allocated through the index
+            conn.executemany("INSERT OR IGNORE INTO segments (id, owner) VALUES (?, 'existing')",
+                             [(number,) for number in self._segment_numbers()])
+
+    def _allocate_segment(self) -> int:
+        """Reserve a new segment number no other process writes to."""
+        with self._connection() as conn:
+            cursor = conn.execute("INSERT INTO segments (owner) VALUES (?)",
+                                  (f"{socket.gethostname()}-{os.getpid()}",))
+            return cursor.lastrowid
+
+    def _segment_numbers(self) -> List[int]:
+        return [int(m.group(1)) for m in map(_SEGMENT_NAME.match, os.listdir(self.directory)) if m]
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.directory / f"segment-{segment:05d}.warc.gz"
+
+    def append(self, url: str, body: bytes, content_type: Optional[str] = None) -> Tuple[int, int]:
+        """Archive a fetched page, returning its (segment, offset)."""
+        fetched_at = datetime.now(timezone.utc).isoformat()
+        header = (
+            "WARC/1.1\r\n"
+            "WARC-Type: response\r\n"
+            f"WARC-Target-URI: {url}\r\n"
+            f"WARC-Date: {fetched_at}\r\n"
+            f"Content-Type: {content_type or 'text/html'}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode('utf-8')
+        record = gzip.compress(header + body + b"\r\n\r\n", compresslevel=6)
+
+        with self._write_lock:
+            if self._segment_file is not None:
+                size = self._segment_file.tell()
+                if size and size + len(record) > self.segment_size:
+                    self._segment_file.close()
+                    self._segment_file = None
+            if self._segment_file is None:
+                self._segment = self._allocate_segment()
+                self._segment_file = open(self._segment_path(self._segment), 'ab')
+
+            offset = self._segment_file.tell()
+            self._segment_file.write(record)
+            self._segment_file.flush()  # Readers map the file, they must see whole records
+            segment = self._segment
+
+            with self._connection() as conn:
+                conn.execute("""
+                    INSERT INTO records (url, host, segment, offset, length, fetched_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (url, urlparse(url).netloc, segment, offset, len(record), fetched_at))
+
+        return segment, offset
+
+    def read_record(self, segment: int, offset: int, length: int) -> Tuple[Dict[str, str], bytes]:
+        """Decompress one record, returning its headers and page body."""
+        with self._map_lock:
+            mapped = self._maps.get(segment)
+            if mapped is None or offset + length > len(mapped):
+                # Not mapped yet, or the segment grew since it was mapped
+                if mapped is not None:
+                    mapped.close()
+                with open(self._segment_path(segment), 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[segment] = mapped
+            data = gzip.decompress(mapped[offset:offset + length])
+
+        head, _, rest = data.partition(b"\r\n\r\n")
+        headers = {}
+        for line in head.decode('utf-8', errors='replace').split("\r\n")[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip()] = value.strip()
+        body_length = int(headers.get('Content-Length', len(rest)))
+        return headers, rest[:body_length]
+
+    def get(self, url: str) -> Optional[bytes]:
+        """Body of the most recent archived fetch of a URL, or None."""
+        with self._connection() as conn:
+            row = conn.execute("""
+                SELECT segment, offset, length FROM records
+                WHERE url = ? ORDER BY id DESC LIMIT 1
+            """, (url,)).fetchone()
+        if row is None:
+            return None
+        return self.read_record(row['segment'], row['offset'], row['length'])[1]
+
+    def latest_records(self, host: Optional[str] = None, urls: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Index entries of the most recent fetch of each URL, optionally for one host or URL set."""
+        query = "SELECT url, segment, offset, length FROM records WHERE id IN (SELECT MAX(id) FROM records"
+        params: List[Any] = []
+        if host is not None:
+            query += " WHERE host = ?"
+            params.append(host)
+        query += " GROUP BY url) ORDER BY segment, offset"
+
+        with self._connection() as conn:
+            rows = [dict(row) for row in conn.execute(query, params).fetchall()]
+        if urls is not None:
+            wanted = set(urls)
+            rows = [row for row in rows if row['url'] in wanted]
+        return rows
+
+    def iter_pages(self, host: Optional[str] = None) -> Iterator[Tuple[str, bytes]]:
+        """Yield (url, body) of the latest fetch of every archived URL, in segment order."""
+        for row in self.latest_records(host):
+            yield row['url'], self.read_record(row['segment'], row['offset'], row['length'])[1]
+
+    def stats(self) -> Dict[str, Any]:
+        """Record count, distinct URLs and on-disk size of the archive."""
+        with self._connection() as conn:
+            records, urls = conn.execute("SELECT COUNT(*), COUNT(DISTINCT url) FROM records").fetchone()
+        size = sum(self._segment_path(n).stat().st_size for n in self._segment_numbers())
+        return {'records': records, 'urls': urls, 'segments': len(self._segment_numbers()), 'bytes': size}
+
+    def close(self):
+        """Close the open segment and all memory maps."""
+        with self._write_lock:
+            if self._segment_file is not None:
+                self._segment_file.close()
+                self._segment_file = None
+        with self._map_lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+
+
+_archive: Optional[PageArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> Optional[PageArchive]:
+    """Return the process-wide archive, or None when archiving is off.
+
+    Enabled by setting SCRAPER_ARCHIVE_DIR to the archive directory.
+    """
+    global _archive
+    directory = os.getenv('SCRAPER_ARCHIVE_DIR')
+    if not directory:
+        return None
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = PageArchive(directory)
+    return _archive
@@ -0,0 +1,131 @@
+from typing import List, Dict, Any, Optional, Iterable
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+# Query parameters that only track where a visitor came from
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'igshid', 'twclid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi', 'mkt_tok', 'ref_src', 'spm',
+}
+TRACKING_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Trailing slash rules
+SLASH_ADD = 'add'
+SLASH_STRIP = 'strip'
+
+# Share of article URLs that must agree before a site's form is enforced
+RULE_AGREEMENT = 0.8
+
+
+class URLCanonicalizer:
+    """Rewrites the URL variants of a page to one canonical form.
+
+    Always lowercases scheme and host, drops default ports, fragments and
+    tracking parameters (utm_*, fbclid, ...) and sorts the remaining query.
+    Per-site rules, learned with infer_rules or configured and stored in the
+    site's spec, additionally strip site-specific parameters, add or strip
+    the trailing slash and (explicitly configured only) lowercase the path.
+    """
+
+    def __init__(self, strip_params: Iterable[str] = (), trailing_slash: Optional[str] = None,
+                 lowercase_path: bool = False):
+        """Initialize with per-site rules.
+
+        Args:
+            strip_params: Extra query parameters to drop (e.g. session ids)
+            trailing_slash: SLASH_ADD, SLASH_STRIP or None to keep paths as they are
+            lowercase_path: Lowercase paths; only for sites configured as case-insensitive
+        """
+        self.strip_params = {param.lower() for param in strip_params}
+        self.trailing_slash = trailing_slash
+        self.lowercase_path = lowercase_path
+
+    @classmethod
+    def from_dict(cls, rules: Optional[Dict[str, Any]]) -> 'URLCanonicalizer':
+        """Build a canonicalizer from rules stored in a spec."""
+        rules = rules or {}
+        return cls(rules.get('strip_params', ()), rules.get('trailing_slash'),
+                   rules.get('lowercase_path', False))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Rules as stored in a spec."""
+        return {
+            'strip_params': sorted(self.strip_params),
+            'trailing_slash': self.trailing_slash,
+            'lowercase_path': self.lowercase_path
+        }
+
+    def _keep_param(self, name: str) -> bool:
+        name = name.lower()
+        return (name not in TRACKING_PARAMS and name not in self.strip_params
+                and not name.startswith(TRACKING_PREFIXES))
+
+    def canonicalize(self, url: str) -> str:
+        """Canonical form of an absolute URL (other strings are returned unchanged)."""
+        parts = urlsplit(url.strip())
+        if not parts.scheme or not parts.netloc:
+            return url
+
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or '').lower()
+        if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+            host = f"{host}:{parts.port}"
+        if parts.username:
+            host = f"{parts.username}{':' + parts.password if parts.password else ''}@{host}"
+
+        path = parts.path or '/'
+        if self.lowercase_path:
+            path = path.lower()
+        last_segment = path.rsplit('/', 1)[-1]
+        if self.trailing_slash == SLASH_ADD and last_segment and '.' not in last_segment:
+            path += '/'
+        elif self.trailing_slash == SLASH_STRIP and len(path) > 1:
+            path = path.rstrip('/') or '/'
+
+        query = parts.query
+        if query:
+            params = [(name, value) for name, value in parse_qsl(query, keep_blank_values=True)
+                      if self._keep_param(name)]
+            query = urlencode(sorted(params))
+
+        return urlunsplit((scheme, host, path, query, ''))
+
+
+# Site-independent rules, also applied by the database
+default_canonicalizer = URLCanonicalizer()
+
+
+def canonicalize_url(url: str) -> str:
+    """Canonical form of a URL under the site-independent rules."""
+    return default_canonicalizer.canonicalize(url)
+
+
+def canonical_link(soup, page_url: str) -> Optional[str]:
+    """Absolute <link rel="canonical"> URL of a page, if it points to the same host."""
+    link = soup.find('link', rel='canonical', href=True)
+    if link is None:
+        return None
+    url = urljoin(page_url, link['href'].strip())
+    if urlsplit(url).netloc.lower() != urlsplit(page_url).netloc.lower():
+        return None  # Syndicated copies point at another site
+    return url
+
+
+def infer_rules(urls: List[str]) -> Dict[str, Any]:
+    """Trailing slash rule that most of a site's article URLs already follow."""
+    paths = [urlsplit(url).path for url in urls]
+    # File-like paths (.html) never take a trailing slash
+    directory_like = [path for path in paths if '.' not in path.rstrip('/').rsplit('/', 1)[-1]]
+
+    rules: Dict[str, Any] = {'strip_params': [], 'trailing_slash': None, 'lowercase_path': False}
+    if len(directory_like) >= 3:
+        with_slash = sum(1 for path in directory_like if path.endswith('/')) / len(directory_like)
+        if with_slash >= RULE_AGREEMENT:
+            rules['trailing_slash'] = SLASH_ADD
+        elif with_slash <= 1 - RULE_AGREEMENT:
+            rules['trailing_slash'] = SLASH_STRIP
+    # lowercase_path is never inferred: lowercase samples don't show the server
+    # ignores case, and lowercasing /blog/New-Post would 404 on most servers
+    return rules
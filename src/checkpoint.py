@@ -0,0 +1,83 @@
+from typing import List, Optional, Set
+from concurrent.futures import Future, wait
+import threading
+from src.database import Database
+from src.writer import get_writer
+
+
+class SessionCheckpoint:
+    """Persists a scraping session's progress as it goes.
+
+    Generated scrapers call `record_frontier` once the article URLs are known,
+    then `article_done` / `url_failed` for every URL. Articles are handed to the
+    database's writer thread as soon as they are scraped and committed in small
+    batches together with their URL's done mark, so a process that dies mid-run
+    loses at most the last batch and `resume_session` only has to fetch the
+    URLs that are not done yet.
+    """
+
+    def __init__(self, database: Database, session_id: int, site: str):
+        """Initialize checkpoint for an existing scraping session."""
+        self.database = database
+        self.session_id = session_id
+        self.site = site
+        self.saved = 0
+        self.duplicates = 0
+        self.refetch: Set[str] = set()  # URLs of stored articles that changed; saved over the old ones
+        self.writer = get_writer(database)
+        self._pending: List[Future] = []
+        self._lock = threading.Lock()  # Scrapers report from worker threads
+
+    def record_frontier(self, urls: List[str]) -> List[str]:
+        """Checkpoint the URL frontier, return the URLs that still need scraping."""
+        self.database.checkpoint_frontier(self.session_id, urls)
+        done = set(self.database.get_session_urls(self.session_id, ['done']))
+        remaining = [url for url in urls if url not in done]
+        if len(remaining) < len(urls):
+            print(f"⏩ Skipping {len(urls) - len(remaining)} URLs already completed in session {self.session_id}")
+        return remaining
+
+    def article_done(self, url: str, title: str, content: str,
+                     page_url: Optional[str] = None) -> Future:
+        """Queue a scraped article for saving and marking its URL as done.
+
+        page_url is the frontier URL that was fetched, when the article is
+        saved under a different (canonical) URL. Returns the writer's future
+        of the article ID (None if duplicate); call flush() before reading
+        the counters.
+        """
+        page_url = page_url or url
+        future = self.writer.submit(url, title, content, self.site, self.session_id, page_url,
+                                    replace=url in self.refetch or page_url in self.refetch)
+        with self._lock:
+            self._pending.append(future)
+        return future
+
+    def flush(self):
+        """Wait until every article queued so far is written and count the outcomes."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        wait(pending)
+        for future in pending:
+            if future.exception() is not None:
+                continue  # The URL stays pending, so resuming the session retries it
+            if future.result() is not None:
+                self.saved += 1
+            else:
+                self.duplicates += 1
+
+    def url_failed(self, url: str):
+        """Mark a URL as failed; resuming the session retries it."""
+        self.database.mark_session_url(self.session_id, url, 'failed')
+
+    def pending_urls(self) -> List[str]:
+        """URLs of this session that are not done yet (pending or failed)."""
+        return self.database.get_session_urls(self.session_id, ['pending', 'failed'])
+
+    def completed_urls(self) -> List[str]:
+        """URLs of this session that were scraped successfully."""
+        return self.database.get_session_urls(self.session_id, ['done'])
+
+    def article_urls(self) -> List[str]:
+        """URLs the session's scraped articles are stored under (rel=canonical URLs)."""
+        return self.database.get_session_article_urls(self.session_id)
@@ -0,0 +1,117 @@
+from typing import List, Optional, Tuple
+from collections import Counter
+import zlib
+
+
+# Codecs of stored article content (NULL content_codec means plain text)
+ZSTD = 'zstd'
+ZLIB = 'zlib'  # Fallback when zstandard is not installed
+
+ZSTD_LEVEL = 9
+ZLIB_LEVEL = 9
+ZSTD_DICT_SIZE = 64 * 1024
+ZLIB_DICT_SIZE = 32 * 1024  # zlib's window: preset dictionary bytes beyond it are unused
+
+# A site's dictionary is trained once it has this many articles, from at most DICT_MAX_SAMPLES
+DICT_MIN_SAMPLES = 20
+DICT_MAX_SAMPLES = 500
+
+_zstd = False  # Not imported yet
+
+
+def _zstandard():
+    """The zstandard module, or None when it is not installed; imported lazily."""
+    global _zstd
+    if _zstd is False:
+        try:
+            import zstandard
+            _zstd = zstandard
+        except ImportError:  # Content is compressed with zlib instead
+            _zstd = None
+    return _zstd
+
+
+def default_codec() -> str:
+    """Best codec available in this environment."""
+    return ZSTD if _zstandard() is not None else ZLIB
+
+
+def _zlib_dictionary(samples: List[str]) -> bytes:
+    """Preset dictionary of the paragraphs that recur across a site's articles.
+
+    zlib matches against the dictionary like against earlier text, preferring
+    close (late) bytes, so the most common boilerplate goes last.
+    """
+    counts = Counter(paragraph.strip() for sample in samples
+                     for paragraph in set(sample.split('\n')) if paragraph.strip())
+    recurring = [paragraph for paragraph, count in counts.most_common() if count > 1]
+
+    dictionary = b''
+    for paragraph in recurring:
+        encoded = paragraph.encode('utf-8') + b'\n'
+        if len(dictionary) + len(encoded) > ZLIB_DICT_SIZE:
+            break
+        dictionary = encoded + dictionary
+    # Spare room holds ordinary prose of the site (common words, phrasing)
+    prose = b'\n'.join(sample.encode('utf-8') for sample in samples)
+    spare = ZLIB_DICT_SIZE - len(dictionary)
+    if spare > 0:
+        dictionary = prose[:spare] + dictionary
+    return dictionary
+
+
+def train_dictionary(codec: str, samples: List[str]) -> Optional[bytes]:
+    """Train a compression dictionary from a site's article texts, or None if training fails."""
+    if codec == ZSTD:
+        try:
+            encoded = [sample.encode('utf-8') for sample in samples]
+            return _zstandard().train_dictionary(ZSTD_DICT_SIZE, encoded).as_bytes()
+        except Exception as e:  # Too few or too small samples
+            print(f"⚠️  Could not train zstd dictionary: {e}")
+            return None
+    return _zlib_dictionary(samples) or None
+
+
+def parse_codec(name: Optional[str]) -> Tuple[Optional[str], Optional[int]]:
+    """Split a stored codec name ('zstd:3') into codec and dictionary ID."""
+    if not name:
+        return None, None
+    codec, _, dictionary_id = name.partition(':')
+    return codec, int(dictionary_id) if dictionary_id else None
+
+
+class ContentCodec:
+    """Compresses article texts of a site, optionally with its trained dictionary."""
+
+    def __init__(self, codec: str, dictionary: Optional[bytes] = None, dictionary_id: Optional[int] = None):
+        """Initialize codec; zstd raises RuntimeError when zstandard is not installed."""
+        if codec == ZSTD and _zstandard() is None:
+            raise RuntimeError("Content was compressed with zstd, but zstandard is not installed")
+        if codec not in (ZSTD, ZLIB):
+            raise ValueError(f"Unknown content codec: {codec}")
+        self.codec = codec
+        self.dictionary = dictionary
+        self.dictionary_id = dictionary_id
+        self._zstd_dict = None
+        if codec == ZSTD and dictionary:
+            self._zstd_dict = _zstandard().ZstdCompressionDict(dictionary)
+
+    @property
+    def name(self) -> str:
+        """Codec name stored with each row ('zstd', 'zlib:3', ...)."""
+        return f"{self.codec}:{self.dictionary_id}" if self.dictionary_id is not None else self.codec
+
+    def compress(self, text: str) -> bytes:
+        data = text.encode('utf-8')
+        if self.codec == ZSTD:
+            # Compressor objects are not thread-safe, so each call gets its own
+            return _zstandard().ZstdCompressor(level=ZSTD_LEVEL, dict_data=self._zstd_dict).compress(data)
+        compressor = (zlib.compressobj(ZLIB_LEVEL, zdict=self.dictionary) if self.dictionary
+                      else zlib.compressobj(ZLIB_LEVEL))
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data: bytes) -> str:
+        if self.codec == ZSTD:
+            return _zstandard().ZstdDecompressor(dict_data=self._zstd_dict).decompress(data).decode('utf-8')
+        decompressor = zlib.decompressobj(zdict=self.dictionary) if self.dictionary else zlib.decompressobj()
+        return (decompressor.decompress(data) + decompressor.flush()).decode('utf-8')
@@ -0,0 +1,199 @@
+from typing import List, Any, Optional, Tuple, TYPE_CHECKING
+import re
+
+if TYPE_CHECKING:  # bs4 is imported on first extraction, keeping `import src.engine` fast
+    from bs4 import BeautifulSoup, Tag
+
+# NumPy is optional and imported on first use (see _numpy)
+_np: Any = False
+
+
+# Subtrees that never hold article text
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'head'}
+BOILERPLATE_TAGS = {'nav', 'aside', 'footer', 'header', 'form', 'menu'}
+
+POSITIVE_CLASSES = re.compile(r'article|body|content|entry|main|post|story|text', re.I)
+NEGATIVE_CLASSES = re.compile(
+    r'\bad-|\bads?\b|banner|comment|footer|menu|meta|nav|promo|related|share|sidebar|'
+    r'social|sponsor|subscribe|newsletter|widget', re.I
+)
+
+# Elements whose (non-link) text counts as article text
+PARAGRAPH_TAGS = ('p', 'li', 'pre', 'blockquote')
+
+# Feature matrix columns
+TEXT_LEN, LINK_LEN, P_LEN, P_COUNT, DEPTH, POSITIVE, NEGATIVE = range(7)
+
+# Weight of non-paragraph text inside a block: penalizes containers that
+# also hold navigation, headers and footers
+OTHER_TEXT_PENALTY = 0.5
+# Paragraphs that are mostly link text are boilerplate ("Read more: ...")
+MAX_PARAGRAPH_LINK_DENSITY = 0.5
+
+
+def _numpy():
+    """The numpy module, or None when it is not installed; imported lazily."""
+    global _np
+    if _np is False:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:  # Scoring falls back to pure Python
+            _np = None
+    return _np
+
+
+class ContentExtractor:
+    """Finds a page's main content block by scoring every DOM node at once.
+
+    One pass over the DOM builds a feature matrix with a row per element
+    (text length, link text length, paragraph text length and count, depth,
+    positive/negative class tokens). All rows are scored together (with
+    NumPy when installed): non-link paragraph text counts for a block, link
+    and other text (navigation, bylines, footers) counts against it, and class
+    tokens such as 'content' or 'sidebar' adjust the score. The best block is the tightest element
+    holding most of the page's paragraph text.
+    """
+
+    def features(self, root: 'Tag') -> Tuple[List['Tag'], List[List[float]]]:
+        """Elements under root (document order) and their feature rows."""
+        from bs4 import Comment, NavigableString, Tag
+
+        nodes: List['Tag'] = []
+        parents: List[int] = []
+        rows: List[List[float]] = []
+
+        stack = [(root, -1, 0)]
+        while stack:
+            node, parent, depth = stack.pop()
+            index = len(nodes)
+            nodes.append(node)
+            parents.append(parent)
+
+            own_text = 0
+            children = []
+            for child in node.children:
+                if isinstance(child, Tag):
+                    if child.name not in SKIP_TAGS:
+                        children.append(child)
+                elif isinstance(child, NavigableString) and not isinstance(child, Comment):
+                    own_text += len(child.strip())
+
+            class_str = ' '.join(node.get('class', [])) + ' ' + (node.get('id') or '')
+            negative = node.name in BOILERPLATE_TAGS or bool(NEGATIVE_CLASSES.search(class_str))
+            rows.append([own_text, 0, 0, 0, depth,
+                         float(bool(POSITIVE_CLASSES.search(class_str))), float(negative)])
+
+            for child in reversed(children):
+                stack.append((child, index, depth + 1))
+
+        # Parents precede their descendants, so a reverse sweep aggregates subtrees
+        for index in range(len(nodes) - 1, -1, -1):
+            row = rows[index]
+            name = nodes[index].name
+            if name == 'a':
+                row[LINK_LEN] = row[TEXT_LEN]
+            elif name in PARAGRAPH_TAGS:
+                # Replaces nested paragraph text (e.g. <p> in <li>) instead of adding to it
+                row[P_LEN] = row[TEXT_LEN] - row[LINK_LEN]
+                row[P_COUNT] += 1
+            parent = parents[index]
+            if parent >= 0:
+                parent_row = rows[parent]
+                parent_row[TEXT_LEN] += row[TEXT_LEN]
+                parent_row[LINK_LEN] += row[LINK_LEN]
+                parent_row[P_LEN] += row[P_LEN]
+                parent_row[P_COUNT] += row[P_COUNT]
+
+        return nodes, rows
+
+    def score(self, rows: List[List[float]]) -> List[float]:
+        """Content score of every feature row."""
+        if not rows:
+            return []
+        # Pages without paragraph markup: fall back to non-link text as block text
+        use_paragraphs = rows[0][P_COUNT] > 0
+
+        np = _numpy()
+        if np is not None:
+            matrix = np.asarray(rows, dtype=float)
+            text = matrix[:, TEXT_LEN]
+            block_text = matrix[:, P_LEN] if use_paragraphs else text - matrix[:, LINK_LEN]
+            scores = (block_text - OTHER_TEXT_PENALTY * (text - block_text)) \
+                * (1.0 + 0.25 * matrix[:, POSITIVE] - 0.5 * matrix[:, NEGATIVE])
+            # Among equal scores, prefer the deeper (tighter) block
+            return (scores + 0.001 * matrix[:, DEPTH]).tolist()
+
+        scores = []
+        for row in rows:
+            text = row[TEXT_LEN]
+            block_text = row[P_LEN] if use_paragraphs else text - row[LINK_LEN]
+            score = (block_text - OTHER_TEXT_PENALTY * (text - block_text)) \
+                * (1.0 + 0.25 * row[POSITIVE] - 0.5 * row[NEGATIVE])
+            scores.append(score + 0.001 * row[DEPTH])
+        return scores
+
+    def rank_blocks(self, soup: 'BeautifulSoup', limit: int = 5) -> List[Tuple['Tag', float]]:
+        """Best scoring content blocks of a page, best first."""
+        root = soup.body or soup
+        nodes, rows = self.features(root)
+        scores = self.score(rows)
+        # A block is a container: single paragraphs are never candidates themselves
+        ranked = sorted(
+            (i for i in range(len(nodes)) if scores[i] > 0 and nodes[i].name not in PARAGRAPH_TAGS),
+            key=lambda i: scores[i], reverse=True
+        )
+        return [(nodes[i], scores[i]) for i in ranked[:limit]]
+
+    def find_main_content(self, soup: 'BeautifulSoup') -> Optional['Tag']:
+        """The page's main content block, or None if nothing scores positive."""
+        blocks = self.rank_blocks(soup, limit=1)
+        return blocks[0][0] if blocks else None
+
+    def content_text(self, element: 'Tag') -> str:
+        """Paragraph text of a content block with boilerplate stripped.
+
+        Paragraph-like elements (p, li, pre, blockquote) are joined in
+        document order; those inside boilerplate subtrees (nav, aside,
+        share/related widgets, ...) or consisting mostly of links are dropped.
+        Blocks without paragraphs return their whole text.
+        """
+        paragraphs = element.find_all(PARAGRAPH_TAGS)
+        if not paragraphs:
+            return element.get_text(strip=True)
+
+        texts = []
+        for paragraph in paragraphs:
+            if self._skip_paragraph(paragraph, element):
+                continue
+            text = paragraph.get_text(strip=True)
+            if not text:
+                continue
+            link_text = sum(len(link.get_text(strip=True)) for link in paragraph.find_all('a'))
+            if link_text / len(text) > MAX_PARAGRAPH_LINK_DENSITY:
+                continue
+            texts.append(text)
+        return '\n\n'.join(texts)
+
+    def extract(self, soup: 'BeautifulSoup') -> Optional[str]:
+        """Selector-free extraction: main content text of a page, or None."""
+        block = self.find_main_content(soup)
+        if block is None:
+            return None
+        return self.content_text(block) or None
+
+    def _skip_paragraph(self, paragraph: 'Tag', container: 'Tag') -> bool:
+        """Whether a paragraph is boilerplate or nested in another paragraph below container."""
+        node = paragraph
+        while node is not None and node is not container:
+            if node is not paragraph and node.name in PARAGRAPH_TAGS:
+                return True  # Its text is part of the enclosing paragraph
+            class_str = ' '.join(node.get('class', [])) + ' ' + (node.get('id') or '')
+            if node.name in BOILERPLATE_TAGS or NEGATIVE_CLASSES.search(class_str):
+                return True
+            node = node.parent
+        return False
+
+
+# Shared stateless instance
+content_extractor = ContentExtractor()
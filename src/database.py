@@ -1,21 +1,52 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, Tuple
+import os
 import sqlite3
+import threading
 from pathlib import Path
 from contextlib import contextmanager
+from src.canonical import canonicalize_url
+from src.content_codec import (ContentCodec, DICT_MAX_SAMPLES, DICT_MIN_SAMPLES, default_codec,
+                               parse_codec, train_dictionary)
 from src.main import Article
 
 
+# Article columns of listings that skip the content
+LISTING_COLUMNS = 'id, url, title, site, scraped_at, word_count, created_at'
+
+
 class Database:
-    def __init__(self, db_path: str = "articles.db"):
-        """Initialize database with path and create tables."""
+    def __init__(self, db_path: str = "articles.db", persistent: bool = False,
+                 compress: Optional[bool] = None):
+        """Initialize database with path and create tables.
+        
+        Args:
+            db_path: SQLite database file
+            persistent: Keep one open connection per thread instead of connecting
+                for every operation (long-running processes, see get_database)
+            compress: Store article content compressed with per-site dictionaries
+                (default: SCRAPER_COMPRESS_CONTENT=true); reads always decompress
+        """
         self.db_path = Path(db_path)
+        self.persistent = persistent
+        if compress is None:
+            compress = os.getenv('SCRAPER_COMPRESS_CONTENT', 'false').lower() == 'true'
+        self.compress = compress
+        self._local = threading.local()
+        self._codecs: Dict[str, ContentCodec] = {}       # Stored codec name -> codec
+        self._site_codecs: Dict[str, ContentCodec] = {}  # Site -> codec with its trained dictionary
+        self._train_after: Dict[str, int] = {}           # Site -> article count of the next training attempt
+        self._codecs_lock = threading.Lock()
         self.init_db()
     
     @contextmanager
     def get_connection(self):
         """Context manager for database connections with proper error handling."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Allow column access by name
+        conn = getattr(self._local, 'conn', None) if self.persistent else None
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row  # Allow column access by name
+            if self.persistent:
+                self._local.conn = conn
         try:
             yield conn
             conn.commit()
@@ -23,7 +54,8 @@ class Database:
             conn.rollback()
             raise
         finally:
-            conn.close()
+            if not self.persistent:
+                conn.close()
         
     def init_db(self):
         """Create tables and indexes if they don't exist."""
@@ -38,6 +70,19 @@ class Database:
                     site TEXT NOT NULL,
                     scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     word_count INTEGER,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    content_codec TEXT
+                )
+            """)
+            self._ensure_column(conn, 'articles', 'content_codec', 'TEXT')
+            
+            # Create content_dictionaries table (per-site compression dictionaries)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS content_dictionaries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    site TEXT NOT NULL,
+                    codec TEXT NOT NULL,
+                    dictionary BLOB NOT NULL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
@@ -51,40 +96,351 @@ class Database:
                     finished_at TIMESTAMP,
                     articles_scraped INTEGER DEFAULT 0,
                     status TEXT DEFAULT 'running',
-                    error_message TEXT
+                    error_message TEXT,
+                    homepage_url TEXT,
+                    pages_fetched INTEGER,
+                    pages_extracted INTEGER
+                )
+            """)
+            self._ensure_column(conn, 'scraping_sessions', 'homepage_url', 'TEXT')
+            self._ensure_column(conn, 'scraping_sessions', 'pages_fetched', 'INTEGER')
+            self._ensure_column(conn, 'scraping_sessions', 'pages_extracted', 'INTEGER')
+            
+            # Create site_schedule table (recurring scrape scheduling state)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS site_schedule (
+                    site TEXT PRIMARY KEY,
+                    homepage_url TEXT NOT NULL,
+                    change_rate REAL,
+                    last_run_at TIMESTAMP,
+                    next_run_at TIMESTAMP,
+                    etag TEXT,
+                    last_modified TEXT
+                )
+            """)
+            
+            # Create request_spend table (scheduler request budget shared by all runs)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS request_spend (
+                    spent_at REAL NOT NULL,
+                    cost INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_request_spend_time ON request_spend (spent_at)")
+            
+            # Create session_urls table (checkpointed URL frontier of each session)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS session_urls (
+                    session_id INTEGER NOT NULL,
+                    url TEXT NOT NULL,
+                    status TEXT DEFAULT 'pending',
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    article_url TEXT,
+                    PRIMARY KEY (session_id, url)
+                )
+            """)
+            self._ensure_column(conn, 'session_urls', 'article_url', 'TEXT')
+            
+            # Create scraper_specs table (per-site specs run by the scraper engine)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS scraper_specs (
+                    site TEXT PRIMARY KEY,
+                    spec TEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Create templates tables (structural fingerprints with validated selectors)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS templates (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    site TEXT NOT NULL,
+                    signature TEXT NOT NULL,
+                    selectors TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS template_bands (
+                    band_key TEXT NOT NULL,
+                    template_id INTEGER NOT NULL,
+                    PRIMARY KEY (band_key, template_id)
+                )
+            """)
+            
+            # Create selector_stats table (per-site hit counters of fallback chain selectors)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS selector_stats (
+                    site TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    selector TEXT NOT NULL,
+                    hits INTEGER DEFAULT 0,
+                    attempts INTEGER DEFAULT 0,
+                    PRIMARY KEY (site, field, selector)
                 )
             """)
             
             # Create indexes
             conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_url ON articles (url)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_site ON articles (site)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_site ON scraping_sessions (site, started_at)")
+    
+    def _ensure_column(self, conn: sqlite3.Connection, table: str, column: str, definition: str):
+        """Add a column to a table created by an older version of the schema."""
+        columns = {row['name'] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        
+    def _codec(self, conn: sqlite3.Connection, name: str) -> ContentCodec:
+        """Codec of a stored codec name, loading its dictionary once."""
+        codec = self._codecs.get(name)
+        if codec is None:
+            codec_type, dictionary_id = parse_codec(name)
+            dictionary = None
+            if dictionary_id is not None:
+                row = conn.execute("SELECT dictionary FROM content_dictionaries WHERE id = ?",
+                                   (dictionary_id,)).fetchone()
+                if row is None:
+                    raise ValueError(f"Missing content dictionary {dictionary_id}")
+                dictionary = row['dictionary']
+            codec = ContentCodec(codec_type, dictionary, dictionary_id)
+            with self._codecs_lock:
+                self._codecs[name] = codec
+        return codec
+    
+    def _decode_content(self, conn: sqlite3.Connection, content: Any, codec_name: Optional[str]) -> str:
+        if not codec_name:
+            return content
+        return self._codec(conn, codec_name).decompress(content)
+    
+    def _article_row(self, conn: sqlite3.Connection, row: sqlite3.Row) -> Dict[str, Any]:
+        """Article row as a dict with its content decompressed."""
+        article = dict(row)
+        codec_name = article.pop('content_codec', None)
+        if 'content' in article:
+            article['content'] = self._decode_content(conn, article['content'], codec_name)
+        return article
+    
+    def _site_codec(self, conn: sqlite3.Connection, site: str) -> ContentCodec:
+        """Codec for new content of a site: with its trained dictionary once it has one."""
+        codec = self._site_codecs.get(site)
+        if codec is not None:
+            return codec
+        
+        codec_type = default_codec()
+        row = conn.execute("""
+            SELECT id, dictionary FROM content_dictionaries
+            WHERE site = ? AND codec = ?
+            ORDER BY id DESC LIMIT 1
+        """, (site, codec_type)).fetchone()
+        if row is None:
+            return self._codec(conn, codec_type)  # No dictionary yet (see _train_dictionaries)
+        
+        codec = ContentCodec(codec_type, row['dictionary'], row['id'])
+        with self._codecs_lock:
+            self._codecs[codec.name] = codec
+            self._site_codecs[site] = codec
+        return codec
+    
+    def _train_dictionaries(self, sites: List[str]):
+        """Train the dictionaries of sites that have enough articles now.
+        
+        Called after the articles' own transaction committed: each dictionary
+        is stored in a transaction of its own, so new content never refers to
+        a dictionary that a rolled back write took with it. Articles stored
+        before training keep their codec until compress_articles().
+        """
+        if not self.compress:
+            return
+        for site in dict.fromkeys(sites):
+            if site not in self._site_codecs:
+                try:
+                    self._train_site_codec(site)
+                except Exception as e:  # The articles are saved; training is retried on the next save
+                    print(f"⚠️  Could not train content dictionary for {site}: {e}")
+    
+    def _train_site_codec(self, site: str) -> Optional[ContentCodec]:
+        """Train and store a site's dictionary from its latest articles, None if not (yet) possible."""
+        codec_type = default_codec()
+        with self.get_connection() as conn:
+            codec = self._site_codec(conn, site)
+            if codec.dictionary_id is not None:
+                return codec  # Trained by another process
+            count = conn.execute("SELECT COUNT(*) FROM articles WHERE site = ?", (site,)).fetchone()[0]
+            if count < self._train_after.get(site, DICT_MIN_SAMPLES):
+                return None
+            
+            rows = conn.execute("""
+                SELECT content, content_codec FROM articles
+                WHERE site = ? ORDER BY id DESC LIMIT ?
+            """, (site, DICT_MAX_SAMPLES)).fetchall()
+            samples = [self._decode_content(conn, row['content'], row['content_codec']) for row in rows]
+            dictionary = train_dictionary(codec_type, samples)
+            if dictionary is None:
+                self._train_after[site] = count * 2
+                return None
+            
+            cursor = conn.execute("""
+                INSERT INTO content_dictionaries (site, codec, dictionary) VALUES (?, ?, ?)
+            """, (site, codec_type, dictionary))
+            codec = ContentCodec(codec_type, dictionary, cursor.lastrowid)
+        
+        # Only cached once the dictionary is committed
+        with self._codecs_lock:
+            self._codecs[codec.name] = codec
+            self._site_codecs[site] = codec
+        print(f"🗜️  Trained {len(dictionary) // 1024} KB {codec_type} dictionary for {site} "
+              f"from {len(samples)} articles")
+        return codec
+    
+    def _recompress_site(self, conn: sqlite3.Connection, site: str, codec: ContentCodec) -> int:
+        """Re-encode a site's articles not stored with the given codec, return how many."""
+        rows = conn.execute("""
+            SELECT id, content, content_codec FROM articles
+            WHERE site = ? AND (content_codec IS NULL OR content_codec != ?)
+        """, (site, codec.name)).fetchall()
+        for row in rows:
+            content = self._decode_content(conn, row['content'], row['content_codec'])
+            conn.execute("UPDATE articles SET content = ?, content_codec = ? WHERE id = ?",
+                         (codec.compress(content), codec.name, row['id']))
+        return len(rows)
+    
+    def _encode_content(self, conn: sqlite3.Connection, site: str, content: str) -> Tuple[Any, Optional[str]]:
+        """Content as stored (compressed when enabled) and its codec name."""
+        if not self.compress:
+            return content, None
+        codec = self._site_codec(conn, site)
+        return codec.compress(content), codec.name
+    
+    def compress_articles(self, site: Optional[str] = None) -> int:
+        """Compress stored articles (of one site or all), return how many were re-encoded.
         
+        Maintenance step, not part of saving: sites are trained and
+        recompressed one transaction each. Run VACUUM afterwards to give the
+        freed pages back to the file system.
+        """
+        with self.get_connection() as conn:
+            if site is None:
+                sites = [row['site'] for row in conn.execute("SELECT DISTINCT site FROM articles")]
+            else:
+                sites = [site]
+        
+        recompressed = 0
+        for name in sites:
+            self._train_dictionaries([name])
+            with self.get_connection() as conn:
+                recompressed += self._recompress_site(conn, name, self._site_codec(conn, name))
+        return recompressed
+    
     def save_article(self, url: str, title: str, content: str, site: str) -> Optional[int]:
-        """Save a single article, return article ID if saved or None if duplicate."""
+        """Save a single article, return article ID if saved or None if duplicate.
+        
+        URLs are stored canonicalized, so variants of a page collapse into one row.
+        """
+        url = canonicalize_url(url)
         word_count = len(content.split())
         
         try:
             with self.get_connection() as conn:
+                stored, codec_name = self._encode_content(conn, site, content)
                 cursor = conn.execute("""
-                    INSERT INTO articles (url, title, content, site, word_count)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (url, title, content, site, word_count))
-                return cursor.lastrowid
+                    INSERT INTO articles (url, title, content, site, word_count, content_codec)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (url, title, stored, site, word_count, codec_name))
+                article_id = cursor.lastrowid
         except sqlite3.IntegrityError:
             # URL already exists
             return None
+        self._train_dictionaries([site])
+        return article_id
+        
+    def upsert_article(self, url: str, title: str, content: str, site: str) -> bool:
+        """Save an article or overwrite the stored one (re-extraction); True if it was new."""
+        url = canonicalize_url(url)
+        word_count = len(content.split())
+        with self.get_connection() as conn:
+            exists = conn.execute("SELECT 1 FROM articles WHERE url = ?", (url,)).fetchone()
+            stored, codec_name = self._encode_content(conn, site, content)
+            conn.execute("""
+                INSERT INTO articles (url, title, content, site, word_count, content_codec)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    title = excluded.title,
+                    content = excluded.content,
+                    word_count = excluded.word_count,
+                    content_codec = excluded.content_codec
+            """, (url, title, stored, site, word_count, codec_name))
+        self._train_dictionaries([site])
+        return exists is None
+        
+    def filter_known_urls(self, urls: List[str]) -> Set[str]:
+        """The subset of URLs already stored as articles, looked up in batches."""
+        known = set()
+        canonical = {}  # Canonical URL -> URLs given for it
+        for url in urls:
+            canonical.setdefault(canonicalize_url(url), []).append(url)
+        keys = list(canonical)
+        with self.get_connection() as conn:
+            for start in range(0, len(keys), 500):  # Below SQLite's bound parameter limit
+                batch = keys[start:start + 500]
+                cursor = conn.execute(
+                    f"SELECT url FROM articles WHERE url IN ({','.join('?' * len(batch))})", batch
+                )
+                for row in cursor.fetchall():
+                    known.update(canonical[row['url']])
+        return known
+        
+    def save_article_batch(self, items: List[Dict[str, Any]]) -> List[Optional[int]]:
+        """Save articles in one transaction, return each one's ID or None if duplicate.
+        
+        Items hold url, title, content and site, plus optional session_id and
+        page_url to mark the fetched URL done in that session (checkpoints).
+        Items with replace overwrite the stored article of their URL (pages
+        that changed since they were scraped) instead of counting as duplicates.
+        """
+        results = []
+        with self.get_connection() as conn:
+            for item in items:
+                url = canonicalize_url(item['url'])
+                stored, codec_name = self._encode_content(conn, item['site'], item['content'])
+                values = (url, item['title'], stored, item['site'], len(item['content'].split()), codec_name)
+                if item.get('replace'):
+                    conn.execute("""
+                        INSERT INTO articles (url, title, content, site, word_count, content_codec)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(url) DO UPDATE SET
+                            title = excluded.title,
+                            content = excluded.content,
+                            word_count = excluded.word_count,
+                            content_codec = excluded.content_codec,
+                            scraped_at = CURRENT_TIMESTAMP
+                    """, values)
+                    results.append(conn.execute("SELECT id FROM articles WHERE url = ?", (url,)).fetchone()['id'])
+                else:
+                    cursor = conn.execute("""
+                        INSERT INTO articles (url, title, content, site, word_count, content_codec)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(url) DO NOTHING
+                    """, values)
+                    results.append(cursor.lastrowid if cursor.rowcount == 1 else None)
+                if item.get('session_id') is not None:
+                    # The article may be stored under its rel=canonical URL, not the fetched one
+                    conn.execute("""
+                        UPDATE session_urls
+                        SET status = 'done', article_url = ?, updated_at = CURRENT_TIMESTAMP
+                        WHERE session_id = ? AND url = ?
+                    """, (url, item['session_id'], item.get('page_url') or item['url']))
+        self._train_dictionaries([item['site'] for item in items])
+        return results
         
     def save_articles(self, articles: List[Article], site: str) -> Dict[str, int]:
         """Batch save multiple articles."""
-        saved = 0
-        duplicates = 0
-        
-        for article in articles:
-            result = self.save_article(article.url, article.title, article.content, site)
-            if result is not None:
-                saved += 1
-            else:
-                duplicates += 1
+        results = self.save_article_batch([
+            {'url': article.url, 'title': article.title, 'content': article.content, 'site': site}
+            for article in articles
+        ])
+        saved = sum(1 for result in results if result is not None)
+        duplicates = len(results) - saved
         
         return {
             'saved': saved,
@@ -93,34 +449,45 @@ class Database:
         }
         
     def get_article_by_url(self, url: str) -> Optional[Dict[str, Any]]:
-        """Retrieve article by URL."""
+        """Retrieve article by URL (any variant of its canonical URL)."""
         with self.get_connection() as conn:
             cursor = conn.execute("""
                 SELECT * FROM articles WHERE url = ?
-            """, (url,))
+            """, (canonicalize_url(url),))
             row = cursor.fetchone()
-            return dict(row) if row else None
+            return self._article_row(conn, row) if row else None
         
-    def get_articles_by_site(self, site: str, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get articles for a specific site."""
+    def get_article_timestamps(self, site: str) -> Dict[str, str]:
+        """Map every stored article URL for a site to when it was scraped."""
         with self.get_connection() as conn:
             cursor = conn.execute("""
-                SELECT * FROM articles 
+                SELECT url, scraped_at FROM articles WHERE site = ?
+            """, (site,))
+            return {row['url']: row['scraped_at'] for row in cursor.fetchall()}
+        
+    def get_articles_by_site(self, site: str, limit: int = 100,
+                             include_content: bool = True) -> List[Dict[str, Any]]:
+        """Get articles for a specific site (without content for listings)."""
+        columns = '*' if include_content else LISTING_COLUMNS
+        with self.get_connection() as conn:
+            cursor = conn.execute(f"""
+                SELECT {columns} FROM articles 
                 WHERE site = ? 
                 ORDER BY scraped_at DESC 
                 LIMIT ?
             """, (site, limit))
-            return [dict(row) for row in cursor.fetchall()]
+            return [self._article_row(conn, row) for row in cursor.fetchall()]
         
-    def get_all_articles(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get all articles."""
+    def get_all_articles(self, limit: int = 100, include_content: bool = True) -> List[Dict[str, Any]]:
+        """Get all articles (without content for listings)."""
+        columns = '*' if include_content else LISTING_COLUMNS
         with self.get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT * FROM articles 
+            cursor = conn.execute(f"""
+                SELECT {columns} FROM articles 
                 ORDER BY scraped_at DESC 
                 LIMIT ?
             """, (limit,))
-            return [dict(row) for row in cursor.fetchall()]
+            return [self._article_row(conn, row) for row in cursor.fetchall()]
         
     def get_stats(self) -> Dict[str, Any]:
         """Calculate database statistics."""
@@ -148,28 +515,105 @@ class Database:
                 'articles_by_site': articles_by_site
             }
     
-    def start_session(self, site: str) -> int:
+    def start_session(self, site: str, homepage_url: Optional[str] = None) -> int:
         """Start a new scraping session."""
         with self.get_connection() as conn:
             cursor = conn.execute("""
-                INSERT INTO scraping_sessions (site)
-                VALUES (?)
-            """, (site,))
+                INSERT INTO scraping_sessions (site, homepage_url)
+                VALUES (?, ?)
+            """, (site, homepage_url))
             return cursor.lastrowid
     
-    def finish_session(self, session_id: int, articles_scraped: int, error_message: Optional[str] = None):
-        """Finish a scraping session."""
-        status = 'failed' if error_message else 'completed'
+    def finish_session(self, session_id: int, articles_scraped: int, error_message: Optional[str] = None,
+                       pages_fetched: Optional[int] = None, pages_extracted: Optional[int] = None):
+        """Finish a scraping session, recording its extraction success counts if given.
         
+        A session whose URLs did not all succeed is 'partial' rather than
+        'completed', so it stays resumable.
+        """
         with self.get_connection() as conn:
+            if error_message:
+                status = 'failed'
+            else:
+                failed = conn.execute("""
+                    SELECT 1 FROM session_urls WHERE session_id = ? AND status = 'failed' LIMIT 1
+                """, (session_id,)).fetchone()
+                status = 'partial' if failed else 'completed'
             conn.execute("""
                 UPDATE scraping_sessions 
                 SET finished_at = CURRENT_TIMESTAMP,
                     articles_scraped = ?,
                     status = ?,
-                    error_message = ?
+                    error_message = ?,
+                    pages_fetched = COALESCE(?, pages_fetched),
+                    pages_extracted = COALESCE(?, pages_extracted)
                 WHERE id = ?
-            """, (articles_scraped, status, error_message, session_id))
+            """, (articles_scraped, status, error_message, pages_fetched, pages_extracted, session_id))
+    
+    def get_session(self, session_id: int) -> Optional[Dict[str, Any]]:
+        """Retrieve a scraping session by ID."""
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT * FROM scraping_sessions WHERE id = ?
+            """, (session_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def checkpoint_frontier(self, session_id: int, urls: List[str]):
+        """Record URLs a session is going to scrape (already known URLs keep their status)."""
+        with self.get_connection() as conn:
+            conn.executemany("""
+                INSERT OR IGNORE INTO session_urls (session_id, url)
+                VALUES (?, ?)
+            """, [(session_id, url) for url in urls])
+    
+    def mark_session_url(self, session_id: int, url: str, status: str):
+        """Update the checkpoint status ('pending', 'done' or 'failed') of a URL."""
+        with self.get_connection() as conn:
+            conn.execute("""
+                UPDATE session_urls
+                SET status = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE session_id = ? AND url = ?
+            """, (status, session_id, url))
+    
+    def get_session_urls(self, session_id: int, statuses: List[str]) -> List[str]:
+        """Get a session's checkpointed URLs with any of the given statuses."""
+        placeholders = ', '.join('?' for _ in statuses)
+        with self.get_connection() as conn:
+            cursor = conn.execute(f"""
+                SELECT url FROM session_urls
+                WHERE session_id = ? AND status IN ({placeholders})
+                ORDER BY rowid
+            """, (session_id, *statuses))
+            return [row['url'] for row in cursor.fetchall()]
+    
+    def get_session_article_urls(self, session_id: int) -> List[str]:
+        """URLs the articles of a session's done URLs are stored under."""
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT COALESCE(article_url, url) AS article_url FROM session_urls
+                WHERE session_id = ? AND status = 'done'
+                ORDER BY rowid
+            """, (session_id,))
+            return list(dict.fromkeys(row['article_url'] for row in cursor.fetchall()))
+    
+    def get_interrupted_sessions(self, site: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get unfinished, failed or partial sessions that still have checkpointed work left."""
+        query = """
+            SELECT s.*, COUNT(u.url) AS pending_urls
+            FROM scraping_sessions s
+            JOIN session_urls u ON u.session_id = s.id AND u.status != 'done'
+            WHERE s.status IN ('running', 'failed', 'partial')
+        """
+        params: tuple = ()
+        if site:
+            query += " AND s.site = ?"
+            params = (site,)
+        query += " GROUP BY s.id ORDER BY s.started_at DESC"
+        
+        with self.get_connection() as conn:
+            cursor = conn.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
     
     def get_recent_sessions(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent scraping sessions."""
@@ -179,4 +623,167 @@ class Database:
                 ORDER BY started_at DESC 
                 LIMIT ?
             """, (limit,))
-            return [dict(row) for row in cursor.fetchall()]
\ No newline at end of file
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def save_scraper_spec(self, site: str, spec_json: str):
+        """Store (or replace) the scraper spec for a site."""
+        with self.get_connection() as conn:
+            conn.execute("""
+                INSERT INTO scraper_specs (site, spec)
+                VALUES (?, ?)
+                ON CONFLICT(site) DO UPDATE SET spec = excluded.spec, updated_at = CURRENT_TIMESTAMP
+            """, (site, spec_json))
+    
+    def get_scraper_spec(self, site: str) -> Optional[str]:
+        """Get the stored scraper spec JSON for a site."""
+        with self.get_connection() as conn:
+            cursor = conn.execute("SELECT spec FROM scraper_specs WHERE site = ?", (site,))
+            row = cursor.fetchone()
+            return row['spec'] if row else None
+    
+    def delete_scraper_spec(self, site: str):
+        """Remove a site's scraper spec so the next run regenerates it."""
+        with self.get_connection() as conn:
+            conn.execute("DELETE FROM scraper_specs WHERE site = ?", (site,))
+    
+    def clear_scraper_specs(self):
+        """Remove all stored scraper specs."""
+        with self.get_connection() as conn:
+            conn.execute("DELETE FROM scraper_specs")
+    
+    def record_selector_stats(self, site: str, counts: List[tuple]):
+        """Add (field, selector, hits, attempts) counts to a site's selector statistics."""
+        with self.get_connection() as conn:
+            conn.executemany("""
+                INSERT INTO selector_stats (site, field, selector, hits, attempts)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(site, field, selector) DO UPDATE SET
+                    hits = hits + excluded.hits,
+                    attempts = attempts + excluded.attempts
+            """, [(site, name, selector, hits, attempts) for name, selector, hits, attempts in counts])
+    
+    def get_selector_stats(self, site: str) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Get a site's selector statistics as {field: {selector: {'hits', 'attempts'}}}."""
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT field, selector, hits, attempts FROM selector_stats WHERE site = ?
+            """, (site,))
+            stats: Dict[str, Dict[str, Dict[str, int]]] = {}
+            for row in cursor.fetchall():
+                stats.setdefault(row['field'], {})[row['selector']] = {
+                    'hits': row['hits'], 'attempts': row['attempts']
+                }
+            return stats
+    
+    def add_template(self, site: str, signature_json: str, selectors_json: str, band_keys: List[str]) -> int:
+        """Store a site's page template fingerprint with its LSH band keys, replacing its previous one."""
+        with self.get_connection() as conn:
+            # Regenerating a site's scraper must not pile up stale templates
+            conn.execute("""
+                DELETE FROM template_bands WHERE template_id IN (SELECT id FROM templates WHERE site = ?)
+            """, (site,))
+            conn.execute("DELETE FROM templates WHERE site = ?", (site,))
+            cursor = conn.execute("""
+                INSERT INTO templates (site, signature, selectors)
+                VALUES (?, ?, ?)
+            """, (site, signature_json, selectors_json))
+            template_id = cursor.lastrowid
+            conn.executemany("""
+                INSERT OR IGNORE INTO template_bands (band_key, template_id)
+                VALUES (?, ?)
+            """, [(key, template_id) for key in band_keys])
+            return template_id
+    
+    def find_template_candidates(self, band_keys: List[str]) -> List[Dict[str, Any]]:
+        """Get templates sharing at least one LSH band key."""
+        placeholders = ', '.join('?' for _ in band_keys)
+        with self.get_connection() as conn:
+            cursor = conn.execute(f"""
+                SELECT * FROM templates WHERE id IN (
+                    SELECT template_id FROM template_bands WHERE band_key IN ({placeholders})
+                )
+            """, band_keys)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_site_sessions(self, site: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Get the most recent finished sessions for a site, oldest first."""
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT * FROM (
+                    SELECT * FROM scraping_sessions
+                    WHERE site = ? AND status IN ('completed', 'partial')
+                    ORDER BY started_at DESC, id DESC
+                    LIMIT ?
+                ) ORDER BY started_at ASC, id ASC
+            """, (site, limit))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def register_site_schedule(self, site: str, homepage_url: str):
+        """Add a site to the recurring scrape schedule (no-op if already present)."""
+        with self.get_connection() as conn:
+            conn.execute("""
+                INSERT INTO site_schedule (site, homepage_url)
+                VALUES (?, ?)
+                ON CONFLICT(site) DO UPDATE SET homepage_url = excluded.homepage_url
+            """, (site, homepage_url))
+    
+    def update_site_schedule(self, site: str, **fields: Any):
+        """Update scheduling state columns for a site."""
+        allowed = {'change_rate', 'last_run_at', 'next_run_at', 'etag', 'last_modified'}
+        unknown = set(fields) - allowed
+        if unknown:
+            raise ValueError(f"Unknown site_schedule fields: {sorted(unknown)}")
+        if not fields:
+            return
+        
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with self.get_connection() as conn:
+            conn.execute(f"""
+                UPDATE site_schedule SET {assignments} WHERE site = ?
+            """, (*fields.values(), site))
+    
+    def get_site_schedules(self) -> List[Dict[str, Any]]:
+        """Get scheduling state for all registered sites."""
+        with self.get_connection() as conn:
+            cursor = conn.execute("SELECT * FROM site_schedule ORDER BY site")
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def record_request_spend(self, spent_at: float, cost: int):
+        """Record requests spent against the scheduler budget (Unix time)."""
+        with self.get_connection() as conn:
+            conn.execute("INSERT INTO request_spend (spent_at, cost) VALUES (?, ?)", (spent_at, cost))
+    
+    def get_request_spend(self, since: float) -> int:
+        """Requests spent since a Unix time, dropping older records."""
+        with self.get_connection() as conn:
+            conn.execute("DELETE FROM request_spend WHERE spent_at < ?", (since,))
+            row = conn.execute("SELECT SUM(cost) FROM request_spend WHERE spent_at >= ?", (since,)).fetchone()
+            return row[0] or 0
+    
+    def get_request_spends(self, since: float) -> List[Tuple[float, int]]:
+        """(spent_at, cost) of the requests spent since a Unix time, oldest first."""
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT spent_at, cost FROM request_spend WHERE spent_at >= ? ORDER BY spent_at
+            """, (since,))
+            return [(row['spent_at'], row['cost']) for row in cursor.fetchall()]
+
+
+_databases: Dict[str, Database] = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(db_path: str = "articles.db") -> Database:
+    """Return the process-wide Database for a path, creating it on first use.
+    
+    The schema is checked once and every thread keeps its connection open,
+    so repeated calls in a long-running process do not reconnect.
+    """
+    database = _databases.get(db_path)
+    if database is None:
+        with _databases_lock:
+            database = _databases.get(db_path)
+            if database is None:
+                database = _databases[db_path] = Database(db_path, persistent=True)
+    return database
+
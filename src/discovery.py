@@ -0,0 +1,248 @@
+from typing import List, Dict, Any, Optional, Iterator, Tuple, Callable
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin, urlparse
+import gzip
+import requests
+from lxml import etree
+from src.fetch import FetchClient, get_client
+
+
+# (url, lastmod) pairs yielded by sitemap and feed parsers
+Entry = Tuple[str, Optional[datetime]]
+
+
+def _local_name(element: etree._Element) -> str:
+    """Tag name without its XML namespace."""
+    return etree.QName(element).localname.lower() if isinstance(element.tag, str) else ''
+
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    """Parse W3C datetime (sitemaps/Atom) or RFC 822 (RSS) dates to aware UTC."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+class SitemapDiscovery:
+    """Discover article URLs from robots.txt sitemaps and RSS/Atom feeds.
+
+    Sitemaps (including sitemap indexes and gzipped sitemaps) are streamed
+    through lxml's incremental parser, so even very large files are never held
+    in memory. Sitemaps are treated as a complete listing of the site; feeds
+    only list recent items and are used for incremental refreshes. Every
+    request goes through the FetchClient, so it is paced by the host's rate
+    limiter and retried on 429/503 like article fetches.
+    """
+
+    FEED_TYPES = ('application/rss+xml', 'application/atom+xml')
+    DEFAULT_SITEMAP_PATHS = ('/sitemap.xml', '/sitemap_index.xml')
+
+    def __init__(self, base_url: str, client: Optional[FetchClient] = None,
+                 url_filter: Optional[Callable[[str], bool]] = None,
+                 max_sitemaps: int = 50,
+                 canonicalize: Optional[Callable[[str], str]] = None):
+        """Initialize with base URL, HTTP client, an optional article URL filter and URL canonicalizer."""
+        self.base_url = base_url.rstrip('/')
+        self.domain = urlparse(base_url).netloc
+        self.client = client or get_client()
+        self.url_filter = url_filter
+        self.canonicalize = canonicalize
+        self.max_sitemaps = max_sitemaps
+
+    def find_sitemap_urls(self) -> List[str]:
+        """Read Sitemap: lines from robots.txt, falling back to the usual locations."""
+        sitemap_urls = []
+        try:
+            response = self.client.get(urljoin(self.base_url + '/', 'robots.txt'), timeout=10)
+            if response.ok:
+                for line in response.text.splitlines():
+                    name, _, value = line.partition(':')
+                    if name.strip().lower() == 'sitemap' and value.strip():
+                        sitemap_urls.append(urljoin(self.base_url, value.strip()))
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching robots.txt: {e}")
+
+        if not sitemap_urls:
+            sitemap_urls = [self.base_url + path for path in self.DEFAULT_SITEMAP_PATHS]
+        return sitemap_urls
+
+    def find_feed_urls(self, homepage_html: Optional[bytes] = None) -> List[str]:
+        """Find RSS/Atom feeds advertised with <link rel="alternate"> on the homepage."""
+        if homepage_html is None:
+            try:
+                response = self.client.get(self.base_url, timeout=10)
+                response.raise_for_status()
+                homepage_html = response.content
+            except requests.exceptions.RequestException as e:
+                print(f"Error fetching homepage for feeds: {e}")
+                return []
+
+        feed_urls = []
+        root = etree.fromstring(homepage_html, etree.HTMLParser()) if homepage_html else None
+        if root is None:
+            return feed_urls
+        for link in root.iter('link'):
+            rel = (link.get('rel') or '').lower().split()
+            if 'alternate' in rel and (link.get('type') or '').lower() in self.FEED_TYPES and link.get('href'):
+                feed_urls.append(urljoin(self.base_url, link.get('href')))
+        return feed_urls
+
+    def _open_stream(self, url: str) -> Optional[requests.Response]:
+        """Open a streaming response, or None if the document is missing."""
+        try:
+            response = self.client.get(url, timeout=10, stream=True)
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching {url}: {e}")
+            return None
+        if not response.ok:
+            response.close()
+            return None
+        # Let urllib3 undo Content-Encoding while streaming
+        response.raw.decode_content = True
+        return response
+
+    def _iter_xml(self, url: str) -> Iterator[etree._Element]:
+        """Stream a (possibly gzipped) XML document, yielding completed elements."""
+        response = self._open_stream(url)
+        if response is None:
+            return
+
+        try:
+            stream = response.raw
+            content_type = response.headers.get('Content-Type', '').lower()
+            if url.lower().endswith('.gz') or 'gzip' in content_type:
+                stream = gzip.GzipFile(fileobj=stream)
+
+            for _, element in etree.iterparse(stream, events=('end',), recover=True,
+                                              resolve_entities=False, no_network=True):
+                yield element
+                # Free parsed entries as we go so memory stays flat
+                if _local_name(element) in ('url', 'sitemap', 'item', 'entry'):
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del element.getparent()[0]
+        except (etree.XMLSyntaxError, OSError, EOFError) as e:
+            print(f"Error parsing {url}: {e}")
+        finally:
+            response.close()
+
+    def iter_sitemap_entries(self, sitemap_url: str) -> Iterator[Entry]:
+        """Yield (url, lastmod) for every page in a sitemap, following sitemap indexes."""
+        pending = [sitemap_url]
+        visited = set()
+
+        while pending and len(visited) < self.max_sitemaps:
+            current = pending.pop(0)
+            if current in visited:
+                continue
+            visited.add(current)
+
+            for element in self._iter_xml(current):
+                name = _local_name(element)
+                if name not in ('url', 'sitemap'):
+                    continue
+
+                fields = {_local_name(child): (child.text or '').strip() for child in element}
+                loc = fields.get('loc')
+                if not loc:
+                    continue
+
+                if name == 'sitemap':
+                    pending.append(urljoin(current, loc))
+                else:
+                    yield urljoin(current, loc), _parse_date(fields.get('lastmod'))
+
+    def iter_feed_entries(self, feed_url: str) -> Iterator[Entry]:
+        """Yield (url, updated) for every RSS item or Atom entry in a feed."""
+        for element in self._iter_xml(feed_url):
+            name = _local_name(element)
+            if name not in ('item', 'entry'):
+                continue
+
+            link = None
+            updated = None
+            for child in element:
+                child_name = _local_name(child)
+                if child_name == 'link':
+                    # RSS puts the URL in the text, Atom in href (prefer rel="alternate")
+                    href = child.get('href') or (child.text or '').strip()
+                    if href and (link is None or child.get('rel', 'alternate') == 'alternate'):
+                        link = href
+                elif child_name in ('updated', 'pubdate', 'published', 'lastbuilddate') and updated is None:
+                    updated = _parse_date(child.text)
+
+            if link:
+                yield urljoin(feed_url, link), updated
+
+    def _accept(self, url: str) -> bool:
+        """Check that a discovered URL belongs to this site and looks like an article."""
+        if urlparse(url).netloc != self.domain:
+            return False
+        return self.url_filter(url) if self.url_filter else True
+
+    def discover(self, known_urls: Optional[Dict[str, str]] = None,
+                 use_feeds: bool = False) -> Dict[str, Any]:
+        """Discover article URLs, skipping stored articles that have not changed since.
+
+        Args:
+            known_urls: Mapping of stored article URL to its scraped_at timestamp
+            use_feeds: Also read RSS/Atom feeds (recent items only, for incremental runs)
+
+        Returns:
+            Dict with article_urls, sources that listed them, skipped_unchanged count
+            and complete (True when a sitemap listed the whole site)
+        """
+        known_urls = known_urls or {}
+        article_urls: Dict[str, None] = {}  # Ordered set
+        sources = []
+        skipped = 0
+
+        def consider(entries: Iterator[Entry]) -> bool:
+            nonlocal skipped
+            found = False
+            for url, lastmod in entries:
+                found = True
+                if self.canonicalize is not None:
+                    url = self.canonicalize(url)
+                if not self._accept(url) or url in article_urls:
+                    continue
+                if url in known_urls:
+                    stored_at = _parse_date(known_urls[url])
+                    # Without a newer lastmod there is nothing new to fetch
+                    if lastmod is None or stored_at is None or lastmod <= stored_at:
+                        skipped += 1
+                        continue
+                article_urls[url] = None
+            return found
+
+        for sitemap_url in self.find_sitemap_urls():
+            if consider(self.iter_sitemap_entries(sitemap_url)):
+                sources.append(sitemap_url)
+        complete = bool(sources)
+
+        if use_feeds:
+            for feed_url in self.find_feed_urls():
+                if consider(self.iter_feed_entries(feed_url)):
+                    sources.append(feed_url)
+
+        if sources:
+            print(f"🗺️  Discovered {len(article_urls)} article URLs from {len(sources)} sitemaps/feeds "
+                  f"({skipped} unchanged)")
+
+        return {
+            'article_urls': list(article_urls),
+            'sources': sources,
+            'skipped_unchanged': skipped,
+            'complete': complete
+        }
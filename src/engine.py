@@ -0,0 +1,495 @@
+from typing import List, Dict, Any, Optional, Callable, Set
+from dataclasses import dataclass, field, asdict, fields
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+import contextlib
+import io
+import json
+import os
+import threading
+from src.main import Article
+from src.canonical import URLCanonicalizer, canonical_link
+from src.content_extractor import content_extractor
+from src.parsing import parse_html, PARSE_TARGETS, response_encoding, sniff_encoding
+from src.selector_cache import compile_selector, is_valid_selector, select, select_one
+from src.url_pattern import URLPattern
+
+
+SPEC_VERSION = 1
+
+# A run whose extraction success rate falls below this (over at least
+# DRIFT_MIN_PAGES fetched pages) means the site's template changed
+DRIFT_THRESHOLD = 0.5
+DRIFT_MIN_PAGES = 3
+
+# Kept in strained parses so articles are stored under their canonical URL
+CANONICAL_LINK = 'link[rel=canonical]'
+
+
+@dataclass
+class ScraperSpec:
+    """Compact, data-only description of how to scrape one site.
+
+    Replaces per-site generated modules: the same engine runs every spec.
+    `discovery` is 'crawl' (walk listing pages and pagination with the
+    analyzer's article URL heuristics) or 'links' (follow the article_links
+    selector on the homepage only). `fallbacks` holds, per field, the
+    selectors tried in order when the primary one in `selectors` misses.
+    `url_patterns` are the article URL path templates learned for the site
+    (see url_pattern.py); without them discovery uses generic heuristics.
+    Incremental crawls stop paginating a listing after
+    `stop_after_known_pages` consecutive pages of already stored articles.
+    `canonical_rules` are the site's URL canonicalization rules (see
+    canonical.py), applied to every discovered URL before it is fetched.
+    """
+    scraper_name: str
+    site_url: str
+    selectors: Dict[str, str]
+    discovery: str = 'crawl'
+    max_listing_pages: int = 15
+    stop_after_known_pages: int = 2
+    max_articles: Optional[int] = None
+    timeout: float = 10
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    fallbacks: Dict[str, List[str]] = field(default_factory=dict)
+    url_patterns: List[str] = field(default_factory=list)
+    canonical_rules: Dict[str, Any] = field(default_factory=dict)
+    version: int = SPEC_VERSION
+
+    def to_json(self) -> str:
+        """Serialize spec to JSON."""
+        return json.dumps(asdict(self), sort_keys=True)
+
+    def compile_selectors(self):
+        """Compile every selector up front; raises InvalidSelectorError on a bad primary one.
+
+        Fallback selectors that do not compile are dropped from their chain.
+        """
+        for selector in self.selectors.values():
+            compile_selector(selector)
+        for name, chain in self.fallbacks.items():
+            self.fallbacks[name] = [selector for selector in chain if is_valid_selector(selector)]
+
+    def selector_chain(self, name: str, default: str) -> List[str]:
+        """Primary selector of a field followed by its fallbacks, without duplicates."""
+        primary = self.selectors.get(name, default)
+        return [primary] + [selector for selector in dict.fromkeys(self.fallbacks.get(name, []))
+                            if selector != primary]
+
+    def article_url_pattern(self) -> Optional[URLPattern]:
+        """Compiled article URL templates, or None when none were learned."""
+        return URLPattern(self.url_patterns) if self.url_patterns else None
+
+    def canonicalizer(self) -> URLCanonicalizer:
+        """The site's URL canonicalizer."""
+        return URLCanonicalizer.from_dict(self.canonical_rules)
+
+    def reorder_chains(self, selector_stats: Dict[str, Dict[str, Dict[str, int]]]) -> bool:
+        """Put the selector that usually matches first in each fallback chain.
+
+        Args:
+            selector_stats: {field: {selector: {'hits': n, 'attempts': m}}} for the site
+
+        Returns:
+            True if any chain changed order
+        """
+        changed = False
+        for name, counts in selector_stats.items():
+            if name not in self.fallbacks:
+                continue
+            chain = self.selector_chain(name, self.selectors.get(name, ''))
+
+            def hit_rate(selector: str) -> float:
+                # Laplace smoothing: untried selectors rank as 50/50
+                stats = counts.get(selector, {})
+                return (stats.get('hits', 0) + 1) / (stats.get('attempts', 0) + 2)
+
+            ordered = sorted(chain, key=hit_rate, reverse=True)
+            if ordered != chain:
+                self.selectors[name] = ordered[0]
+                self.fallbacks[name] = ordered[1:]
+                changed = True
+        return changed
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ScraperSpec':
+        """Build a spec from a dict, ignoring keys this version does not know."""
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+    @classmethod
+    def from_json(cls, text: str) -> 'ScraperSpec':
+        """Deserialize spec from JSON."""
+        return cls.from_dict(json.loads(text))
+
+
+class ExtractionStats:
+    """Per-run counts of fetched article pages and successful extractions.
+
+    Pages that failed to download are not counted: only extraction misses on
+    pages that were fetched indicate that the selectors no longer match.
+    Pages only the selector-free content extractor could handle count as
+    extracted, but as selector misses for drift detection.
+    """
+
+    def __init__(self):
+        self.fetched = 0
+        self.extracted = 0
+        self.failed_urls: List[str] = []
+        self.fallback_urls: List[str] = []
+        self.selector_hits: Counter = Counter()      # (field, selector) -> matches
+        self.selector_attempts: Counter = Counter()  # (field, selector) -> lookups
+        self._lock = threading.Lock()  # Updated from worker threads
+
+    def record(self, url: str, extracted: bool):
+        """Record the extraction outcome of one fetched page."""
+        with self._lock:
+            self.fetched += 1
+            if extracted:
+                self.extracted += 1
+            else:
+                self.failed_urls.append(url)
+
+    def record_lookup(self, name: str, tried: List[str], matched: Optional[str]):
+        """Record which selectors of a field's chain were tried and which one matched."""
+        with self._lock:
+            for selector in tried:
+                self.selector_attempts[(name, selector)] += 1
+            if matched is not None:
+                self.selector_hits[(name, matched)] += 1
+
+    def record_fallback(self, url: str):
+        """Record a page whose content was found without the spec's selectors."""
+        with self._lock:
+            self.fallback_urls.append(url)
+
+    def selector_counts(self) -> List[tuple]:
+        """(field, selector, hits, attempts) rows for every selector tried this run."""
+        return [
+            (name, selector, self.selector_hits[(name, selector)], attempts)
+            for (name, selector), attempts in self.selector_attempts.items()
+        ]
+
+    @property
+    def success_rate(self) -> float:
+        """Share of fetched pages that yielded an article (1.0 if none were fetched)."""
+        return self.extracted / self.fetched if self.fetched else 1.0
+
+    @property
+    def selector_miss_urls(self) -> List[str]:
+        """Pages the spec's selectors failed on, whether or not the fallback rescued them."""
+        return self.failed_urls + self.fallback_urls
+
+    def drifted(self, threshold: float = DRIFT_THRESHOLD, min_pages: int = DRIFT_MIN_PAGES) -> bool:
+        """Whether this run suggests the site's template no longer matches the selectors."""
+        if self.fetched < min_pages:
+            return False
+        return (self.extracted - len(self.fallback_urls)) / self.fetched < threshold
+
+
+def discover_article_urls(spec: ScraperSpec, homepage_url: str,
+                          known_urls: Optional[Callable[[List[str]], Set[str]]] = None) -> List[str]:
+    """Find article URLs with the spec's discovery strategy.
+
+    With a known_urls lookup, crawls stop paginating once they reach
+    listing pages of already known articles.
+    """
+    from src.fetch import get_client  # Extraction-only users never load the HTTP stack
+    client = get_client()
+
+    if spec.discovery == 'links':
+        response = client.get(homepage_url, timeout=spec.timeout)
+        response.raise_for_status()
+        selector = spec.selectors.get('article_links', 'a')
+        homepage_soup = parse_html(response.content, PARSE_TARGETS, [selector],
+                                   from_encoding=response_encoding(response))
+
+        print(f"🔍 Looking for article links with selector: '{selector}'")
+        url_pattern = spec.article_url_pattern()
+        canonicalizer = spec.canonicalizer()
+        urls = {}
+        for link_element in select(homepage_soup, selector):
+            href = link_element.get('href')
+            if not href:
+                continue
+            url = canonicalizer.canonicalize(urljoin(homepage_url, href))
+            if url_pattern is None or url_pattern.matches(url):
+                urls[url] = None
+        return list(urls)
+
+    # Sitemaps were already tried upstream by get_articles
+    from src.analyzer import HTMLAnalyzer
+    analysis = HTMLAnalyzer(homepage_url, spec.article_url_pattern(), spec.canonicalizer()).analyze_homepage(
+        max_pages=spec.max_listing_pages, use_sitemaps=False,
+        known_urls=known_urls, stop_after_known_pages=spec.stop_after_known_pages
+    )
+    return analysis['article_links']
+
+
+def _select_first(soup, chain: List[str]) -> tuple:
+    """First element with text matched by a selector chain, the matching selector and those tried."""
+    tried = []
+    for selector in chain:
+        tried.append(selector)
+        element = select_one(soup, selector)
+        if element is not None and element.get_text(strip=True):
+            return element, selector, tried
+    return None, None, tried
+
+
+def extract_article(spec: ScraperSpec, html: bytes, article_url: str,
+                    stats: Optional[ExtractionStats] = None,
+                    encoding: Optional[str] = None) -> Optional[Article]:
+    """Extract title and content from an article page using the spec's selector chains.
+
+    Pages are parsed from their raw bytes; pass the response's encoding
+    (see parsing.response_encoding) so the charset is resolved only once.
+    The article is stored under the page's same-host <link rel="canonical">
+    URL when it has one.
+    """
+    title_chain = spec.selector_chain('title', 'h1')
+    content_chain = spec.selector_chain('content', 'article')
+    if isinstance(html, bytes) and encoding is None:
+        encoding = sniff_encoding(html)
+
+    # Only build the subtrees the primary selectors can match in (e.g. skip nav, footer)
+    article_soup = parse_html(html, PARSE_TARGETS, [title_chain[0], content_chain[0], CANONICAL_LINK],
+                              from_encoding=encoding)
+    title_element, title_selector, title_tried = _select_first(article_soup, title_chain[:1])
+    content_element, content_selector, content_tried = _select_first(article_soup, content_chain[:1])
+
+    if title_element is None or content_element is None:
+        # A primary selector missed or depends on context outside the kept subtrees:
+        # parse everything and walk the fallback chains
+        article_soup = parse_html(html, from_encoding=encoding)
+        title_element, title_selector, title_tried = _select_first(article_soup, title_chain)
+        content_element, content_selector, content_tried = _select_first(article_soup, content_chain)
+
+    if stats is not None:
+        stats.record_lookup('title', title_tried, title_selector)
+        stats.record_lookup('content', content_tried, content_selector)
+
+    # Extract title
+    if not title_element:
+        print(f"   ⚠️  No title found with selectors: {title_chain}")
+        return None
+
+    title = title_element.get_text(strip=True)
+
+    # Extract content: paragraph text of the matched block, minus boilerplate
+    if content_element:
+        content = content_extractor.content_text(content_element)
+    else:
+        # Selector-free fallback: score every block of the (fully parsed) page
+        print(f"   ⚠️  No content found with selectors: {content_chain}, using content extractor")
+        content = content_extractor.extract(article_soup)
+        if content and stats is not None:
+            stats.record_fallback(article_url)
+
+    if not content:
+        print(f"   ⚠️  No article content found")
+        return None
+
+    canonical_url = canonical_link(article_soup, article_url)
+    if canonical_url:
+        article_url = spec.canonicalizer().canonicalize(canonical_url)
+    return Article(url=article_url, title=title, content=content)
+
+
+def fetch_article(spec: ScraperSpec, article_url: str,
+                  stats: Optional[ExtractionStats] = None) -> Optional[Article]:
+    """Fetch an article page, archive it and extract its article.
+
+    Raises on request and HTTP errors; returns None when nothing was extracted.
+    """
+    from src.fetch import get_client
+    from src.archive import get_archive
+    client = get_client()
+    archive = get_archive()  # Raw pages are kept for re-extraction when SCRAPER_ARCHIVE_DIR is set
+
+    response = client.get(article_url, timeout=spec.timeout)
+    response.raise_for_status()
+    if archive is not None:
+        archive.append(article_url, response.content, response.headers.get('Content-Type'))
+    article = extract_article(spec, response.content, article_url, stats, response_encoding(response))
+    if stats is not None:
+        stats.record(article_url, article is not None)
+    return article
+
+
+def run_spec(spec: ScraperSpec, homepage_url: str, discovered_urls: Optional[List[str]] = None,
+             checkpoint=None, stats: Optional[ExtractionStats] = None,
+             known_urls: Optional[Callable[[List[str]], Set[str]]] = None) -> List[Article]:
+    """Scrape a site described by a spec.
+
+    Args:
+        spec: Site selectors, discovery strategy and limits
+        homepage_url: URL of the website homepage
+        discovered_urls: Article URLs found upstream (sitemaps, resumed sessions); skips discovery
+        checkpoint: Optional progress recorder (record_frontier/article_done/url_failed)
+            that persists the session so an interrupted run can be resumed
+        stats: Optional ExtractionStats collecting the run's extraction success rate
+        known_urls: Batch lookup of already stored article URLs (incremental runs):
+            discovery stops early and only new articles are scraped
+
+    Returns:
+        List of Article objects with url, title, and content
+    """
+    from src.fetch import get_client
+    client = get_client()
+    articles = []
+
+    try:
+        print(f"🔄 Starting article URL discovery...")
+        if discovered_urls:
+            print(f"🗺️  Using {len(discovered_urls)} article URLs provided by the caller")
+            url_list = discovered_urls
+        else:
+            url_list = discover_article_urls(spec, homepage_url, known_urls)
+            if known_urls is not None:
+                known = known_urls(url_list)
+                print(f"🆕 {len(url_list) - len(known)} of {len(url_list)} discovered articles are new")
+                url_list = [url for url in url_list if url not in known]
+
+        # Variants of the same page (fragments, tracking parameters, ...) are fetched once
+        canonicalizer = spec.canonicalizer()
+        url_list = list(dict.fromkeys(canonicalizer.canonicalize(url) for url in url_list))
+
+        if spec.max_articles is not None:
+            url_list = url_list[:spec.max_articles]
+
+        print(f"📄 Found {len(url_list)} unique article URLs")
+
+        if not url_list:
+            print("⚠️  No article links found. Check the selector or site structure.")
+            return articles
+
+        if checkpoint is not None:
+            url_list = checkpoint.record_frontier(url_list)
+
+    except Exception as e:
+        print(f"❌ Error discovering articles: {e}")
+        return []
+
+    # Pages whose rel=canonical URL was already scraped are duplicates
+    seen_urls = set(url_list)
+    seen_lock = threading.Lock()
+
+    def scrape_article(i: int, article_url: str) -> Optional[Article]:
+        duplicate = False
+        try:
+            print(f"📖 Scraping article {i}/{len(url_list)}: {article_url}")
+            article = fetch_article(spec, article_url, stats)
+            if article is not None and article.url != article_url:
+                with seen_lock:
+                    if article.url in seen_urls:
+                        print(f"   ♻️  Duplicate of {article.url}")
+                        duplicate = True
+                    seen_urls.add(article.url)
+            if article and not duplicate:
+                print(f"   ✅ Scraped: '{article.title[:60]}{'...' if len(article.title) > 60 else ''}' "
+                      f"({len(article.content.split())} words)")
+        except Exception as e:
+            print(f"   ❌ Error scraping {article_url}: {e}")
+            article = None
+
+        if checkpoint is not None:
+            try:
+                if article is not None:
+                    checkpoint.article_done(article.url, article.title, article.content, article_url)
+                else:
+                    checkpoint.url_failed(article_url)
+            except Exception as e:
+                print(f"   ⚠️  Checkpoint failed for {article_url}: {e}")
+        return None if duplicate else article
+
+    # Scrape articles in parallel; the shared client's rate limiter decides
+    # how many requests actually run against the host at once
+    with ThreadPoolExecutor(max_workers=client.max_workers(homepage_url)) as executor:
+        for article in executor.map(scrape_article, range(1, len(url_list) + 1), url_list):
+            if article is not None:
+                articles.append(article)
+
+    print(f"\n🎉 Scraping complete! Found {len(articles)} articles.")
+    return articles
+
+
+def _replay_records(archive_dir: str, spec_json: str, records: List[Dict[str, Any]]) -> List[tuple]:
+    """Re-extract archived pages (runs in a worker process)."""
+    from src.archive import PageArchive
+
+    spec = ScraperSpec.from_json(spec_json)
+    archive = PageArchive(archive_dir)
+    extracted = []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):  # No per-page warnings from workers
+            for record in records:
+                headers, body = archive.read_record(record['segment'], record['offset'], record['length'])
+                article = extract_article(spec, body, record['url'],
+                                          encoding=sniff_encoding(body, headers.get('Content-Type')))
+                if article is not None:
+                    extracted.append((article.url, article.title, article.content))
+    finally:
+        archive.close()
+    return extracted
+
+
+def replay_spec(spec: ScraperSpec, archive, urls: Optional[List[str]] = None,
+                max_workers: Optional[int] = None) -> List[Article]:
+    """Re-extract a site's archived pages with a spec, without touching the network.
+
+    Pages are read from the archive's segments in file order and extracted in
+    parallel worker processes, so re-extraction is a local CPU-bound job.
+
+    Args:
+        spec: Spec with the (fixed) selectors to extract with
+        archive: PageArchive holding the site's fetched pages
+        urls: Only replay these URLs (default: every archived page of the spec's host)
+        max_workers: Worker processes (defaults to the CPU count)
+
+    Returns:
+        List of Article objects extracted from the archive
+    """
+    records = archive.latest_records(host=urlparse(spec.site_url).netloc, urls=urls)
+    print(f"📼 Replaying {len(records)} archived pages for {spec.scraper_name}")
+    if not records:
+        return []
+
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(records)))
+    chunk_size = max(1, -(-len(records) // (workers * 4)))
+    chunks = [records[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
+
+    spec_json = spec.to_json()
+    archive_dir = str(archive.directory)
+    if workers == 1:
+        results = [_replay_records(archive_dir, spec_json, chunk) for chunk in chunks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor  # Loads multiprocessing, so only when replaying
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_replay_records, [archive_dir] * len(chunks),
+                                        [spec_json] * len(chunks), chunks))
+
+    articles = [Article(url=url, title=title, content=content)
+                for chunk in results for url, title, content in chunk]
+    print(f"🎉 Replay complete! Extracted {len(articles)} of {len(records)} pages.")
+    return articles
+
+
+def make_scraper(spec: ScraperSpec) -> Callable[..., List[Article]]:
+    """Bind a spec to the engine, returning a scrape_<site>(homepage_url, ...) function.
+
+    Selectors are compiled here, so an invalid one fails at load time rather
+    than once per article.
+    """
+    spec.compile_selectors()
+
+    def scraper(homepage_url: str, discovered_urls: Optional[List[str]] = None,
+                checkpoint=None, stats: Optional[ExtractionStats] = None,
+                known_urls: Optional[Callable[[List[str]], Set[str]]] = None) -> List[Article]:
+        return run_spec(spec, homepage_url, discovered_urls, checkpoint, stats, known_urls)
+
+    scraper.__name__ = spec.scraper_name
+    scraper.__doc__ = f"Scrape articles from {spec.site_url} with the shared scraper engine."
+    scraper.spec = spec
+    return scraper
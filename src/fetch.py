@@ -0,0 +1,208 @@
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from src.ratelimit import AdaptiveRateLimiter, MAX_RETRY_AFTER, THROTTLE_STATUSES, parse_retry_after
+
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (compatible; ScraperBot/1.0)'
+
+# Process-wide client shared by the analyzer and generated scrapers
+_client: Optional['FetchClient'] = None
+_client_lock = threading.Lock()
+
+
+class Http2Response:
+    """Minimal requests.Response look-alike for responses fetched over HTTP/2."""
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.content = response.content
+        self.encoding = response.charset_encoding
+        self.http_version = response.http_version
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def close(self):
+        pass
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} Error for url: {self.url}", response=self
+            )
+
+
+class FetchClient:
+    """Keep-alive HTTP client with per-host connection pools and compressed transfer.
+
+    All fetches share one requests.Session, so workers in the same process
+    reuse TCP/TLS connections instead of handshaking per request. Responses
+    are requested brotli/gzip compressed (brotli when `brotli` is installed).
+    With http2=True, GETs go through an httpx client that multiplexes requests
+    to the same host over a single connection; this needs `httpx[http2]` and
+    falls back to HTTP/1.1 otherwise.
+
+    Every request passes through an AdaptiveRateLimiter, so callers no longer
+    sleep between requests; 429/503 responses are retried after backing off.
+    """
+
+    def __init__(self, pool_maxsize: int = 10, pool_connections: int = 32,
+                 http2: bool = False, user_agent: str = DEFAULT_USER_AGENT,
+                 rate_limit: bool = True, max_retries: int = 2):
+        """Initialize session and pools.
+
+        Args:
+            pool_maxsize: Keep-alive connections kept per host
+            pool_connections: Number of hosts whose pools are kept around
+            http2: Use HTTP/2 multiplexing when httpx with h2 is available
+            user_agent: User-Agent header sent with every request
+            rate_limit: Pace requests per host with an adaptive limiter
+            max_retries: Retries for throttled (429/503) responses; responses asking
+                to wait longer than MAX_RETRY_AFTER are returned without retrying
+        """
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.requests_sent = 0  # Requests made so far, retries and robots.txt included
+        self._count_lock = threading.Lock()
+        self.rate_limiter = AdaptiveRateLimiter(
+            self._fetch_robots, max_concurrency=pool_maxsize
+        ) if rate_limit else None
+        self.headers = {
+            'User-Agent': user_agent,
+            # urllib3 advertises br/zstd only when their decoders are installed
+            'Accept-Encoding': ACCEPT_ENCODING,
+        }
+
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.http2_client = self._create_http2_client(pool_maxsize, pool_connections) if http2 else None
+
+    def _create_http2_client(self, pool_maxsize: int, pool_connections: int):
+        """Create an httpx HTTP/2 client, or None if httpx/h2 are not installed."""
+        try:
+            import httpx
+            import h2  # noqa: F401
+        except ImportError:
+            print("⚠️  HTTP/2 requested but httpx[http2] is not installed, using HTTP/1.1")
+            return None
+
+        return httpx.Client(
+            http2=True,
+            headers=self.headers,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=pool_maxsize * pool_connections,
+                max_keepalive_connections=pool_connections
+            )
+        )
+
+    def _fetch_robots(self, robots_url: str) -> Optional[str]:
+        """Fetch robots.txt for the rate limiter (bypasses the limiter itself)."""
+        self._count_request()
+        try:
+            response = self.session.get(robots_url, timeout=10)
+        except requests.exceptions.RequestException:
+            return None
+        return response.text if response.ok else None
+
+    def get(self, url: str, timeout: float = 10, headers: Optional[Dict[str, str]] = None,
+            stream: bool = False, **kwargs: Any):
+        """GET a URL through the shared pools, paced by the host's rate limiter."""
+        parsed = urlparse(url)
+        limiter = None
+        if self.rate_limiter is not None:
+            limiter = self.rate_limiter.for_host(parsed.scheme or 'http', parsed.netloc)
+
+        for attempt in range(self.max_retries + 1):
+            if limiter:
+                limiter.acquire()
+            started = time.monotonic()
+            status_code = None
+            retry_after = None
+            try:
+                response = self._send(url, timeout, headers, stream, **kwargs)
+                status_code = response.status_code
+                if status_code in THROTTLE_STATUSES:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            finally:
+                if limiter:
+                    limiter.release(time.monotonic() - started, status_code, retry_after)
+
+            if status_code not in THROTTLE_STATUSES or attempt == self.max_retries:
+                return response
+            if retry_after is not None and retry_after > MAX_RETRY_AFTER:
+                # Not worth blocking a worker for; callers see the throttled response
+                print(f"⏳ {parsed.netloc} asked to wait {retry_after:.0f}s, giving up on {url}")
+                return response
+            response.close()
+            print(f"⏳ {parsed.netloc} answered {status_code}, backing off before retrying {url}")
+
+    def _count_request(self):
+        with self._count_lock:
+            self.requests_sent += 1
+
+    def _send(self, url: str, timeout: float, headers: Optional[Dict[str, str]],
+              stream: bool, **kwargs: Any):
+        """Send a single GET.
+
+        Streaming requests always use the requests session, since callers read
+        `response.raw` incrementally.
+        """
+        self._count_request()
+        if self.http2_client is None or stream:
+            return self.session.get(url, timeout=timeout, headers=headers, stream=stream, **kwargs)
+
+        import httpx
+        try:
+            return Http2Response(self.http2_client.get(url, timeout=timeout, headers=headers, **kwargs))
+        except httpx.HTTPError as e:
+            # Surface transport errors the same way the requests path does
+            raise requests.exceptions.ConnectionError(str(e)) from e
+
+    def max_workers(self, url: str) -> int:
+        """Number of parallel workers worth running against the host of a URL."""
+        if self.rate_limiter is None:
+            return self.pool_maxsize
+        return self.rate_limiter.max_workers(urlparse(url).netloc)
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
+        if self.http2_client is not None:
+            self.http2_client.close()
+
+
+def get_client() -> FetchClient:
+    """Return the process-wide FetchClient, creating it on first use.
+
+    Configured with SCRAPER_POOL_MAXSIZE (connections per host),
+    SCRAPER_HTTP2=true to enable HTTP/2 multiplexing and
+    SCRAPER_RATE_LIMIT=false to disable adaptive per-host pacing.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = FetchClient(
+                    pool_maxsize=int(os.getenv('SCRAPER_POOL_MAXSIZE', '10')),
+                    http2=os.getenv('SCRAPER_HTTP2', 'false').lower() == 'true',
+                    rate_limit=os.getenv('SCRAPER_RATE_LIMIT', 'true').lower() == 'true'
+                )
+    return _client
@@ -0,0 +1,118 @@
+from typing import List, Dict, Any, Optional, Set
+import hashlib
+import json
+import re
+from bs4 import BeautifulSoup, Tag
+from src.database import Database, get_database
+
+
+NUM_PERMUTATIONS = 64
+BANDS = 16  # LSH bands of NUM_PERMUTATIONS // BANDS rows each
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 64) - 1
+
+
+def _hash64(value: str) -> int:
+    """Stable 64-bit hash of a string."""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+# Fixed (a, b) coefficients for the MinHash permutations, derived deterministically
+# so signatures stay comparable across processes
+_PERMUTATIONS = [
+    (_hash64(f"a{i}") % (_MERSENNE_PRIME - 1) + 1, _hash64(f"b{i}") % _MERSENNE_PRIME)
+    for i in range(NUM_PERMUTATIONS)
+]
+
+
+def _node_token(element: Tag) -> str:
+    """Tag name plus its stable classes, e.g. 'div.article-card'."""
+    classes = sorted(
+        str(cls).lower() for cls in element.get('class', [])
+        if not re.search(r'\d+|uuid|unique|id-', str(cls), re.I)
+    )
+    return '.'.join([element.name] + classes)
+
+
+def structure_shingles(soup: BeautifulSoup, prefix: str = '', path_length: int = 3) -> Set[str]:
+    """Collect tag/class path shingles (the last `path_length` ancestors of each element)."""
+    shingles = set()
+    stack = [(soup, ())]
+    while stack:
+        node, path = stack.pop()
+        for child in node.children:
+            if not isinstance(child, Tag) or child.name in ('script', 'style', 'noscript'):
+                continue
+            child_path = (path + (_node_token(child),))[-path_length:]
+            shingles.add(prefix + '>'.join(child_path))
+            stack.append((child, child_path))
+    return shingles
+
+
+def minhash_signature(shingles: Set[str]) -> List[int]:
+    """MinHash signature whose component-wise agreement estimates Jaccard similarity."""
+    if not shingles:
+        return [_MAX_HASH] * NUM_PERMUTATIONS
+    hashes = [_hash64(shingle) for shingle in shingles]
+    return [
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def signature_similarity(first: List[int], second: List[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    if len(first) != len(second) or not first:
+        return 0.0
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+def band_keys(signature: List[int]) -> List[str]:
+    """LSH band keys: sites sharing any band are candidate template matches."""
+    rows = len(signature) // BANDS
+    return [
+        f"{band}:{hashlib.blake2b(str(signature[band * rows:(band + 1) * rows]).encode(), digest_size=8).hexdigest()}"
+        for band in range(BANDS)
+    ]
+
+
+def page_fingerprint(homepage_soup: BeautifulSoup, article_soups: List[BeautifulSoup]) -> List[int]:
+    """Fingerprint a site's template from its homepage and sample article pages."""
+    shingles = structure_shingles(homepage_soup, prefix='H:') if homepage_soup else set()
+    for soup in article_soups:
+        shingles |= structure_shingles(soup, prefix='A:')
+    return minhash_signature(shingles)
+
+
+class TemplateIndex:
+    """Index of known page templates and their validated selectors.
+
+    Templates are stored in the database with MinHash signatures and LSH band
+    keys, so looking up a new site only compares it against templates that
+    share at least one band instead of every known template.
+    """
+
+    def __init__(self, database: Optional[Database] = None, threshold: float = 0.8):
+        """Initialize index with its database and minimum similarity for a match."""
+        self.database = database or get_database()
+        self.threshold = threshold
+
+    def find(self, signature: List[int]) -> Optional[Dict[str, Any]]:
+        """Best matching known template, or None if nothing is similar enough."""
+        best = None
+        for candidate in self.database.find_template_candidates(band_keys(signature)):
+            similarity = signature_similarity(signature, json.loads(candidate['signature']))
+            if similarity >= self.threshold and (best is None or similarity > best['similarity']):
+                best = {
+                    'template_id': candidate['id'],
+                    'source_site': candidate['site'],
+                    'selectors': json.loads(candidate['selectors']),
+                    'similarity': similarity
+                }
+        return best
+
+    def add(self, signature: List[int], selectors: Dict[str, str], site: str) -> int:
+        """Register a site's template with selectors validated on it, replacing its previous one."""
+        return self.database.add_template(
+            site, json.dumps(signature), json.dumps(selectors), band_keys(signature)
+        )
@@ -1,7 +1,9 @@
 from typing import Dict, Any, List
 from pathlib import Path
+import json
+import pprint
 import re
-import os
+from src.engine import ScraperSpec
 
 
 class ScraperGenerator:
@@ -27,165 +29,73 @@ class ScraperGenerator:
         # Return lowercase, fallback if empty
         return name.lower() if name else 'unknown_site'
     
-    def generate_scraper(self, site_name: str, selectors: Dict[str, str], metadata: Dict[str, Any]) -> str:
-        """Generate complete Python scraper code as a string."""
+    def build_spec(self, site_name: str, selectors: Dict[str, str], metadata: Dict[str, Any]) -> ScraperSpec:
+        """Build the data-only scraper spec run by the shared scraper engine."""
         sanitized_name = self._sanitize_name(site_name)
         
-        # Extract selectors with safe escaping
-        article_links_selector = selectors.get('article_links', 'a')
-        title_selector = selectors.get('title', 'h1')
-        content_selector = selectors.get('content', 'article')
-        
-        # Get pre-discovered article URLs if available
-        prediscovered_urls = metadata.get('article_urls', [])
-        
-        # Create the article discovery section based on whether we have prediscovered URLs
-        if prediscovered_urls:
-            # Use prediscovered URLs (from analysis phase)
-            urls_list = ", ".join([f"'{url}'" for url in prediscovered_urls])
-            article_discovery_code = f"""        
-        # Use pre-discovered article URLs from analysis
-        prediscovered_urls = [{urls_list}]
-        print(f"📄 Using {{len(prediscovered_urls)}} pre-discovered article URLs")
-        
-        for url in prediscovered_urls:
-            article_urls.add(url)"""
-        else:
-            # Fallback to homepage discovery
-            article_discovery_code = f"""
-        # Fetch homepage
-        response = session.get(homepage_url, timeout=10)
-        response.raise_for_status()
-        response.encoding = 'utf-8'  # Ensure proper UTF-8 encoding
-        homepage_soup = BeautifulSoup(response.text, 'lxml')
-        
-        # Find article links using detected selector
-        print(f"🔍 Looking for article links with selector: '{article_links_selector}'")
-        article_link_elements = homepage_soup.select('{article_links_selector}')
-        
-        # Extract URLs from link elements
-        for link_element in article_link_elements:
-            href = link_element.get('href')
-            if href:
-                absolute_url = urljoin(homepage_url, href)
-                article_urls.add(absolute_url)"""
-        
-        # Build the code template without f-strings to avoid nesting issues
-        code = f"""\"\"\"Auto-generated scraper for {site_name}
+        # Sites where analysis found articles by crawling are crawled the same way at
+        # run time; otherwise fall back to the homepage article link selector
+        discovery = 'crawl' if metadata.get('article_urls') else 'links'
+        
+        return ScraperSpec(
+            scraper_name=f"scrape_{sanitized_name}",
+            site_url=metadata.get('site_url', site_name),
+            selectors={
+                'article_links': selectors.get('article_links', 'a'),
+                'title': selectors.get('title', 'h1'),
+                'content': selectors.get('content', 'article')
+            },
+            discovery=discovery,
+            fallbacks={
+                name: list(chain) for name, chain in metadata.get('fallbacks', {}).items()
+            },
+            url_patterns=list(metadata.get('url_patterns', [])),
+            canonical_rules=dict(metadata.get('canonical_rules', {})),
+            metadata={
+                'method': metadata.get('method'),
+                'confidence': metadata.get('confidence'),
+                'coverage': metadata.get('coverage', {}),
+                'article_count': metadata.get('article_count', 0)
+            }
+        )
+    
+    def generate_scraper(self, site_name: str, selectors: Dict[str, str], metadata: Dict[str, Any]) -> str:
+        """Export a scraper as Python code: the site's spec bound to the shared engine."""
+        spec = self.build_spec(site_name, selectors, metadata)
+        spec_literal = pprint.pformat(json.loads(spec.to_json()), indent=4, sort_dicts=True)
+        
+        code = f'''"""Auto-generated scraper for {site_name}
 
 Generated by Scraper Generator
-This file contains a standalone scraper function that can extract articles
-from the website without requiring any external analysis or LLM calls.
-\"\"\"
+This module binds the site's scraper spec to the shared scraper engine
+(src/engine.py) and runs without any external analysis or LLM calls.
+"""
 
-from typing import List
-from dataclasses import dataclass
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from typing import List, Optional
 import sys
-import time
+from src.engine import ScraperSpec, run_spec
+from src.main import Article
 
 
-@dataclass
-class Article:
-    \"\"\"Article data structure.\"\"\"
-    url: str
-    title: str
-    content: str
+SPEC = ScraperSpec.from_dict({spec_literal})
 
 
-def scrape_{sanitized_name}(homepage_url: str) -> List[Article]:
-    \"\"\"Scrape articles from {site_name}.
+def {spec.scraper_name}(homepage_url: str, discovered_urls: Optional[List[str]] = None,
+        checkpoint=None, stats=None, known_urls=None) -> List[Article]:
+    """Scrape articles from {site_name}.
     
     Args:
         homepage_url: URL of the website homepage
+        discovered_urls: Article URLs found upstream (sitemaps, resumed sessions); skips discovery
+        checkpoint: Optional progress recorder that persists the scraping session
+        stats: Optional ExtractionStats collecting the run's extraction success rate
+        known_urls: Batch lookup of already stored article URLs; crawls stop early
+            and only new articles are scraped
         
     Returns:
         List of Article objects with url, title, and content
-    \"\"\"
-    articles = []
-    article_urls = set()  # Track URLs to avoid duplicates
-    
-    # Create session with proper headers
-    session = requests.Session()
-    session.headers.update({{
-        'User-Agent': 'Mozilla/5.0 (compatible; ArticleScraper/1.0)'
-    }})
-    
-    try:
-        print(f"🔄 Starting article URL discovery...")
-        {article_discovery_code}
-        
-        print(f"📄 Found {{len(article_urls)}} unique article URLs")
-        
-        if not article_urls:
-            print("⚠️  No article links found. Check the selector or site structure.")
-            return articles
-        
-        # Scrape each article
-        for i, article_url in enumerate(article_urls, 1):
-            try:
-                print(f"📖 Scraping article {{i}}/{{len(article_urls)}}: {{article_url}}")
-                
-                # Fetch article page
-                response = session.get(article_url, timeout=10)
-                response.raise_for_status()
-                response.encoding = 'utf-8'  # Ensure proper UTF-8 encoding
-                article_soup = BeautifulSoup(response.text, 'lxml')
-                
-                # Extract title
-                title_element = article_soup.select_one('{title_selector}')
-                if not title_element:
-                    print(f"   ⚠️  No title found with selector: '{title_selector}'")
-                    continue
-                
-                title = title_element.get_text(strip=True)
-                if not title:
-                    print(f"   ⚠️  Title element found but empty")
-                    continue
-                
-                # Extract content
-                content_element = article_soup.select_one('{content_selector}')
-                if not content_element:
-                    print(f"   ⚠️  No content found with selector: '{content_selector}'")
-                    continue
-                
-                # Get all paragraph text within content element
-                paragraphs = content_element.find_all('p')
-                if paragraphs:
-                    content = '\\n\\n'.join(p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True))
-                else:
-                    # Fallback to all text if no paragraphs
-                    content = content_element.get_text(strip=True)
-                
-                if not content:
-                    print(f"   ⚠️  Content element found but empty")
-                    continue
-                
-                # Create article object
-                article = Article(
-                    url=article_url,
-                    title=title,
-                    content=content
-                )
-                articles.append(article)
-                
-                print(f"   ✅ Scraped: '{{title[:60]}}{{\"...\" if len(title) > 60 else \"\"}}' ({{len(content.split())}} words)")
-                
-                # Be respectful with requests
-                time.sleep(0.5)
-                
-            except Exception as e:
-                print(f"   ❌ Error scraping {{article_url}}: {{e}}")
-                continue
-        
-        print(f"\\n🎉 Scraping complete! Found {{len(articles)}} articles.")
-        return articles
-        
-    except Exception as e:
-        print(f"❌ Error fetching homepage: {{e}}")
-        return []
+    """
+    return run_spec(SPEC, homepage_url, discovered_urls, checkpoint, stats, known_urls)
 
 
 if __name__ == "__main__":
@@ -193,7 +103,7 @@ if __name__ == "__main__":
     if len(sys.argv) > 1:
         url = sys.argv[1]
         print(f"Testing scraper with URL: {{url}}")
-        results = scrape_{sanitized_name}(url)
+        results = {spec.scraper_name}(url)
         print(f"\\nResults: {{len(results)}} articles scraped")
         
         for i, article in enumerate(results[:3], 1):
@@ -202,8 +112,8 @@ if __name__ == "__main__":
             print(f"  Title: {{article.title}}")
             print(f"  Content length: {{len(article.content)}} characters")
     else:
-        print("Usage: python scraper_{sanitized_name}.py <homepage_url>")
-"""
+        print("Usage: python -m scrapers.{spec.scraper_name.replace('scrape_', 'scraper_', 1)} <homepage_url>")
+'''
         
         return code
     
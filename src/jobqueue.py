@@ -0,0 +1,481 @@
+from typing import List, Dict, Any, Optional, Callable, Iterable
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
+import hashlib
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+
+
+# Job kinds: a site job discovers a homepage's article URLs and enqueues
+# them as article jobs; an article job fetches, extracts and stores one page
+SITE_JOB = 'site'
+ARTICLE_JOB = 'article'
+
+# Job states
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'  # Out of attempts (dead letter)
+
+VISIBILITY_TIMEOUT = 300.0  # Seconds a claimed job stays invisible to other workers
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 30.0  # Seconds before the first retry, doubled per attempt
+MAX_LEASED_PER_HOST = 4  # Jobs of one host leased at once, across all workers
+
+# A job is claimable when it is pending and due, or its worker's lease ran out
+_CLAIMABLE = "((status = 'pending' AND available_at <= ?) OR (status = 'leased' AND lease_expires <= ?))"
+
+
+def _job_id(kind: str, url: str) -> str:
+    """Stable job key, so enqueuing the same URL twice is a no-op."""
+    return hashlib.sha1(f"{kind} {url}".encode('utf-8')).hexdigest()
+
+
+class JobQueue:
+    """Work queue of site and article jobs in a database table.
+
+    Workers on any number of machines claim batches of jobs with a lease:
+    claimed jobs stay invisible to other workers for `visibility_timeout`
+    seconds, after which a crashed worker's jobs are claimed again. Failed
+    jobs are retried with exponential backoff up to `max_attempts` times.
+    Claims are spread round-robin over hosts, and no host has more than
+    `max_leased_per_host` jobs leased at once, so one large site neither
+    starves the others nor gets hammered by every worker.
+
+    Claims only use optimistic `UPDATE ... WHERE <still claimable>`
+    statements, so any DB-API connection works: SQLite locally, a shared
+    server database for several machines.
+    """
+
+    def __init__(self, db_path: str = "articles.db",
+                 connect: Optional[Callable[[], Any]] = None,
+                 paramstyle: str = 'qmark',
+                 visibility_timeout: float = VISIBILITY_TIMEOUT,
+                 max_attempts: int = MAX_ATTEMPTS,
+                 retry_backoff: float = RETRY_BACKOFF,
+                 max_leased_per_host: int = MAX_LEASED_PER_HOST):
+        """Initialize the queue and create its table.
+
+        Args:
+            db_path: SQLite database file (ignored when connect is given)
+            connect: Factory returning a new DB-API connection
+            paramstyle: Placeholder style of that driver ('qmark' or 'format')
+        """
+        self.connect = connect or (lambda: sqlite3.connect(db_path, timeout=30))
+        self.paramstyle = paramstyle
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.max_leased_per_host = max_leased_per_host
+        self.init_db()
+
+    @contextmanager
+    def get_cursor(self):
+        """Cursor in its own transaction, committed on success."""
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            yield cursor
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _execute(self, cursor, query: str, params: Iterable[Any] = ()):
+        if self.paramstyle in ('format', 'pyformat'):
+            query = query.replace('?', '%s')
+        cursor.execute(query, tuple(params))
+        return cursor
+
+    def init_db(self):
+        """Create the jobs table if it doesn't exist."""
+        with self.get_cursor() as cursor:
+            self._execute(cursor, """
+                CREATE TABLE IF NOT EXISTS scrape_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    host TEXT NOT NULL,
+                    site TEXT NOT NULL,
+                    homepage_url TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    available_at REAL NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    last_error TEXT,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._execute(cursor, """
+                CREATE INDEX IF NOT EXISTS idx_scrape_jobs_claim
+                ON scrape_jobs (status, host, available_at)
+            """)
+
+    def enqueue(self, kind: str, urls: List[str], site: str, homepage_url: str,
+                requeue: bool = False) -> int:
+        """Add jobs, return how many were new.
+
+        URLs already queued are skipped; with requeue, finished or failed
+        jobs for them are made pending again (e.g. recurring site jobs).
+        """
+        now = time.time()
+        added = 0
+        with self.get_cursor() as cursor:
+            for url in urls:
+                job_id = _job_id(kind, url)
+                self._execute(cursor, """
+                    INSERT INTO scrape_jobs
+                        (job_id, kind, url, host, site, homepage_url, status, attempts, available_at, updated_at)
+                    SELECT ?, ?, ?, ?, ?, ?, 'pending', 0, ?, ?
+                    WHERE NOT EXISTS (SELECT 1 FROM scrape_jobs WHERE job_id = ?)
+                """, (job_id, kind, url, urlparse(url).netloc, site, homepage_url, now, now, job_id))
+                if cursor.rowcount == 1:
+                    added += 1
+                elif requeue:
+                    self._execute(cursor, """
+                        UPDATE scrape_jobs
+                        SET status = 'pending', attempts = 0, available_at = ?, last_error = NULL, updated_at = ?
+                        WHERE job_id = ? AND status IN ('done', 'failed')
+                    """, (now, now, job_id))
+                    added += cursor.rowcount
+        return added
+
+    def enqueue_site(self, homepage_url: str) -> int:
+        """Queue a site job for a homepage (again, if it already ran)."""
+        from src.main import _create_site_id
+        return self.enqueue(SITE_JOB, [homepage_url], _create_site_id(homepage_url), homepage_url,
+                            requeue=True)
+
+    def claim(self, worker_id: str, batch_size: int = 10, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Lease up to batch_size claimable jobs, spread fairly over hosts."""
+        now = time.time()
+        kind_filter, kind_params = ("AND kind = ?", (kind,)) if kind else ("", ())
+        claimed = []
+        with self.get_cursor() as cursor:
+            # Expired leases of jobs out of attempts are dead, not claimable
+            self._execute(cursor, """
+                UPDATE scrape_jobs
+                SET status = 'failed', last_error = 'lease expired', lease_owner = NULL, updated_at = ?
+                WHERE status = 'leased' AND lease_expires <= ? AND attempts >= ?
+            """, (now, now, self.max_attempts))
+
+            leased = dict(self._execute(cursor, """
+                SELECT host, COUNT(*) FROM scrape_jobs
+                WHERE status = 'leased' AND lease_expires > ?
+                GROUP BY host
+            """, (now,)).fetchall())
+            ready = self._execute(cursor, f"""
+                SELECT host, COUNT(*), MIN(available_at) FROM scrape_jobs
+                WHERE {_CLAIMABLE} {kind_filter}
+                GROUP BY host
+            """, (now, now) + kind_params).fetchall()
+
+            # Round-robin over hosts, least busy and longest waiting first
+            ready.sort(key=lambda row: (leased.get(row[0], 0), row[2]))
+            quotas: Dict[str, int] = defaultdict(int)
+            capacity = {host: min(count, self.max_leased_per_host - leased.get(host, 0))
+                        for host, count, _ in ready}
+            remaining = batch_size
+            while remaining > 0:
+                progress = False
+                for host, _, _ in ready:
+                    if remaining > 0 and quotas[host] < capacity[host]:
+                        quotas[host] += 1
+                        remaining -= 1
+                        progress = True
+                if not progress:
+                    break
+
+            lease_expires = now + self.visibility_timeout
+            for host, quota in quotas.items():
+                rows = self._execute(cursor, f"""
+                    SELECT job_id, kind, url, site, homepage_url, attempts FROM scrape_jobs
+                    WHERE host = ? AND {_CLAIMABLE} {kind_filter}
+                    ORDER BY available_at
+                    LIMIT ?
+                """, (host, now, now) + kind_params + (quota,)).fetchall()
+                for job_id, job_kind, url, site, homepage_url, attempts in rows:
+                    # Another worker may have claimed the job since it was read
+                    self._execute(cursor, f"""
+                        UPDATE scrape_jobs
+                        SET status = 'leased', lease_owner = ?, lease_expires = ?,
+                            attempts = attempts + 1, updated_at = ?
+                        WHERE job_id = ? AND {_CLAIMABLE}
+                    """, (worker_id, lease_expires, now, job_id, now, now))
+                    if cursor.rowcount == 1:
+                        claimed.append({
+                            'job_id': job_id, 'kind': job_kind, 'url': url, 'site': site,
+                            'homepage_url': homepage_url, 'attempts': attempts + 1
+                        })
+        return claimed
+
+    def extend(self, job_ids: List[str], worker_id: str) -> int:
+        """Renew the leases a worker still holds, return how many it kept."""
+        now = time.time()
+        kept = 0
+        with self.get_cursor() as cursor:
+            for job_id in job_ids:
+                self._execute(cursor, """
+                    UPDATE scrape_jobs SET lease_expires = ?, updated_at = ?
+                    WHERE job_id = ? AND status = 'leased' AND lease_owner = ?
+                """, (now + self.visibility_timeout, now, job_id, worker_id))
+                kept += cursor.rowcount
+        return kept
+
+    def complete(self, job_id: str, worker_id: str) -> bool:
+        """Mark a leased job done; False if the worker had lost its lease."""
+        with self.get_cursor() as cursor:
+            self._execute(cursor, """
+                UPDATE scrape_jobs SET status = 'done', lease_owner = NULL, last_error = NULL, updated_at = ?
+                WHERE job_id = ? AND status = 'leased' AND lease_owner = ?
+            """, (time.time(), job_id, worker_id))
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """Schedule a retry with backoff, or mark the job failed once out of attempts (or without retry)."""
+        now = time.time()
+        with self.get_cursor() as cursor:
+            row = self._execute(cursor, """
+                SELECT attempts FROM scrape_jobs WHERE job_id = ? AND status = 'leased' AND lease_owner = ?
+            """, (job_id, worker_id)).fetchone()
+            if row is None:
+                return False
+            attempts = row[0]
+            status = FAILED if attempts >= self.max_attempts or not retry else PENDING
+            available_at = now + self.retry_backoff * 2 ** (attempts - 1)
+            self._execute(cursor, """
+                UPDATE scrape_jobs
+                SET status = ?, available_at = ?, lease_owner = NULL, last_error = ?, updated_at = ?
+                WHERE job_id = ? AND lease_owner = ?
+            """, (status, available_at, error[:500], now, job_id, worker_id))
+            return cursor.rowcount == 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Job counts by kind and status."""
+        counts: Dict[str, Dict[str, int]] = defaultdict(dict)
+        with self.get_cursor() as cursor:
+            for kind, status, count in self._execute(cursor, """
+                SELECT kind, status, COUNT(*) FROM scrape_jobs GROUP BY kind, status
+            """).fetchall():
+                counts[kind][status] = count
+        return dict(counts)
+
+
+class QueueWorker:
+    """Claims batches of jobs from a JobQueue and runs them.
+
+    Any number of workers (threads, processes or machines sharing the
+    queue and article database) can run side by side; leases of jobs in
+    progress are renewed in the background so slow jobs, such as a first
+    scraper generation, are not handed to another worker.
+    """
+
+    def __init__(self, queue: Optional[JobQueue] = None, worker_id: Optional[str] = None,
+                 batch_size: int = 10):
+        """Initialize worker with its queue and batch size."""
+        from src.database import get_database
+
+        self.queue = queue or JobQueue()
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.database = get_database()
+        self._held: set = set()
+        self._held_lock = threading.Lock()
+        self._stats: Dict[str, Any] = {}  # Site -> ExtractionStats of its article jobs since the last drift check
+        self._stats_lock = threading.Lock()
+
+    def _scraper_spec(self, job: Dict[str, Any]):
+        from src.main import _get_scraper_function
+
+        scraper_function = _get_scraper_function(job['homepage_url'], job['site'])
+        if scraper_function is None:
+            raise RuntimeError(f"No scraper available for {job['site']}")
+        return scraper_function.spec
+
+    def run_site_job(self, job: Dict[str, Any]) -> int:
+        """Discover a site's new article URLs and enqueue them, return how many were queued."""
+        from src.main import _discover_article_urls
+        from src.engine import discover_article_urls
+
+        spec = self._scraper_spec(job)
+        homepage_url, site = job['homepage_url'], job['site']
+        # Feeds only cover recent articles, so they are trusted once the site has a backfill
+        incremental = bool(self.database.get_article_timestamps(site))
+        urls = _discover_article_urls(homepage_url, site, incremental,
+                                      spec.article_url_pattern(), spec.canonicalizer())
+        if urls is None:
+            urls = discover_article_urls(spec, homepage_url, self.database.filter_known_urls)
+
+        canonicalizer = spec.canonicalizer()
+        urls = list(dict.fromkeys(canonicalizer.canonicalize(url) for url in urls))
+        known = self.database.filter_known_urls(urls)
+        urls = [url for url in urls if url not in known]
+        if spec.max_articles is not None:
+            urls = urls[:spec.max_articles]
+        return self.queue.enqueue(ARTICLE_JOB, urls, site, homepage_url)
+
+    def _site_stats(self, site: str):
+        """ExtractionStats collecting the outcomes of a site's article jobs."""
+        from src.engine import ExtractionStats
+
+        with self._stats_lock:
+            stats = self._stats.get(site)
+            if stats is None:
+                stats = self._stats[site] = ExtractionStats()
+            return stats
+
+    def run_article_job(self, job: Dict[str, Any]) -> Optional[bool]:
+        """Scrape and store one article, return whether it was new (None if nothing was extracted)."""
+        from src.engine import fetch_article
+        from src.writer import get_writer
+
+        article = fetch_article(self._scraper_spec(job), job['url'], self._site_stats(job['site']))
+        if article is None:
+            return None
+        # Articles of all fetch threads are committed together by the writer thread
+        future = get_writer(self.database).submit(article.url, article.title, article.content, job['site'])
+        return future.result() is not None
+
+    def _run_job(self, job: Dict[str, Any]) -> Optional[Any]:
+        try:
+            if job['kind'] == SITE_JOB:
+                result = self.run_site_job(job)
+                print(f"🗺️  {job['site']}: queued {result} article jobs")
+            else:
+                result = self.run_article_job(job)
+                if result is None:
+                    # Same page and selectors extract nothing again; drift repair requeues the job
+                    print(f"❌ No article extracted from {job['url']}")
+                    self.queue.fail(job['job_id'], self.worker_id, "No article extracted", retry=False)
+                    return None
+            if not self.queue.complete(job['job_id'], self.worker_id):
+                print(f"⚠️  Lease on {job['url']} expired before it finished")
+            return result
+        except Exception as e:
+            print(f"❌ Job failed ({job['kind']} {job['url']}, attempt {job['attempts']}): {e}")
+            self.queue.fail(job['job_id'], self.worker_id, str(e))
+            return None
+        finally:
+            with self._held_lock:
+                self._held.discard(job['job_id'])
+
+    def run_batch(self) -> int:
+        """Claim one batch and run it, return the number of jobs claimed."""
+        from src.fetch import get_client
+
+        jobs = self.queue.claim(self.worker_id, self.batch_size)
+        if not jobs:
+            return 0
+        with self._held_lock:
+            self._held.update(job['job_id'] for job in jobs)
+        print(f"📦 Claimed {len(jobs)} jobs from {len({job['site'] for job in jobs})} sites")
+
+        # Site jobs generate or load scrapers that article jobs of the same batch may need
+        for job in jobs:
+            if job['kind'] == SITE_JOB:
+                self._run_job(job)
+        articles = [job for job in jobs if job['kind'] != SITE_JOB]
+        if articles:
+            # The shared client's rate limiter keeps each host within its limits
+            with ThreadPoolExecutor(max_workers=min(len(articles), get_client().pool_maxsize)) as executor:
+                new = sum(1 for result in executor.map(self._run_job, articles) if result)
+            print(f"💾 Stored {new} new articles")
+            self._check_drift({job['site']: job['homepage_url'] for job in articles})
+        return len(jobs)
+
+    def _check_drift(self, sites: Dict[str, str]):
+        """Repair the selectors of sites whose article jobs mostly extracted nothing.
+
+        Like a direct run (see main._run_scraper), once DRIFT_MIN_PAGES pages
+        of a site were fetched their selector hits are recorded and, if the
+        site drifted, its selectors are repaired and the failed article jobs
+        queued again.
+        """
+        from src.engine import DRIFT_MIN_PAGES
+        from src.main import _get_scraper_function, _repair_scraper, _update_selector_order
+
+        for site, homepage_url in sites.items():
+            with self._stats_lock:
+                stats = self._stats.get(site)
+                if stats is None or stats.fetched < DRIFT_MIN_PAGES:
+                    continue
+                del self._stats[site]
+
+            scraper_function = _get_scraper_function(homepage_url, site)
+            if scraper_function is None:
+                continue
+            _update_selector_order(site, scraper_function, stats)
+            if not stats.drifted():
+                continue
+
+            matched = stats.extracted - len(stats.fallback_urls)
+            print(f"📉 {site}: selectors matched only {matched}/{stats.fetched} pages, site template likely changed")
+            repaired_function = _repair_scraper(homepage_url, site, scraper_function, stats.selector_miss_urls)
+            if repaired_function is not None and stats.failed_urls:
+                requeued = self.queue.enqueue(ARTICLE_JOB, stats.failed_urls, site, homepage_url, requeue=True)
+                print(f"🔁 {site}: queued {requeued} failed article jobs again with repaired selectors")
+
+    def _renew_leases(self, stop: threading.Event):
+        while not stop.wait(self.queue.visibility_timeout / 3):
+            with self._held_lock:
+                held = list(self._held)
+            if held:
+                try:
+                    self.queue.extend(held, self.worker_id)
+                except Exception as e:
+                    print(f"⚠️  Could not renew leases: {e}")
+
+    def run(self, poll_interval: float = 5.0, exit_when_idle: bool = False):
+        """Worker loop: claim and run batches until stopped (or the queue is drained)."""
+        print(f"👷 Worker {self.worker_id} started (Ctrl+C to stop)")
+        stop = threading.Event()
+        threading.Thread(target=self._renew_leases, args=(stop,), daemon=True).start()
+        try:
+            while True:
+                if self.run_batch() == 0:
+                    if exit_when_idle:
+                        break
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            print(f"\n👋 Worker {self.worker_id} stopped")
+        finally:
+            stop.set()
+
+
+if __name__ == "__main__":
+    """Command line interface: queue sites, run workers, show queue state."""
+    usage = (
+        "Usage: python -m src.jobqueue enqueue <homepage_url> [<homepage_url> ...]\n"
+        "       python -m src.jobqueue worker [batch_size] [--drain]\n"
+        "       python -m src.jobqueue stats"
+    )
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    if command == 'enqueue' and len(sys.argv) > 2:
+        queue = JobQueue()
+        for url in sys.argv[2:]:
+            queue.enqueue_site(url)
+            print(f"➕ Queued site job for {url}")
+    elif command == 'worker':
+        arguments = [argument for argument in sys.argv[2:] if argument != '--drain']
+        worker = QueueWorker(batch_size=int(arguments[0]) if arguments else 10)
+        worker.run(exit_when_idle='--drain' in sys.argv)
+    elif command == 'stats':
+        for kind, counts in JobQueue().stats().items():
+            print(f"   {kind}: {counts}")
+    else:
+        print(usage)
+        sys.exit(1)
@@ -1,17 +1,19 @@
 from typing import Dict, Any, List
-import openai
 import os
 import json
 import re
 from bs4 import BeautifulSoup
-from dotenv import load_dotenv
-
-load_dotenv()
+from src.selector_cache import InvalidSelectorError, select_one
 
 
 class LLMClient:
     def __init__(self):
         """Initialize OpenAI client with OpenRouter base URL."""
+        # Imported here: openai is slow to import and only needed for generation
+        import openai
+        from dotenv import load_dotenv
+        load_dotenv()
+        
         api_key = os.getenv("OPENROUTER_API_KEY")
         if not api_key:
             raise ValueError(
@@ -114,9 +116,8 @@ Please respond with ONLY this JSON format:
             
             for name, selector in selectors.items():
                 try:
-                    elements = soup.select(selector)
-                    results[name] = len(elements) > 0
-                except Exception:
+                    results[name] = select_one(soup, selector) is not None
+                except InvalidSelectorError:
                     # Invalid CSS selector
                     results[name] = False
             
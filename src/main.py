@@ -1,13 +1,21 @@
 from dataclasses import dataclass
-from typing import List, Dict, Callable
+from typing import List, Dict, Any, Callable, Optional
 import re
 import os
 import sys
-import importlib.util
+import threading
+import time
 from urllib.parse import urlparse
 
 # Module-level cache for scrapers
 _scraper_cache: Dict[str, Callable] = {}
+# Per-site locks: concurrent callers for an uncached site wait for one generation
+_generation_locks: Dict[str, threading.Lock] = {}
+_generation_locks_lock = threading.Lock()
+
+# Wait after a failed selector repair, doubled per consecutive failure
+REPAIR_BACKOFF_HOURS = 1.0
+MAX_REPAIR_BACKOFF_HOURS = 24.0 * 7
 
 
 @dataclass
@@ -35,12 +43,289 @@ def _create_site_id(homepage_url: str) -> str:
     return site_id.lower()
 
 
-def get_articles(homepage_url: str) -> List[Article]:
+def _discover_article_urls(homepage_url: str, site_id: str, incremental: bool,
+                           url_pattern=None, canonicalizer=None) -> Optional[List[str]]:
+    """Discover article URLs from sitemaps (and feeds when incremental).
+    
+    Sitemap entries are filtered with the site's learned article URL pattern
+    when its spec has one. Returns None when the site publishes neither, so
+    the scraper falls back to crawling HTML listing pages.
+    """
+    try:
+        from src.analyzer import HTMLAnalyzer
+        from src.discovery import SitemapDiscovery
+        
+        known_urls = {}
+        if incremental:
+            from src.database import get_database
+            known_urls = get_database().get_article_timestamps(site_id)
+        
+        analyzer = HTMLAnalyzer(homepage_url, url_pattern, canonicalizer)
+        discovery = SitemapDiscovery(homepage_url, analyzer.client, analyzer.is_article_url,
+                                     canonicalize=analyzer.canonicalizer.canonicalize)
+        result = discovery.discover(known_urls, use_feeds=incremental)
+    except Exception as e:
+        print(f"⚠️  Sitemap discovery failed: {e}")
+        return None
+    
+    # A sitemap without any article URLs (e.g. none match the pattern) says nothing
+    # about the site, unless the run only asks for articles beyond the known ones
+    if not result['article_urls'] and not known_urls:
+        return None
+    # Feeds only list recent items, so they are trusted for incremental runs only
+    if result['complete'] or (incremental and result['sources']):
+        return result['article_urls']
+    return None
+
+
+def _get_scraper_function(homepage_url: str, site_id: str) -> Optional[Callable]:
+    """Return the cached scraper for a site, loading or generating its spec if needed.
+    
+    Thread-safe: concurrent calls for the same site run the pipeline once and
+    the others receive the cached result.
+    """
+    if site_id in _scraper_cache:
+        print("⚡ Using cached scraper function")
+        return _scraper_cache[site_id]
+    
+    with _generation_locks_lock:
+        lock = _generation_locks.setdefault(site_id, threading.Lock())
+    with lock:
+        if site_id in _scraper_cache:
+            print("⚡ Using scraper function generated by a concurrent call")
+            return _scraper_cache[site_id]
+        return _load_scraper_function(homepage_url, site_id)
+
+
+def _load_scraper_function(homepage_url: str, site_id: str) -> Optional[Callable]:
+    """Load the site's stored spec or generate one, caching the bound scraper."""
+    try:
+        from src.engine import ScraperSpec, make_scraper
+        from src.database import get_database
+        from src.selector_cache import InvalidSelectorError
+        
+        # Specs are stored in the database, so other processes reuse them
+        spec_json = get_database().get_scraper_spec(site_id)
+        if spec_json:
+            print("📥 Loaded stored scraper spec")
+            spec = ScraperSpec.from_json(spec_json)
+        else:
+            # Generate scraper spec (if not stored)
+            print("🔧 No stored scraper found, generating new one...")
+            from src.pipeline import ScraperPipeline
+            pipeline = ScraperPipeline()
+            
+            result = pipeline.generate_scraper_for_site(homepage_url, site_id=site_id)
+            
+            if 'error' in result:
+                print(f"❌ Pipeline generation failed: {result['error']}")
+                return None
+            
+            spec = result['spec']
+            print(f"✅ Scraper spec generated: {spec.scraper_name}")
+        
+        try:
+            scraper_function = make_scraper(spec)
+        except InvalidSelectorError as e:
+            if not spec_json:
+                raise
+            # A stored spec that no longer compiles is regenerated from scratch
+            print(f"⚠️  Stored scraper spec is invalid ({e}), regenerating...")
+            get_database().delete_scraper_spec(site_id)
+            return _load_scraper_function(homepage_url, site_id)
+        
+        # Cache the function
+        _scraper_cache[site_id] = scraper_function
+        print(f"💾 Cached scraper function: {scraper_function.__name__}")
+        return scraper_function
+        
+    except Exception as e:
+        print(f"❌ Error during scraper generation: {e}")
+        return None
+
+
+def _validate_articles(scraped_articles: List[Any]) -> List[Article]:
+    """Convert scraper output to validated Article objects."""
+    print("🔍 Converting and validating articles...")
+    valid_articles = []
+    
+    for raw_article in scraped_articles:
+        try:
+            # Convert from scraper's Article class to our Article class
+            article = Article(
+                url=raw_article.url,
+                title=raw_article.title,
+                content=raw_article.content
+            )
+            valid_articles.append(article)
+        except ValueError as e:
+            print(f"⚠️  Skipping invalid article: {e}")
+            continue
+        except Exception as e:
+            print(f"⚠️  Skipping article due to error: {e}")
+            continue
+    
+    print(f"✅ Validated {len(valid_articles)} articles")
+    return valid_articles
+
+
+def _start_checkpoint(site_id: str, homepage_url: str):
+    """Open a scraping session whose progress is checkpointed to the database.
+    
+    Returns None when database saving is disabled (SAVE_TO_DB=false) or the
+    database cannot be opened; scraping then proceeds without persistence.
+    """
+    if os.getenv('SAVE_TO_DB', 'true').lower() != 'true':
+        return None
+    
+    try:
+        from src.database import get_database
+        from src.checkpoint import SessionCheckpoint
+        
+        db = get_database()
+        session_id = db.start_session(site_id, homepage_url)
+        print(f"💾 Checkpointing progress in session {session_id}")
+        return SessionCheckpoint(db, session_id, site_id)
+    except Exception as e:
+        print(f"⚠️  Database initialization failed: {e}")
+        # Don't fail the scraping, just log the error
+        return None
+
+
+def _repair_scraper(homepage_url: str, site_id: str, scraper_function: Callable,
+                    failed_urls: List[str]) -> Optional[Callable]:
+    """Re-detect a drifted site's selectors on a small sample of failed pages.
+    
+    Returns the repaired scraper, or None if repair failed or is backing off.
+    A failed repair keeps the current spec (regenerating it would cost a crawl
+    and LLM calls on every run of sites whose discovery finds many
+    non-article pages) and records the failure, so the next attempt waits
+    REPAIR_BACKOFF_HOURS, doubling per consecutive failure.
+    """
+    spec = getattr(scraper_function, 'spec', None)
+    if spec is None:
+        return None
+    
+    failures = spec.metadata.get('repair_failures', {})
+    if time.time() < failures.get('retry_after', 0):
+        print(f"⏳ Selector repair failed {failures['count']} times, not retrying yet")
+        return None
+    
+    try:
+        from src.engine import make_scraper
+        from src.pipeline import ScraperPipeline
+        
+        pipeline = ScraperPipeline()
+        result = pipeline.repair_selectors(homepage_url, site_id, spec, failed_urls)
+        if 'error' not in result:
+            repaired_function = make_scraper(result['spec'])
+            _scraper_cache[site_id] = repaired_function
+            return repaired_function
+        print(f"❌ Selector repair failed: {result['error']}")
+    except Exception as e:
+        print(f"❌ Error during selector repair: {e}")
+    
+    count = failures.get('count', 0) + 1
+    backoff = min(REPAIR_BACKOFF_HOURS * 2 ** (count - 1), MAX_REPAIR_BACKOFF_HOURS)
+    spec.metadata['repair_failures'] = {'count': count, 'retry_after': time.time() + backoff * 3600}
+    try:
+        from src.database import get_database
+        get_database().save_scraper_spec(site_id, spec.to_json())
+        print(f"📝 Keeping current selectors, next repair attempt in {backoff:g}h")
+    except Exception as e:
+        print(f"⚠️  Could not record repair failure: {e}")
+    return None
+
+
+def _update_selector_order(site_id: str, scraper_function: Callable, stats) -> None:
+    """Persist a run's selector hit counts and reorder the site's fallback chains by them."""
+    spec = getattr(scraper_function, 'spec', None)
+    if spec is None or not stats.selector_attempts:
+        return
+    
+    try:
+        from src.database import get_database
+        
+        db = get_database()
+        db.record_selector_stats(site_id, stats.selector_counts())
+        if spec.reorder_chains(db.get_selector_stats(site_id)):
+            db.save_scraper_spec(site_id, spec.to_json())
+            print(f"🔀 Reordered selector fallbacks: {spec.selectors}")
+    except Exception as e:
+        print(f"⚠️  Could not update selector statistics: {e}")
+
+
+def _run_scraper(scraper_function: Callable, homepage_url: str, site_id: str,
+                 article_urls: Optional[List[str]], checkpoint,
+                 incremental: bool = False) -> Optional[List[Article]]:
+    """Execute a scraper, finishing its checkpointed session; None on failure.
+    
+    Incremental runs that crawl listing pages stop at already stored articles.
+    If most fetched pages yield no article, the site's template has drifted:
+    its selectors are repaired and the failed pages are scraped again.
+    """
+    from src.engine import ExtractionStats
+    
+    known_urls = None
+    if incremental:
+        from src.database import get_database
+        known_urls = get_database().filter_known_urls
+    
+    print("🏃 Executing scraper...")
+    stats = ExtractionStats()
+    try:
+        scraped_articles = scraper_function(homepage_url, article_urls or None,
+                                            checkpoint=checkpoint, stats=stats, known_urls=known_urls)
+        print(f"📄 Raw scraper returned {len(scraped_articles)} articles")
+    except Exception as e:
+        print(f"❌ Scraper execution failed: {e}")
+        if checkpoint is not None:
+            # Progress so far stays checkpointed; the session can be resumed
+            checkpoint.flush()
+            checkpoint.database.finish_session(checkpoint.session_id, checkpoint.saved, str(e),
+                                               stats.fetched, stats.extracted)
+        return None
+    
+    _update_selector_order(site_id, scraper_function, stats)
+    
+    if stats.drifted():
+        matched = stats.extracted - len(stats.fallback_urls)
+        print(f"📉 Selectors matched only {matched}/{stats.fetched} pages, site template likely changed")
+        repaired_function = _repair_scraper(homepage_url, site_id, scraper_function,
+                                            stats.selector_miss_urls)
+        if repaired_function is not None and stats.failed_urls:
+            print(f"🔁 Re-scraping {len(stats.failed_urls)} failed pages with repaired selectors...")
+            try:
+                scraped_articles += repaired_function(homepage_url, stats.failed_urls, checkpoint=checkpoint)
+            except Exception as e:
+                print(f"❌ Re-scrape failed: {e}")
+    
+    valid_articles = _validate_articles(scraped_articles)
+    
+    if checkpoint is not None:
+        try:
+            checkpoint.flush()
+            # The session keeps the original run's extraction counts as drift history
+            checkpoint.database.finish_session(checkpoint.session_id, checkpoint.saved,
+                                               pages_fetched=stats.fetched,
+                                               pages_extracted=stats.extracted)
+            print(f"📊 Database save result: {checkpoint.saved} saved, {checkpoint.duplicates} duplicates")
+            if checkpoint.duplicates > 0:
+                print(f"ℹ️  Note: {checkpoint.duplicates} articles were duplicates")
+        except Exception as e:
+            print(f"⚠️  Database save failed: {e}")
+            # Don't fail the scraping, just log the error
+    
+    return valid_articles
+
+
+def get_articles(homepage_url: str, incremental: bool = False) -> List[Article]:
     """
     Main orchestration function that generates and executes scrapers.
     
     Args:
         homepage_url: URL of the website to scrape
+        incremental: Only scrape articles that sitemaps/feeds report as new or changed
         
     Returns:
         List of Article objects scraped from the site
@@ -52,115 +337,36 @@ def get_articles(homepage_url: str) -> List[Article]:
         site_id = _create_site_id(homepage_url)
         print(f"📝 Site ID: {site_id}")
         
-        # Step 2: Check cache
-        if site_id in _scraper_cache:
-            print("⚡ Using cached scraper function")
-            scraper_function = _scraper_cache[site_id]
-        else:
-            # Step 3: Generate scraper (if not cached)
-            print("🔧 No cached scraper found, generating new one...")
-            
-            try:
-                from src.pipeline import ScraperPipeline
-                pipeline = ScraperPipeline()
-                
-                result = pipeline.generate_scraper_for_site(homepage_url)
-                
-                if 'error' in result:
-                    print(f"❌ Pipeline generation failed: {result['error']}")
-                    return []
-                
-                scraper_path = result['scraper_path']
-                print(f"✅ Scraper generated: {scraper_path}")
-                
-                # Step 4: Load generated scraper
-                print("📥 Loading scraper module...")
-                spec = importlib.util.spec_from_file_location("generated_scraper", scraper_path)
-                if not spec or not spec.loader:
-                    print("❌ Failed to create module spec")
-                    return []
-                
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-                
-                # Find the scraper function
-                scraper_function = None
-                for attr_name in dir(module):
-                    if attr_name.startswith('scrape_') and callable(getattr(module, attr_name)):
-                        scraper_function = getattr(module, attr_name)
-                        break
-                
-                if not scraper_function:
-                    print("❌ No scraper function found in generated module")
-                    return []
-                
-                # Cache the function
-                _scraper_cache[site_id] = scraper_function
-                print(f"💾 Cached scraper function: {scraper_function.__name__}")
-                
-            except Exception as e:
-                print(f"❌ Error during scraper generation: {e}")
-                return []
-        
-        # Step 5: Execute scraper
-        print("🏃 Executing scraper...")
-        try:
-            scraped_articles = scraper_function(homepage_url)
-            print(f"📄 Raw scraper returned {len(scraped_articles)} articles")
-        except Exception as e:
-            print(f"❌ Scraper execution failed: {e}")
+        # Step 2: Get cached scraper or generate a new one
+        scraper_function = _get_scraper_function(homepage_url, site_id)
+        if not scraper_function:
             return []
         
-        # Step 6: Convert to Article objects and validate
-        print("🔍 Converting and validating articles...")
-        valid_articles = []
-        
-        for raw_article in scraped_articles:
-            try:
-                # Convert from scraper's Article class to our Article class
-                article = Article(
-                    url=raw_article.url,
-                    title=raw_article.title,
-                    content=raw_article.content
-                )
-                valid_articles.append(article)
-            except ValueError as e:
-                print(f"⚠️  Skipping invalid article: {e}")
-                continue
-            except Exception as e:
-                print(f"⚠️  Skipping article due to error: {e}")
-                continue
-        
-        print(f"✅ Validated {len(valid_articles)} articles")
+        # Step 3: Discover article URLs from sitemaps/feeds
+        spec = getattr(scraper_function, 'spec', None)
+        url_pattern = spec.article_url_pattern() if spec is not None else None
+        canonicalizer = spec.canonicalizer() if spec is not None else None
+        discovered_urls = _discover_article_urls(homepage_url, site_id, incremental,
+                                                 url_pattern, canonicalizer)
+        if discovered_urls is not None and not discovered_urls:
+            print("✨ Sitemaps/feeds report no new or changed articles")
+            checkpoint = _start_checkpoint(site_id, homepage_url)
+            if checkpoint is not None:
+                # Nothing new is still an observation for the freshness scheduler
+                checkpoint.database.finish_session(checkpoint.session_id, 0)
+            return []
         
-        # Step 7: Save to database (optional)
-        save_to_db = os.getenv('SAVE_TO_DB', 'true').lower() == 'true'
-        if save_to_db and valid_articles:
-            print("💾 Saving articles to database...")
-            try:
-                from src.database import Database
-                
-                db = Database()
-                session_id = db.start_session(site_id)
-                
-                try:
-                    save_result = db.save_articles(valid_articles, site_id)
-                    db.finish_session(session_id, save_result['saved'])
-                    
-                    print(f"📊 Database save result: {save_result}")
-                    if save_result['duplicates'] > 0:
-                        print(f"ℹ️  Note: {save_result['duplicates']} articles were duplicates")
-                        
-                except Exception as e:
-                    db.finish_session(session_id, 0, str(e))
-                    print(f"⚠️  Database save failed: {e}")
-                    # Don't fail the scraping, just log the error
-                    
-            except Exception as e:
-                print(f"⚠️  Database initialization failed: {e}")
-                # Don't fail the scraping, just log the error
+        # Step 4: Execute scraper, saving articles as they are scraped (optional)
+        checkpoint = _start_checkpoint(site_id, homepage_url)
+        if checkpoint is not None and incremental and discovered_urls:
+            # Stored articles an incremental discovery returns have changed since they were scraped
+            checkpoint.refetch.update(checkpoint.database.filter_known_urls(discovered_urls))
+        valid_articles = _run_scraper(scraper_function, homepage_url, site_id, discovered_urls, checkpoint,
+                                      incremental)
+        if valid_articles is None:
+            return []
         
-        # Step 8: Return results
+        # Step 5: Return results
         print(f"🎉 Successfully extracted {len(valid_articles)} articles")
         return valid_articles
         
@@ -171,26 +377,159 @@ def get_articles(homepage_url: str) -> List[Article]:
         return []
 
 
+def resume_session(session_id: int) -> List[Article]:
+    """
+    Continue an interrupted scraping session from its checkpointed frontier.
+    
+    Only URLs that are not done yet are fetched; articles completed before the
+    interruption are read back from the database.
+    
+    Args:
+        session_id: ID of a 'running', 'failed' or 'partial' row in scraping_sessions
+        
+    Returns:
+        List of all Article objects of the session
+    """
+    print(f"♻️  Resuming scraping session {session_id}")
+    
+    try:
+        from src.database import get_database
+        from src.checkpoint import SessionCheckpoint
+        
+        db = get_database()
+        session = db.get_session(session_id)
+        if not session:
+            print(f"❌ Session {session_id} not found")
+            return []
+        if session['status'] == 'completed':
+            print(f"ℹ️  Session {session_id} already completed")
+            return []
+        if not session.get('homepage_url'):
+            print(f"❌ Session {session_id} has no homepage URL to resume from")
+            return []
+        
+        homepage_url = session['homepage_url']
+        checkpoint = SessionCheckpoint(db, session_id, session['site'])
+        # articles_scraped is only written when a session finishes; done URLs survive a crash
+        checkpoint.saved = len(checkpoint.article_urls())
+        
+        pending_urls = checkpoint.pending_urls()
+        print(f"📋 {len(pending_urls)} URLs left, {len(checkpoint.completed_urls())} already done")
+        
+        articles = []
+        if pending_urls:
+            scraper_function = _get_scraper_function(homepage_url, session['site'])
+            if not scraper_function:
+                return []
+            if _run_scraper(scraper_function, homepage_url, session['site'], pending_urls, checkpoint) is None:
+                return []
+        else:
+            db.finish_session(session_id, checkpoint.saved)
+        
+        # Return the whole session's articles, including those scraped before the interruption
+        for url in checkpoint.article_urls():
+            row = db.get_article_by_url(url)
+            if row:
+                articles.append(Article(url=row['url'], title=row['title'], content=row['content']))
+        
+        print(f"🎉 Session {session_id} complete with {len(articles)} articles")
+        return articles
+        
+    except Exception as e:
+        print(f"❌ Unexpected error in resume_session: {e}")
+        import traceback
+        traceback.print_exc()
+        return []
+
+
+def reextract_site(homepage_url: str) -> List[Article]:
+    """
+    Re-extract a site's articles from the page archive with its current scraper spec.
+    
+    Used after fixing selectors: pages archived by earlier runs (SCRAPER_ARCHIVE_DIR)
+    are extracted again in parallel worker processes and the stored articles are
+    overwritten, without refetching anything.
+    
+    Args:
+        homepage_url: URL of the website whose archived pages to re-extract
+        
+    Returns:
+        List of re-extracted Article objects
+    """
+    print(f"📼 Re-extracting archived pages of: {homepage_url}")
+    
+    try:
+        from src.archive import get_archive
+        from src.database import get_database
+        from src.engine import ScraperSpec, replay_spec
+        
+        archive = get_archive()
+        if archive is None:
+            print("❌ No page archive configured (set SCRAPER_ARCHIVE_DIR)")
+            return []
+        
+        site_id = _create_site_id(homepage_url)
+        db = get_database()
+        spec_json = db.get_scraper_spec(site_id)
+        if not spec_json:
+            print(f"❌ No stored scraper spec for {site_id}")
+            return []
+        
+        articles = _validate_articles(replay_spec(ScraperSpec.from_json(spec_json), archive))
+        new = sum(1 for article in articles
+                  if db.upsert_article(article.url, article.title, article.content, site_id))
+        print(f"💾 Updated {len(articles) - new} stored articles, added {new}")
+        return articles
+        
+    except Exception as e:
+        print(f"❌ Unexpected error in reextract_site: {e}")
+        import traceback
+        traceback.print_exc()
+        return []
+
+
 def clear_cache():
-    """Clear the scraper cache to force regeneration."""
+    """Clear the in-process scraper cache (stored specs are kept, see clear_stored_specs)."""
     global _scraper_cache
     _scraper_cache.clear()
     print("🧹 Scraper cache cleared")
 
 
+def clear_stored_specs():
+    """Delete every stored scraper spec, forcing regeneration on the next run."""
+    clear_cache()
+    try:
+        from src.database import get_database
+        get_database().clear_scraper_specs()
+        print("🧹 Stored scraper specs deleted")
+    except Exception as e:
+        print(f"⚠️  Could not clear stored scraper specs: {e}")
+
+
 if __name__ == "__main__":
     """Command line testing interface."""
     if len(sys.argv) < 2:
         print("Usage: python src/main.py <homepage_url>")
+        print("       python src/main.py --resume <session_id>")
+        print("       python src/main.py --reextract <homepage_url>")
         print("Example: python src/main.py http://localhost:8000")
         sys.exit(1)
     
-    url = sys.argv[1]
-    print(f"🔍 Testing article extraction from: {url}")
-    print("=" * 60)
-    
-    # Extract articles
-    articles = get_articles(url)
+    if sys.argv[1] == '--resume' and len(sys.argv) > 2:
+        print(f"🔍 Resuming scraping session: {sys.argv[2]}")
+        print("=" * 60)
+        articles = resume_session(int(sys.argv[2]))
+    elif sys.argv[1] == '--reextract' and len(sys.argv) > 2:
+        print(f"🔍 Re-extracting archived pages: {sys.argv[2]}")
+        print("=" * 60)
+        articles = reextract_site(sys.argv[2])
+    else:
+        url = sys.argv[1]
+        print(f"🔍 Testing article extraction from: {url}")
+        print("=" * 60)
+        
+        # Extract articles
+        articles = get_articles(url)
     
     print("\n" + "=" * 60)
     print("📊 RESULTS SUMMARY")
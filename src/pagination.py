@@ -0,0 +1,72 @@
+from typing import List, Dict, Callable, Optional, Tuple
+import re
+
+
+# Page number in a path segment after 'page' (/page/3/) or in a query parameter (?page=3).
+# Bare 'p' is left out: ?p=123 and /p/123 are post permalinks on many CMSs
+PAGE_PATH = re.compile(r'(/page/)(\d+)(?=/|$|\?|#)', re.I)
+PAGE_QUERY = re.compile(r'([?&](?:page|paged|pg)=)(\d+)(?=&|$|#)', re.I)
+
+
+def page_template(url: str) -> Optional[Tuple[str, int]]:
+    """Split a numbered listing URL into its template and page number.
+
+    e.g. 'https://site/page/3/' -> ('https://site/page/{n}/', 3). Returns
+    None for URLs without a recognizable page number.
+    """
+    for pattern in (PAGE_PATH, PAGE_QUERY):
+        match = None
+        for match in pattern.finditer(url):
+            pass  # The last page number wins (e.g. /2024/page/3/)
+        if match:
+            template = url[:match.start(2)] + '{n}' + url[match.end(2):]
+            return template, int(match.group(2))
+    return None
+
+
+def infer_templates(urls: List[str]) -> Dict[str, int]:
+    """Pagination templates among links, with the highest page number linked for each."""
+    templates: Dict[str, int] = {}
+    for url in urls:
+        parsed = page_template(url)
+        if parsed:
+            template, number = parsed
+            templates[template] = max(templates.get(template, 0), number)
+    return templates
+
+
+def page_url(template: str, number: int) -> str:
+    """URL of page `number` of a pagination template."""
+    return template.replace('{n}', str(number))
+
+
+def find_last_page(exists: Callable[[int], bool], known_last: int, limit: int) -> int:
+    """Last existing page, found with O(log N) probes past the highest linked page.
+
+    Probes known_last + 1 first (listings often link their last page), then
+    doubles the page number until a page is missing and binary-searches the
+    gap. Pages beyond `limit` are never probed.
+
+    Args:
+        exists: Whether a page number exists (fetches it)
+        known_last: Highest page number known to exist
+        limit: Highest page number worth finding
+    """
+    if known_last >= limit:
+        return limit
+
+    last, probe = known_last, known_last + 1
+    while exists(probe):
+        last = probe
+        if last >= limit:
+            return limit
+        probe = min(last * 2, limit)
+
+    missing = probe
+    while missing - last > 1:
+        middle = (last + missing) // 2
+        if exists(middle):
+            last = middle
+        else:
+            missing = middle
+    return last
@@ -0,0 +1,134 @@
+from typing import List, Optional, Union, TYPE_CHECKING
+import codecs
+import re
+
+if TYPE_CHECKING:  # bs4 is imported on first parse, keeping `import src.engine` fast
+    from bs4 import BeautifulSoup, SoupStrainer
+
+
+# Parse modes
+PARSE_FULL = 'full'        # Whole document
+PARSE_LINKS = 'links'      # Only <a href> elements (link discovery)
+PARSE_TARGETS = 'targets'  # Only the subtrees the given selectors can match in
+
+# First compound of a selector that a SoupStrainer can anchor on: a tag name,
+# optionally followed by classes, ids and attribute tests
+_ANCHOR_COMPOUND = re.compile(r'^([a-zA-Z][\w-]*)((?:[.#][\w-]+|\[[^\]]*\])*)$')
+
+# Anchors that cover (nearly) the whole document, where straining saves nothing
+_DOCUMENT_TAGS = {'html', 'body', 'head'}
+
+# Charset sniffing: byte order marks, the Content-Type header parameter and
+# <meta charset> / <meta http-equiv> declarations near the start of the page
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+_HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.I)
+META_SNIFF_BYTES = 4096
+# Undeclared pages: UTF-8 when the bytes are valid UTF-8, else the web's legacy default
+DEFAULT_ENCODING = 'utf-8'
+LEGACY_ENCODING = 'cp1252'
+
+
+def _known_encoding(name: Optional[str]) -> Optional[str]:
+    """Normalized codec name, or None if Python does not know the encoding."""
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def sniff_encoding(content: bytes, content_type: Optional[str] = None) -> str:
+    """Resolve a page's encoding cheaply, without statistical detection.
+
+    Checks, in the order browsers do: a byte order mark, the charset of the
+    Content-Type header, then a <meta> charset declaration in the first few
+    KB. Pages declaring nothing are UTF-8 if they decode as such and
+    Windows-1252 otherwise.
+    """
+    for bom, encoding in _BOMS:
+        if content.startswith(bom):
+            return encoding
+
+    if content_type:
+        match = _HEADER_CHARSET.search(content_type)
+        encoding = _known_encoding(match.group(1)) if match else None
+        if encoding:
+            return encoding
+
+    match = _META_CHARSET.search(content[:META_SNIFF_BYTES])
+    encoding = _known_encoding(match.group(1).decode('ascii', 'ignore')) if match else None
+    if encoding:
+        return encoding
+
+    if content.isascii():
+        return DEFAULT_ENCODING
+    try:
+        content.decode(DEFAULT_ENCODING)
+        return DEFAULT_ENCODING
+    except UnicodeDecodeError:
+        return LEGACY_ENCODING
+
+
+def response_encoding(response) -> str:
+    """Encoding of a fetched page, sniffed from its raw bytes and headers."""
+    return sniff_encoding(response.content, response.headers.get('Content-Type'))
+
+
+def strainer_for_selectors(selectors: List[str]) -> Optional['SoupStrainer']:
+    """Build a SoupStrainer keeping only subtrees the selectors can match in.
+
+    Each selector is anchored on the tag name of its first compound selector
+    (e.g. 'article' for 'article div.content'); only those elements and their
+    descendants are built into the tree. Returns None when any selector cannot
+    be anchored this way (class-only, universal, pseudo-classes, html/body),
+    in which case the document must be parsed in full.
+    """
+    names = set()
+    for selector in selectors:
+        for alternative in selector.split(','):
+            parts = alternative.strip().split()
+            if not parts:
+                return None
+            match = _ANCHOR_COMPOUND.match(parts[0])
+            if not match or match.group(1).lower() in _DOCUMENT_TAGS:
+                return None
+            names.add(match.group(1).lower())
+
+    from bs4 import SoupStrainer
+    return SoupStrainer(sorted(names)) if names else None
+
+
+def parse_html(markup: Union[str, bytes], mode: str = PARSE_FULL,
+               selectors: Optional[List[str]] = None,
+               from_encoding: Optional[str] = None) -> 'BeautifulSoup':
+    """Parse HTML with lxml, building only the part of the tree the caller needs.
+
+    Args:
+        markup: Raw page bytes or decoded text
+        mode: PARSE_FULL, PARSE_LINKS (only <a href>) or PARSE_TARGETS
+        selectors: CSS selectors for PARSE_TARGETS; falls back to a full parse
+            when they cannot be anchored
+        from_encoding: Known document encoding for byte input; sniffed from
+            the bytes when omitted (see sniff_encoding)
+    """
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    parse_only = None
+    if mode == PARSE_LINKS:
+        parse_only = SoupStrainer('a', href=True)
+    elif mode == PARSE_TARGETS:
+        parse_only = strainer_for_selectors(selectors or [])
+    elif mode != PARSE_FULL:
+        raise ValueError(f"Unknown parse mode: {mode}")
+
+    if isinstance(markup, bytes):
+        # A known encoding skips bs4's whole-document charset detection
+        return BeautifulSoup(markup, 'lxml', parse_only=parse_only,
+                             from_encoding=from_encoding or sniff_encoding(markup))
+    return BeautifulSoup(markup, 'lxml', parse_only=parse_only)
@@ -1,30 +1,43 @@
-from typing import Dict, Any
+from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from src.selector_enhancer import SelectorEnhancer
+from src.selector_detector import SelectorDetector
+from src.selector_cache import select_one, is_valid_selector
 from src.generator import ScraperGenerator
-from src.database import Database
+from src.database import get_database
+from src.main import _create_site_id
+from src.validation import validate_spec, validation_passed, print_report, MAX_VALIDATION_PAGES
+from src.parsing import PARSE_LINKS
 
 
 class ScraperPipeline:
     def __init__(self):
         """Initialize pipeline components."""
         self.generator = ScraperGenerator()
-        self.database = Database()
+        self.database = get_database()
         
-    def generate_scraper_for_site(self, site_url: str) -> Dict[str, Any]:
+    def generate_scraper_for_site(self, site_url: str, site_id: Optional[str] = None,
+                                  export_code: bool = False) -> Dict[str, Any]:
         """Complete scraper generation pipeline for a site.
         
         Args:
             site_url: URL of the website to generate scraper for
+            site_id: Key the scraper spec is stored under (defaults to main._create_site_id)
+            export_code: Also write a Python scraper module to scrapers/
             
         Returns:
-            Dict with scraper_path, selectors, confidence, and metadata
+            Dict with spec, scraper_path (None unless exported), selectors, confidence,
+            validation report and metadata; an error (with the rejected spec and its
+            validation report) when the spec fails validation, in which case it is
+            not stored and the site's previous spec stays in place
         """
         print(f"\n🚀 Starting complete scraper generation pipeline for: {site_url}")
         
         try:
             # Step 1: Enhanced selector detection
             print("🔍 Step 1: Analyzing site and detecting selectors...")
-            enhancer = SelectorEnhancer(site_url)
+            enhancer = SelectorEnhancer(site_url, self.database)
             selector_result = enhancer.get_enhanced_selectors()
             
             if 'error' in selector_result:
@@ -35,27 +48,71 @@ class ScraperPipeline:
                     'confidence': 'none'
                 }
             
-            # Step 2: Generate scraper code
-            print("🛠️  Step 2: Generating scraper code...")
+            # Step 2: Build scraper spec for the shared engine
+            print("🛠️  Step 2: Building scraper spec...")
             site_name = site_url.split('//')[-1].split('/')[0]  # Extract domain
+            metadata = {
+                'site_url': site_url,
+                'method': selector_result['method'],
+                'confidence': selector_result['confidence'],
+                'coverage': selector_result.get('coverage', {}),
+                'article_count': selector_result.get('total_articles', 0),
+                'article_urls': selector_result.get('article_urls', []),
+                'fallbacks': selector_result.get('fallbacks', {}),
+                'url_patterns': selector_result.get('url_patterns', []),
+                'canonical_rules': selector_result.get('canonical_rules', {})
+            }
+            
+            spec = self.generator.build_spec(site_name, selector_result['selectors'], metadata)
             
-            scraper_path = self.generator.generate_and_save(
-                site_name=site_name,
-                selectors=selector_result['selectors'],
-                metadata={
-                    'site_url': site_url,
-                    'method': selector_result['method'],
-                    'confidence': selector_result['confidence'],
-                    'article_count': selector_result.get('total_articles', 0),
-                    'article_urls': selector_result.get('article_urls', [])
+            # Step 3: Validate the spec against the discovered article pages (fetching uncached ones)
+            article_urls = list(dict.fromkeys(metadata['article_urls']))[:MAX_VALIDATION_PAGES]
+            page_cache = enhancer.analyzer.page_cache
+            missing = [url for url in article_urls if url not in page_cache]
+            if missing:
+                enhancer.analyzer.fetch_pages(missing, PARSE_LINKS, quiet=True)
+            pages = {url: page_cache[url] for url in article_urls if url in page_cache}
+            report = validate_spec(spec, pages)
+            print_report(report)
+            spec.metadata['validation'] = {
+                'pages': report['pages'],
+                'primary_rate': report['primary_rate'],
+                'extraction_rate': report['extraction_rate'],
+                'ms_per_page': report['ms_per_page']
+            }
+            if not validation_passed(report):
+                return {
+                    'error': f"Validation failed: primary selectors matched only {report['primary_rate']:.0%} "
+                             f"of {report['pages']} article pages",
+                    'spec': spec,
+                    'validation': report,
+                    'scraper_path': None,
+                    'selectors': selector_result['selectors'],
+                    'confidence': 'none'
                 }
-            )
             
-            # Step 3: Return results
+            # Same key get_articles looks specs up by
+            spec_key = site_id or _create_site_id(site_url)
+            self.database.save_scraper_spec(spec_key, spec.to_json())
+            print(f"💾 Stored scraper spec for {spec_key}")
+            
+            # Code generation is an optional export of the same spec
+            scraper_path = None
+            if export_code:
+                scraper_path = self.generator.generate_and_save(
+                    site_name=site_name,
+                    selectors=selector_result['selectors'],
+                    metadata=metadata
+                )
+            
+            # Step 4: Return results
             result = {
+                'spec': spec,
+                'validation': report,
                 'scraper_path': scraper_path,
                 'selectors': selector_result['selectors'],
                 'confidence': selector_result['confidence'],
+                'coverage': selector_result.get('coverage', {}),
                 'method': selector_result['method'],
                 'notes': selector_result.get('notes', ''),
                 'total_articles': selector_result.get('total_articles', 0),
@@ -63,7 +120,9 @@ class ScraperPipeline:
             }
             
             print(f"\n🎉 Pipeline complete!")
-            print(f"   💾 Scraper saved to: {scraper_path}")
+            print(f"   💾 Scraper spec: {spec.scraper_name} ({spec.discovery} discovery)")
+            if scraper_path:
+                print(f"   📝 Scraper exported to: {scraper_path}")
             print(f"   🎯 Method: {result['method']}")
             print(f"   🕰️ Confidence: {result['confidence']}")
             print(f"   📄 Articles found: {result['total_articles']}")
@@ -76,4 +135,73 @@ class ScraperPipeline:
                 'scraper_path': None,
                 'selectors': {},
                 'confidence': 'none'
-            }
\ No newline at end of file
+            }
+    
+    def repair_selectors(self, site_url: str, spec_key: str, spec, sample_urls: List[str],
+                         sample_size: int = 3) -> Dict[str, Any]:
+        """Re-detect the selectors of a site whose template changed.
+        
+        Only selector detection runs, on the homepage and a small sample of
+        article pages the current selectors failed on; there is no site crawl
+        and no LLM call. Selectors that still work are kept.
+        
+        Args:
+            site_url: URL of the website homepage
+            spec_key: Key the scraper spec is stored under
+            spec: Current ScraperSpec of the site
+            sample_urls: Article URLs where extraction failed
+            sample_size: Number of article pages to detect on
+            
+        Returns:
+            Dict with the repaired spec and selectors, or an error
+        """
+        from src.archive import get_archive
+        from src.fetch import get_client
+        from src.parsing import parse_html, response_encoding
+        
+        print(f"🩺 Re-detecting selectors for {spec_key} on {min(len(sample_urls), sample_size)} fresh pages...")
+        client = get_client()
+        archive = get_archive()
+        
+        def fetch(url: str):
+            try:
+                # Failed pages were archived by the run that detected the drift
+                archived = archive.get(url) if archive is not None and url != site_url else None
+                if archived is not None:
+                    return parse_html(archived)
+                response = client.get(url, timeout=spec.timeout)
+                response.raise_for_status()
+                return parse_html(response.content, from_encoding=response_encoding(response))
+            except Exception as e:
+                print(f"   ⚠️  Could not fetch {url}: {e}")
+                return None
+        
+        with ThreadPoolExecutor(max_workers=sample_size + 1) as executor:
+            soups = list(executor.map(fetch, [site_url] + sample_urls[:sample_size]))
+        homepage_soup, article_soups = soups[0], [soup for soup in soups[1:] if soup is not None]
+        
+        if homepage_soup is None or not article_soups:
+            return {'error': "No sample pages could be fetched"}
+        
+        detector = SelectorDetector()
+        detected = detector.detect_selectors(homepage_soup, article_soups)
+        chains = detector.detect_selector_chains(article_soups)
+        selectors = dict(spec.selectors)
+        selectors['title'] = detected['title']
+        selectors['content'] = detected['content']
+        
+        # Keep the link selector unless the homepage changed too
+        if not is_valid_selector(selectors.get('article_links', '')) \
+                or select_one(homepage_soup, selectors['article_links']) is None:
+            selectors['article_links'] = detected['article_links']
+        
+        if not detector.selectors_work(selectors, homepage_soup, article_soups):
+            return {'error': f"Re-detected selectors do not match the sample pages: {selectors}"}
+        
+        fallbacks = {name: chain[1:] for name, chain in chains.items()}
+        metadata = {name: value for name, value in spec.metadata.items() if name != 'repair_failures'}
+        repaired = replace(spec, selectors=selectors, fallbacks=fallbacks,
+                           metadata={**metadata, 'method': 'drift_repair'})
+        self.database.save_scraper_spec(spec_key, repaired.to_json())
+        print(f"   ✅ Repaired selectors: {selectors}")
+        return {'spec': repaired, 'selectors': selectors}
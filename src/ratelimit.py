@@ -0,0 +1,162 @@
+from typing import Dict, List, Optional, Callable
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import threading
+import time
+
+
+THROTTLE_STATUSES = (429, 503)
+# Longest Retry-After honoured; requests asked to wait longer fail instead
+MAX_RETRY_AFTER = 60.0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta seconds or HTTP date) into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class HostLimiter:
+    """AIMD limiter for a single host.
+
+    Concurrency grows additively (about +1 per window of successful requests)
+    while response latency stays near its baseline, and is cut multiplicatively
+    on 429/503 or a Retry-After header. The spacing between request starts
+    never drops below the host's robots.txt Crawl-delay.
+    """
+
+    def __init__(self, crawl_delay: float = 0.0, max_concurrency: int = 8,
+                 decrease_factor: float = 0.5, latency_tolerance: float = 2.0):
+        self.min_delay = crawl_delay
+        self.delay = crawl_delay
+        self.max_concurrency = max_concurrency
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+
+        self.concurrency = 1.0
+        self.in_flight = 0
+        self.next_start = 0.0
+        self.baseline_latency: Optional[float] = None
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Block until a request to this host may start."""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if self.in_flight < int(self.concurrency) and now >= self.next_start:
+                    self.in_flight += 1
+                    self.next_start = now + self.delay
+                    return
+                timeout = self.next_start - now if now < self.next_start else None
+                self._condition.wait(timeout)
+
+    def release(self, latency: float, status_code: Optional[int] = None,
+                retry_after: Optional[float] = None):
+        """Record the outcome of a request and adjust the budget."""
+        with self._condition:
+            self.in_flight -= 1
+
+            if status_code in THROTTLE_STATUSES or retry_after is not None:
+                # Multiplicative decrease: halve concurrency, double spacing
+                self.concurrency = max(1.0, self.concurrency * self.decrease_factor)
+                self.delay = max(self.min_delay, self.delay * 2 or 1.0)
+                if retry_after is not None:
+                    pause = min(retry_after, MAX_RETRY_AFTER)
+                    self.next_start = max(self.next_start, time.monotonic() + pause)
+            elif status_code is not None and status_code < 500:
+                if self.baseline_latency is None:
+                    self.baseline_latency = latency
+                if latency <= self.baseline_latency * self.latency_tolerance:
+                    # Additive increase: +1 concurrency per `concurrency` successes
+                    self.concurrency = min(self.max_concurrency,
+                                           self.concurrency + 1.0 / self.concurrency)
+                    self.delay = max(self.min_delay, self.delay * 0.8 if self.delay > 0.01 else 0.0)
+                # Slowly track latency so the baseline follows the host
+                self.baseline_latency = 0.9 * self.baseline_latency + 0.1 * latency
+
+            self._condition.notify_all()
+
+
+class AdaptiveRateLimiter:
+    """Per-host adaptive limiters seeded from each host's robots.txt Crawl-delay."""
+
+    def __init__(self, robots_fetcher: Optional[Callable[[str], Optional[str]]] = None,
+                 user_agent: str = '*', max_concurrency: int = 8):
+        """Initialize limiter registry.
+
+        Args:
+            robots_fetcher: Returns robots.txt text for a URL (None if missing)
+            user_agent: User agent to read Crawl-delay for
+            max_concurrency: Upper bound on parallel requests per host
+        """
+        self.robots_fetcher = robots_fetcher
+        self.user_agent = user_agent
+        self.max_concurrency = max_concurrency
+        self._limiters: Dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def _crawl_delay(self, scheme: str, host: str) -> float:
+        """Read Crawl-delay for our user agent from robots.txt."""
+        if not self.robots_fetcher:
+            return 0.0
+        try:
+            robots_txt = self.robots_fetcher(f"{scheme}://{host}/robots.txt")
+        except Exception:
+            return 0.0
+        if not robots_txt:
+            return 0.0
+
+        # urllib.robotparser drops fractional delays, so parse the groups directly
+        delays: Dict[str, float] = {}
+        agents: List[str] = []
+        in_rules = False
+        for line in robots_txt.splitlines():
+            name, _, value = line.split('#', 1)[0].partition(':')
+            name = name.strip().lower()
+            value = value.strip()
+            if name == 'user-agent':
+                if in_rules:
+                    agents, in_rules = [], False
+                agents.append(value.lower())
+            elif name:
+                in_rules = True
+                if name == 'crawl-delay':
+                    try:
+                        delay = float(value)
+                    except ValueError:
+                        continue
+                    for agent in agents:
+                        delays.setdefault(agent, delay)
+
+        return delays.get(self.user_agent.lower(), delays.get('*', 0.0))
+
+    def for_host(self, scheme: str, host: str) -> HostLimiter:
+        """Get (or create) the limiter for a host."""
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            crawl_delay = self._crawl_delay(scheme, host)
+            with self._lock:
+                limiter = self._limiters.setdefault(
+                    host, HostLimiter(crawl_delay, max_concurrency=self.max_concurrency)
+                )
+            if crawl_delay:
+                print(f"🐢 {host}: honouring Crawl-delay of {crawl_delay:g}s")
+        return limiter
+
+    def max_workers(self, host: str) -> int:
+        """Largest number of parallel workers worth running against a host."""
+        limiter = self._limiters.get(host)
+        if limiter and limiter.min_delay > 0:
+            return 1  # Requests are spaced out anyway
+        return self.max_concurrency
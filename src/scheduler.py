@@ -0,0 +1,307 @@
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import math
+import sys
+import time
+import requests
+from src.database import Database, get_database
+from src.fetch import get_client
+
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'  # Same format as SQLite CURRENT_TIMESTAMP (UTC)
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse a SQLite UTC timestamp string."""
+    if not value:
+        return None
+    return datetime.strptime(value[:19], TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+
+
+def _format_timestamp(value: datetime) -> str:
+    """Format a datetime the way SQLite stores CURRENT_TIMESTAMP."""
+    return value.astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+class RequestBudget:
+    """Sliding-window budget of HTTP requests shared by all scheduled sites.
+
+    Spending is recorded in the database, so one-shot runs (cron) and
+    concurrent daemons draw from the same budget.
+    """
+
+    def __init__(self, database: Database, max_requests: int, window_seconds: float = 3600.0):
+        self.database = database
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+
+    def remaining(self, now: Optional[float] = None) -> int:
+        """Requests still available in the current window."""
+        now = time.time() if now is None else now
+        return self.max_requests - self.database.get_request_spend(now - self.window_seconds)
+
+    def spend(self, cost: int, now: Optional[float] = None):
+        """Record requests made against the budget."""
+        if cost > 0:
+            self.database.record_request_spend(time.time() if now is None else now, cost)
+
+    def seconds_until_available(self, cost: int, now: Optional[float] = None) -> float:
+        """Seconds until `cost` requests fit, as earlier spending leaves the window."""
+        now = time.time() if now is None else now
+        since = now - self.window_seconds
+        available = self.max_requests - self.database.get_request_spend(since)
+        if available >= cost:
+            return 0.0
+        for spent_at, spent in self.database.get_request_spends(since):
+            available += spent
+            if available >= cost:
+                return max(0.0, spent_at + self.window_seconds - now)
+        return self.window_seconds  # More than the whole budget: try again after a full window
+
+
+class FreshnessScheduler:
+    """Schedules recurring scrapes based on each site's observed change rate.
+
+    Every finished session in `scraping_sessions` is an observation of how many
+    new articles appeared since the previous session. Sites are modelled as a
+    Poisson process: the rate is total new articles over total elapsed time,
+    smoothed with a weak prior so new sites still get visited. The next crawl is
+    spaced so that roughly `target_new_articles` are expected to be waiting.
+
+    Before a full scrape the homepage is probed with a conditional GET
+    (If-None-Match / If-Modified-Since); a 304 counts as an observation of zero
+    new articles at the cost of a single request.
+    """
+
+    def __init__(self, database: Optional[Database] = None,
+                 request_budget: int = 2000,
+                 budget_window: float = 3600.0,
+                 target_new_articles: float = 1.0,
+                 min_interval_hours: float = 0.25,
+                 max_interval_hours: float = 24.0 * 7,
+                 prior_articles: float = 1.0,
+                 prior_hours: float = 24.0,
+                 history_size: int = 20):
+        """Initialize scheduler with its database and scheduling limits."""
+        self.database = database or get_database()
+        self.budget = RequestBudget(self.database, request_budget, budget_window)
+        self.target_new_articles = target_new_articles
+        self.min_interval = timedelta(hours=min_interval_hours)
+        self.max_interval = timedelta(hours=max_interval_hours)
+        self.prior_articles = prior_articles
+        self.prior_hours = prior_hours
+        self.history_size = history_size
+        self.client = get_client()
+
+    def add_site(self, homepage_url: str) -> str:
+        """Register a site for recurring scrapes, return its site ID."""
+        from src.main import _create_site_id
+
+        site_id = _create_site_id(homepage_url)
+        self.database.register_site_schedule(site_id, homepage_url)
+        return site_id
+
+    def estimate_change_rate(self, site: str) -> float:
+        """Estimate new articles per hour from the site's session history."""
+        sessions = self.database.get_site_sessions(site, limit=self.history_size)
+
+        new_articles = self.prior_articles
+        hours = self.prior_hours
+
+        # The first session is the initial backfill, so only intervals between
+        # consecutive sessions count as observations.
+        for previous, current in zip(sessions, sessions[1:]):
+            started = _parse_timestamp(previous['started_at'])
+            finished = _parse_timestamp(current['started_at'])
+            if not started or not finished:
+                continue
+            elapsed = (finished - started).total_seconds() / 3600
+            if elapsed <= 0:
+                continue
+            new_articles += current['articles_scraped'] or 0
+            hours += elapsed
+
+        return new_articles / hours
+
+    def next_interval(self, change_rate: float) -> timedelta:
+        """Time until `target_new_articles` are expected, clamped to the limits."""
+        if change_rate <= 0:
+            return self.max_interval
+        interval = timedelta(hours=self.target_new_articles / change_rate)
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def get_due_sites(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Return due sites ordered by expected new articles per request."""
+        now = now or datetime.now(timezone.utc)
+        articles_by_site = self.database.get_stats()['articles_by_site']
+
+        due = []
+        for schedule in self.database.get_site_schedules():
+            next_run = _parse_timestamp(schedule['next_run_at'])
+            if next_run and next_run > now:
+                continue
+
+            rate = self.estimate_change_rate(schedule['site'])
+            last_run = _parse_timestamp(schedule['last_run_at'])
+            if last_run:
+                expected_new = rate * (now - last_run).total_seconds() / 3600
+            else:
+                expected_new = math.inf  # Never scraped: always worth a visit
+
+            # A full re-scrape fetches roughly every known article plus listings
+            cost = articles_by_site.get(schedule['site'], 0) + 1
+
+            due.append({
+                **schedule,
+                'change_rate': rate,
+                'expected_new': expected_new,
+                'estimated_cost': cost,
+                'priority': expected_new / cost
+            })
+
+        due.sort(key=lambda item: item['priority'], reverse=True)
+        return due
+
+    def _probe(self, schedule: Dict[str, Any]) -> Tuple[str, Dict[str, Optional[str]]]:
+        """Conditionally fetch the homepage, return (status, validators)."""
+        headers = {}
+        if schedule.get('etag'):
+            headers['If-None-Match'] = schedule['etag']
+        if schedule.get('last_modified'):
+            headers['If-Modified-Since'] = schedule['last_modified']
+
+        try:
+            response = self.client.get(schedule['homepage_url'], headers=headers, timeout=10)
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️  Probe failed for {schedule['homepage_url']}: {e}")
+            return 'unknown', {}
+
+        validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+        if response.status_code == 304:
+            return 'not_modified', validators
+        return 'modified', validators
+
+    def _reschedule(self, site: str, now: datetime, validators: Dict[str, Optional[str]]):
+        """Store the refreshed change rate and next run time for a site."""
+        rate = self.estimate_change_rate(site)
+        fields: Dict[str, Any] = {
+            'change_rate': rate,
+            'last_run_at': _format_timestamp(now),
+            'next_run_at': _format_timestamp(now + self.next_interval(rate))
+        }
+        for name, value in validators.items():
+            if value:
+                fields[name] = value
+        self.database.update_site_schedule(site, **fields)
+
+    def run_site(self, schedule: Dict[str, Any]) -> Dict[str, Any]:
+        """Probe a site and re-scrape it if its homepage changed."""
+        from src.main import get_articles
+
+        site = schedule['site']
+        now = datetime.now(timezone.utc)
+
+        sent = self.client.requests_sent
+        probe_status, validators = self._probe(schedule)
+        self.budget.spend(self.client.requests_sent - sent)
+
+        if probe_status == 'not_modified':
+            print(f"💤 {site}: homepage not modified, skipping re-scrape")
+            session_id = self.database.start_session(site, schedule['homepage_url'])
+            self.database.finish_session(session_id, 0)
+            self._reschedule(site, now, validators)
+            return {'site': site, 'status': 'not_modified', 'new_articles': 0}
+
+        # Incremental runs only return new or changed articles
+        sent = self.client.requests_sent
+        articles = get_articles(schedule['homepage_url'], incremental=True)
+        self.budget.spend(self.client.requests_sent - sent)
+        self._reschedule(site, now, validators)
+
+        return {
+            'site': site,
+            'status': 'scraped',
+            'new_articles': len(articles)
+        }
+
+    def run_due(self) -> List[Dict[str, Any]]:
+        """Run every due site that fits in the request budget (one-shot mode)."""
+        due_sites = self.get_due_sites()
+        print(f"🗓️  {len(due_sites)} sites due, {self.budget.remaining()} requests left in budget")
+
+        results = []
+        for schedule in due_sites:
+            # One probe request plus a full scrape if the site turns out to have changed
+            cost = schedule['estimated_cost'] + 1
+            if self.budget.remaining() < cost:
+                # Due again once the budget has room, so the daemon does not poll meanwhile
+                wait = max(1.0, self.budget.seconds_until_available(cost))
+                next_run = datetime.now(timezone.utc) + timedelta(seconds=wait)
+                self.database.update_site_schedule(schedule['site'], next_run_at=_format_timestamp(next_run))
+                print(f"⏳ Budget exhausted, deferring {schedule['site']} by {wait:.0f}s")
+                continue
+
+            try:
+                results.append(self.run_site(schedule))
+            except Exception as e:
+                print(f"❌ Scheduled run failed for {schedule['site']}: {e}")
+                results.append({'site': schedule['site'], 'status': 'failed', 'error': str(e)})
+
+        return results
+
+    def seconds_until_next_run(self, default: float = 60.0) -> float:
+        """Seconds until the earliest scheduled run."""
+        now = datetime.now(timezone.utc)
+        next_runs = [_parse_timestamp(schedule['next_run_at'])
+                     for schedule in self.database.get_site_schedules()]
+        pending = [run for run in next_runs if run]
+        if len(pending) < len(next_runs):
+            return 0.0  # Some site was never scheduled
+        if not pending:
+            return default
+        return max(0.0, (min(pending) - now).total_seconds())
+
+    def run_forever(self, poll_interval: float = 60.0):
+        """Long-running daemon loop: run due sites, then sleep until the next one."""
+        print("🛰️  Freshness scheduler started (Ctrl+C to stop)")
+        try:
+            while True:
+                self.run_due()
+                time.sleep(min(poll_interval, max(1.0, self.seconds_until_next_run(poll_interval))))
+        except KeyboardInterrupt:
+            print("\n👋 Freshness scheduler stopped")
+
+
+if __name__ == "__main__":
+    """Command line interface: add sites, run due scrapes once, or run as a daemon."""
+    usage = (
+        "Usage: python -m src.scheduler add <homepage_url> [<homepage_url> ...]\n"
+        "       python -m src.scheduler run-due\n"
+        "       python -m src.scheduler daemon [poll_seconds]\n"
+        "       python -m src.scheduler due"
+    )
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+
+    scheduler = FreshnessScheduler()
+    command = sys.argv[1]
+
+    if command == 'add' and len(sys.argv) > 2:
+        for url in sys.argv[2:]:
+            print(f"➕ Scheduled {scheduler.add_site(url)} ({url})")
+    elif command == 'run-due':
+        for result in scheduler.run_due():
+            print(f"   {result}")
+    elif command == 'daemon':
+        scheduler.run_forever(float(sys.argv[2]) if len(sys.argv) > 2 else 60.0)
+    elif command == 'due':
+        for schedule in scheduler.get_due_sites():
+            print(f"   {schedule['site']}: {schedule['change_rate']:.3f} new/hour, "
+                  f"expected {schedule['expected_new']:.1f} new, cost ~{schedule['estimated_cost']} requests")
+    else:
+        print(usage)
+        sys.exit(1)
@@ -0,0 +1,99 @@
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+from collections import OrderedDict
+import threading
+
+if TYPE_CHECKING:  # soupsieve/bs4 are imported on first compile, keeping `import src.engine` fast
+    import soupsieve
+    from bs4 import Tag
+
+
+class InvalidSelectorError(ValueError):
+    """Raised when a CSS selector cannot be compiled."""
+
+
+class SelectorCache:
+    """Thread-safe LRU cache of compiled CSS selectors.
+
+    BeautifulSoup's select()/select_one() hand the selector string to soupsieve
+    on every call. Compiling once and reusing the SoupSieve object skips that
+    work, and an invalid selector raises InvalidSelectorError the first time it
+    is compiled instead of failing on every article.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._compiled: 'OrderedDict[str, soupsieve.SoupSieve]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, selector: str) -> 'soupsieve.SoupSieve':
+        """Return the compiled form of a selector, compiling it on first use."""
+        with self._lock:
+            compiled = self._compiled.get(selector)
+            if compiled is not None:
+                self._compiled.move_to_end(selector)
+                self.hits += 1
+                return compiled
+
+        import soupsieve
+        try:
+            compiled = soupsieve.compile(selector)
+        except (soupsieve.SelectorSyntaxError, TypeError) as e:
+            raise InvalidSelectorError(f"Invalid CSS selector {selector!r}: {e}") from e
+
+        with self._lock:
+            self.misses += 1
+            self._compiled[selector] = compiled
+            while len(self._compiled) > self.maxsize:
+                self._compiled.popitem(last=False)
+        return compiled
+
+    def is_valid(self, selector: str) -> bool:
+        """Check whether a selector compiles."""
+        try:
+            self.compile(selector)
+            return True
+        except InvalidSelectorError:
+            return False
+
+    def select_one(self, tag: 'Tag', selector: str) -> Optional['Tag']:
+        """First element matching a selector, like Tag.select_one()."""
+        return self.compile(selector).select_one(tag)
+
+    def select(self, tag: 'Tag', selector: str) -> List['Tag']:
+        """All elements matching a selector, like Tag.select()."""
+        return self.compile(selector).select(tag)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and hit/miss counters."""
+        return {'size': len(self._compiled), 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        """Drop all compiled selectors."""
+        with self._lock:
+            self._compiled.clear()
+
+
+# Process-wide cache shared by the scraper engine, SelectorDetector and LLMClient
+selector_cache = SelectorCache()
+
+
+def compile_selector(selector: str) -> 'soupsieve.SoupSieve':
+    """Compile a selector through the shared cache."""
+    return selector_cache.compile(selector)
+
+
+def select_one(tag: 'Tag', selector: str) -> Optional['Tag']:
+    """First element matching a selector, using the shared cache."""
+    return selector_cache.select_one(tag, selector)
+
+
+def select(tag: 'Tag', selector: str) -> List['Tag']:
+    """All elements matching a selector, using the shared cache."""
+    return selector_cache.select(tag, selector)
+
+
+def is_valid_selector(selector: str) -> bool:
+    """Check whether a selector compiles, using the shared cache."""
+    return selector_cache.is_valid(selector)
@@ -1,7 +1,13 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from bs4 import BeautifulSoup, Tag
 from collections import Counter
 import re
+from src.content_extractor import content_extractor
+from src.selector_cache import is_valid_selector, select_one, InvalidSelectorError
+
+
+# Longest fallback chain kept per field (primary selector included)
+MAX_CHAIN_LENGTH = 4
 
 
 class SelectorDetector:
@@ -13,17 +19,20 @@ class SelectorDetector:
             
         tag = element.name
         
-        # Prefer ID if it exists
+        # Prefer ID if it exists (and forms a valid selector)
         if element.get('id'):
-            return f"{tag}#{element.get('id')}"
+            selector = f"{tag}#{element.get('id')}"
+            if is_valid_selector(selector):
+                return selector
         
         # Use classes if available
         classes = element.get('class', [])
         if classes:
             # Filter out very specific classes (with numbers, unique IDs)
+            # and ones that are not valid CSS identifiers (e.g. "md:flex")
             clean_classes = []
             for cls in classes:
-                if not re.search(r'\d+|uuid|unique|id-', str(cls), re.I):
+                if not re.search(r'\d+|uuid|unique|id-', str(cls), re.I) and is_valid_selector(f".{cls}"):
                     clean_classes.append(str(cls))
             
             if clean_classes:
@@ -33,25 +42,6 @@ class SelectorDetector:
         # Fallback to just tag name
         return tag
     
-    def _get_text_density(self, element: Tag) -> float:
-        """Calculate text-to-HTML ratio for an element."""
-        if not element:
-            return 0.0
-            
-        text_content = element.get_text(strip=True)
-        html_content = str(element)
-        
-        if len(html_content) == 0:
-            return 0.0
-            
-        return len(text_content) / len(html_content)
-    
-    def _count_paragraphs(self, element: Tag) -> int:
-        """Count <p> tags within an element."""
-        if not element:
-            return 0
-        return len(element.find_all('p'))
-    
     def find_article_link_pattern(self, soup: BeautifulSoup) -> Dict[str, Any]:
         """Find pattern for article links."""
         # Find all links that could be article links
@@ -109,116 +99,184 @@ class SelectorDetector:
             'link_selector': 'article a'
         }
     
-    def detect_title_selector(self, soups: List[BeautifulSoup]) -> str:
-        """Find CSS selector for titles by analyzing multiple article pages."""
-        title_selectors = Counter()
+    def _title_candidates(self, soup: BeautifulSoup) -> List[tuple]:
+        """Candidate title selectors of one article page with their priority."""
+        candidates = []
         
-        for soup in soups:
-            candidates = []
-            
-            # Level 1: Look for h1 inside semantic containers (most specific)
-            for container in soup.find_all(['article', 'main']):
-                h1_tags = container.find_all('h1')
-                for h1 in h1_tags:
-                    candidates.append((f"{container.name} h1", 3))  # High priority
-            
-            # Level 2: Look for h1 with title-related classes
-            h1_with_classes = soup.find_all('h1', class_=True)
-            for h1 in h1_with_classes:
-                classes = h1.get('class', [])
-                class_str = ' '.join(classes).lower()
-                if any(word in class_str for word in ['title', 'heading', 'headline']):
-                    selector = self._get_css_selector(h1)
-                    candidates.append((selector, 2))  # Medium priority
-            
-            # Level 3: Look for any h1 (fallback)
-            h1_tags = soup.find_all('h1')
+        # Level 1: Look for h1 inside semantic containers (most specific)
+        for container in soup.find_all(['article', 'main']):
+            h1_tags = container.find_all('h1')
             for h1 in h1_tags:
-                candidates.append(('h1', 1))  # Low priority
-            
-            # Level 4: Check h2 with title classes as backup
-            h2_with_title = soup.find_all(['h2', 'h3'], class_=re.compile(r'title|heading', re.I))
-            for h2 in h2_with_title:
-                selector = self._get_css_selector(h2)
-                candidates.append((selector, 1))  # Low priority
-            
-            # Choose the highest priority candidate
-            if candidates:
-                best_candidate = max(candidates, key=lambda x: x[1])
-                title_selectors[best_candidate[0]] += 1
+                candidates.append((f"{container.name} h1", 3))  # High priority
+        
+        # Level 2: Look for h1 with title-related classes
+        h1_with_classes = soup.find_all('h1', class_=True)
+        for h1 in h1_with_classes:
+            classes = h1.get('class', [])
+            class_str = ' '.join(classes).lower()
+            if any(word in class_str for word in ['title', 'heading', 'headline']):
+                selector = self._get_css_selector(h1)
+                candidates.append((selector, 2))  # Medium priority
+        
+        # Level 3: Look for any h1 (fallback)
+        h1_tags = soup.find_all('h1')
+        for h1 in h1_tags:
+            candidates.append(('h1', 1))  # Low priority
         
-        # Return the most common selector
-        if title_selectors:
-            return title_selectors.most_common(1)[0][0]
+        # Level 4: Check h2 with title classes as backup
+        h2_with_title = soup.find_all(['h2', 'h3'], class_=re.compile(r'title|heading', re.I))
+        for h2 in h2_with_title:
+            selector = self._get_css_selector(h2)
+            candidates.append((selector, 1))  # Low priority
         
-        return 'h1'  # Ultimate fallback
+        return candidates
     
-    def detect_content_selector(self, soups: List[BeautifulSoup]) -> str:
-        """Find CSS selector for content by analyzing multiple article pages."""
-        content_selectors = Counter()
+    def _block_selector(self, soup: BeautifulSoup, block: Tag) -> str:
+        """Selector that finds a content block first on its page, or '' if none is found."""
+        selector = self._get_css_selector(block)
+        if selector != block.name or block.name in ('article', 'main'):
+            if select_one(soup, selector) is block:
+                return selector
         
-        for soup in soups:
-            candidates = []
-            
-            # Level 1: Check for article tag (semantic HTML)
-            articles = soup.find_all('article')
-            for article in articles:
-                paragraph_count = self._count_paragraphs(article)
-                text_density = self._get_text_density(article)
-                
-                if paragraph_count >= 2:  # Must have substantial content
-                    # Look for content divs inside article first
-                    content_divs = article.find_all('div', class_=re.compile(r'content|body|text', re.I))
-                    if content_divs:
-                        for div in content_divs:
-                            div_paragraphs = self._count_paragraphs(div)
-                            if div_paragraphs >= 2:
-                                selector = f"article {self._get_css_selector(div)}"
-                                score = div_paragraphs * 10 + text_density * 5
-                                candidates.append((selector, score))
-                    else:
-                        # Use article itself
-                        score = paragraph_count * 8 + text_density * 5
-                        candidates.append(('article', score))
-            
-            # Level 2: Check for main tag
-            main_tags = soup.find_all('main')
-            for main in main_tags:
-                paragraph_count = self._count_paragraphs(main)
-                text_density = self._get_text_density(main)
-                if paragraph_count >= 2:
-                    score = paragraph_count * 7 + text_density * 5
-                    candidates.append(('main', score))
-            
-            # Level 3: Look for divs with content-related classes
-            content_patterns = ['content', 'article-content', 'post-content', 'body', 
-                              'article-body', 'post-body', 'text', 'entry-content']
-            
-            for pattern in content_patterns:
-                divs = soup.find_all('div', class_=re.compile(pattern, re.I))
-                for div in divs:
-                    paragraph_count = self._count_paragraphs(div)
-                    text_density = self._get_text_density(div)
-                    
-                    if paragraph_count >= 2:
-                        selector = self._get_css_selector(div)
-                        score = paragraph_count * 6 + text_density * 5
-                        candidates.append((selector, score))
+        # Qualify generic or ambiguous selectors with the nearest distinctive ancestor
+        for ancestor in block.parents:
+            if ancestor.name in ('html', '[document]'):
+                break
+            ancestor_selector = self._get_css_selector(ancestor)
+            if ancestor_selector == ancestor.name and ancestor.name not in ('article', 'main', 'section'):
+                continue
+            qualified = f"{ancestor_selector} {selector}"
+            if select_one(soup, qualified) is block:
+                return qualified
+        return ''
+    
+    def _content_candidates(self, soup: BeautifulSoup) -> List[tuple]:
+        """Candidate content selectors of one article page with their block score.
+        
+        Every element of the page is scored at once by the ContentExtractor's
+        feature matrix; the best blocks become the page's candidates.
+        """
+        candidates = []
+        for block, score in content_extractor.rank_blocks(soup, limit=5):
+            selector = self._block_selector(soup, block)
+            if selector:
+                candidates.append((selector, score))
+        return candidates
+    
+    def hit_matrix(self, selectors: List[str], soups: List[BeautifulSoup],
+                   targets: List[Optional[Tag]]) -> List[List[int]]:
+        """Selector x page matrix: 0 = no match with text, 1 = match, 2 = match on the page's target.
+        
+        Each selector is compiled once (shared cache) and evaluated once per page.
+        """
+        matrix = []
+        for selector in selectors:
+            row = []
+            for soup, target in zip(soups, targets):
+                try:
+                    element = select_one(soup, selector)
+                except InvalidSelectorError:
+                    element = None
+                if element is None or not element.get_text(strip=True):
+                    row.append(0)
+                else:
+                    row.append(2 if element is target else 1)
+            matrix.append(row)
+        return matrix
+    
+    def score_field(self, name: str, soups: List[BeautifulSoup]) -> List[Dict[str, Any]]:
+        """Score every candidate selector of a field against all sampled pages at once.
+        
+        Candidates are pooled from all pages. Each page's target is the element
+        its own best candidate picks; a selector's coverage is the share of
+        pages it matches with text, its agreement the share where it matches
+        the target. Selectors are ranked by agreement plus coverage, then by
+        the number of pages they won locally.
+        
+        Args:
+            name: 'title' or 'content'
+            soups: Parsed article pages
             
-            # Choose the highest scoring candidate
+        Returns:
+            List of {'selector', 'coverage', 'agreement', 'pages'} dicts, best first
+        """
+        if name == 'title':
+            candidate_fn, fallback = self._title_candidates, 'h1'  # h1 is the ultimate fallback
+        else:
+            candidate_fn, fallback = self._content_candidates, 'article'  # article likewise
+        
+        page_candidates = [candidate_fn(soup) for soup in soups]
+        winners = Counter()
+        targets = []
+        for soup, candidates in zip(soups, page_candidates):
             if candidates:
-                best_candidate = max(candidates, key=lambda x: x[1])
-                content_selectors[best_candidate[0]] += 1
+                best = max(candidates, key=lambda x: x[1])[0]
+                winners[best] += 1
+                targets.append(select_one(soup, best))
+            else:
+                targets.append(None)
         
-        # Return the most common selector
-        if content_selectors:
-            return content_selectors.most_common(1)[0][0]
+        selectors = list(dict.fromkeys(
+            [selector for candidates in page_candidates for selector, _ in candidates] + [fallback]
+        ))
+        matrix = self.hit_matrix(selectors, soups, targets)
         
-        return 'article'  # Ultimate fallback
+        pages = max(len(soups), 1)
+        results = [
+            {
+                'selector': selector,
+                'coverage': sum(1 for hit in row if hit) / pages,
+                'agreement': sum(1 for hit in row if hit == 2) / pages,
+                'pages': len(soups)
+            }
+            for selector, row in zip(selectors, matrix)
+        ]
+        results.sort(key=lambda r: (r['agreement'] + r['coverage'], winners[r['selector']]), reverse=True)
+        return results
+    
+    def score_fields(self, article_soups: List[BeautifulSoup]) -> Dict[str, List[Dict[str, Any]]]:
+        """Cross-page scores of title and content candidates."""
+        return {name: self.score_field(name, article_soups) for name in ('title', 'content')}
+    
+    def measure_coverage(self, selectors: Dict[str, str], soups: List[BeautifulSoup]) -> Dict[str, float]:
+        """Share of pages where each title/content selector matches an element with text."""
+        names = [name for name in ('title', 'content') if selectors.get(name)]
+        matrix = self.hit_matrix([selectors[name] for name in names], soups, [None] * len(soups))
+        pages = max(len(soups), 1)
+        return {name: sum(1 for hit in row if hit) / pages for name, row in zip(names, matrix)}
+    
+    def measured_confidence(self, field_scores: Dict[str, List[Dict[str, Any]]]) -> str:
+        """Confidence from how consistently the best selectors hit across the sample."""
+        agreement = min(
+            (scores[0]['agreement'] if scores else 0.0) for scores in field_scores.values()
+        )
+        if agreement >= 0.9:
+            return 'high'
+        if agreement >= 0.6:
+            return 'medium'
+        return 'low'
+    
+    def rank_title_selectors(self, soups: List[BeautifulSoup]) -> List[str]:
+        """Rank candidate title selectors across multiple article pages, best first."""
+        return [r['selector'] for r in self.score_field('title', soups)][:MAX_CHAIN_LENGTH]
     
-    def detect_selectors(self, homepage_soup: BeautifulSoup, article_soups: List[BeautifulSoup]) -> Dict[str, str]:
-        """Combine all selector detection."""
+    def detect_title_selector(self, soups: List[BeautifulSoup]) -> str:
+        """Find CSS selector for titles by analyzing multiple article pages."""
+        return self.rank_title_selectors(soups)[0]
+    
+    def rank_content_selectors(self, soups: List[BeautifulSoup]) -> List[str]:
+        """Rank candidate content selectors across multiple article pages, best first."""
+        return [r['selector'] for r in self.score_field('content', soups)][:MAX_CHAIN_LENGTH]
+    
+    def detect_content_selector(self, soups: List[BeautifulSoup]) -> str:
+        """Find CSS selector for content by analyzing multiple article pages."""
+        return self.rank_content_selectors(soups)[0]
+    
+    def detect_selectors(self, homepage_soup: BeautifulSoup, article_soups: List[BeautifulSoup],
+                         field_scores: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Dict[str, str]:
+        """Combine all selector detection (reusing cross-page scores when given)."""
         print(f"Detecting selectors from {len(article_soups)} article pages...")
+        field_scores = field_scores or self.score_fields(article_soups)
         
         # Find article link pattern
         link_pattern = self.find_article_link_pattern(homepage_soup)
@@ -227,15 +285,45 @@ class SelectorDetector:
         print(f"Article link pattern found: {article_links_selector} (appears {link_pattern['count']} times)")
         
         # Detect title selector
-        title_selector = self.detect_title_selector(article_soups)
-        print(f"Title selector detected: {title_selector}")
+        title = field_scores['title'][0]
+        print(f"Title selector detected: {title['selector']} "
+              f"(matches {title['agreement']:.0%} of {title['pages']} pages)")
         
         # Detect content selector
-        content_selector = self.detect_content_selector(article_soups)
-        print(f"Content selector detected: {content_selector}")
+        content = field_scores['content'][0]
+        print(f"Content selector detected: {content['selector']} "
+              f"(matches {content['agreement']:.0%} of {content['pages']} pages)")
         
         return {
             'article_links': article_links_selector,
-            'title': title_selector,
-            'content': content_selector
-        }
\ No newline at end of file
+            'title': title['selector'],
+            'content': content['selector']
+        }
+    
+    def detect_selector_chains(self, article_soups: List[BeautifulSoup],
+                               field_scores: Optional[Dict[str, List[Dict[str, Any]]]] = None
+                               ) -> Dict[str, List[str]]:
+        """Ranked fallback chains of title and content selectors, best first."""
+        field_scores = field_scores or self.score_fields(article_soups)
+        return {
+            name: [r['selector'] for r in scores][:MAX_CHAIN_LENGTH]
+            for name, scores in field_scores.items()
+        }
+    
+    def selectors_work(self, selectors: Dict[str, str], homepage_soup: BeautifulSoup,
+                       article_soups: List[BeautifulSoup]) -> bool:
+        """Check article_links matches on the homepage and title/content on every sample article."""
+        try:
+            if not all(selectors.get(name) for name in ('article_links', 'title', 'content')):
+                return False
+            if homepage_soup is None or select_one(homepage_soup, selectors['article_links']) is None:
+                return False
+            for soup in article_soups:
+                title = select_one(soup, selectors['title'])
+                content = select_one(soup, selectors['content'])
+                if title is None or content is None or not title.get_text(strip=True) \
+                        or not content.get_text(strip=True):
+                    return False
+            return True
+        except InvalidSelectorError:
+            return False
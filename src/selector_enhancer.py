@@ -1,17 +1,34 @@
-from typing import Dict, Any
+from typing import List, Dict, Any, Optional
+from urllib.parse import urljoin, urlparse
+from bs4 import BeautifulSoup
 from src.analyzer import HTMLAnalyzer
+from src.canonical import infer_rules
+from src.database import Database
+from src.fingerprint import TemplateIndex, page_fingerprint
+from src.main import _create_site_id
+from src.selector_cache import InvalidSelectorError, select
 from src.selector_detector import SelectorDetector
-from src.llm_client import LLMClient
+from src.url_pattern import URLPattern, learn_url_patterns
+
+
+# Article pages scored by cross-page selector detection
+DETECTION_SAMPLE_SIZE = 30
+# Pages used for fingerprinting, template validation and LLM prompts
+FOCUS_SAMPLE_SIZE = 3
+# Share of the analyzed article URLs a learned URL pattern must match to be used
+MIN_PATTERN_COVERAGE = 0.8
 
 
 class SelectorEnhancer:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, database: Optional[Database] = None):
         """Initialize with base URL and all required components."""
         self.base_url = base_url
         self.analyzer = HTMLAnalyzer(base_url)
         self.detector = SelectorDetector()
+        self.template_index = TemplateIndex(database)
         
         try:
+            from src.llm_client import LLMClient
             self.llm_client = LLMClient()
             self.has_llm = True
         except ValueError as e:
@@ -36,16 +53,13 @@ class SelectorEnhancer:
                 'confidence': 'none'
             }
         
-        # Get soups for processing
+        # Get soups for processing (pages already analyzed come from the page cache)
         homepage_soup = self.analyzer.fetch_page(self.base_url)
-        article_soups = []
-        sample_urls = site_analysis['homepage']['sample_article_urls'][:3]
+        sample_urls = self._sample_urls(site_analysis['homepage'])
         
         print(f"📄 Fetching {len(sample_urls)} sample articles for analysis...")
-        for url in sample_urls:
-            soup = self.analyzer.fetch_page(url)
-            if soup:
-                article_soups.append(soup)
+        article_soups = list(self.analyzer.fetch_pages(sample_urls).values())
+        focus_soups = article_soups[:FOCUS_SAMPLE_SIZE]
         
         if not article_soups:
             return {
@@ -55,23 +69,39 @@ class SelectorEnhancer:
                 'confidence': 'none'
             }
         
+        # Same-template sites (shared CMS themes) reuse known selectors without detection or LLM
+        fingerprint = page_fingerprint(homepage_soup, focus_soups)
+        template = self.template_index.find(fingerprint)
+        if template and self.detector.selectors_work(template['selectors'], homepage_soup, focus_soups):
+            print(f"🧬 Matched template from {template['source_site']} "
+                  f"(similarity {template['similarity']:.2f}), reusing its selectors")
+            return self._build_result(
+                site_analysis, template['selectors'], 'template_match', 'high',
+                f"Reused selectors of template {template['template_id']} from {template['source_site']}",
+                article_soups, homepage_soup=homepage_soup
+            )
+        if template:
+            print(f"   ⚠️  Template from {template['source_site']} matched but its selectors failed here")
+        
         # Step 2: Automatic selector detection
         print("🤖 Running automatic selector detection...")
-        auto_selectors = self.detector.detect_selectors(homepage_soup, article_soups)
+        field_scores = self.detector.score_fields(article_soups)
+        auto_selectors = self.detector.detect_selectors(homepage_soup, article_soups, field_scores)
         print(f"   Detected: {auto_selectors}")
+        chains = self.detector.detect_selector_chains(article_soups, field_scores)
         
         # Step 3: LLM enhancement (if available)
         final_selectors = auto_selectors.copy()
         method = 'automatic'
-        confidence = 'medium'
-        notes = "Automatic detection completed"
+        confidence = self.detector.measured_confidence(field_scores)
+        notes = f"Automatic detection over {len(article_soups)} pages"
         
         if self.has_llm:
             print("🧠 Enhancing selectors with LLM analysis...")
             
             # Prepare HTML samples for LLM
             homepage_html = str(homepage_soup)
-            article_htmls = [str(soup) for soup in article_soups]
+            article_htmls = [str(soup) for soup in focus_soups]
             
             # Get LLM analysis
             llm_result = self.llm_client.analyze_html_structure(
@@ -127,9 +157,68 @@ class SelectorEnhancer:
                 print(f"   ⚠️  LLM analysis failed: {llm_result.get('error')}")
                 print("   Falling back to automatic selectors")
         
-        # Final result
+        # Register the template so later sites built on it skip detection
+        if self.detector.selectors_work(final_selectors, homepage_soup, focus_soups):
+            self.template_index.add(fingerprint, final_selectors, _create_site_id(self.base_url))
+        
+        # Ranked detector candidates back up the final selectors, e.g. when the LLM's choice misses
+        fallbacks = {
+            name: [selector for selector in chain if selector != final_selectors.get(name)]
+            for name, chain in chains.items()
+        }
+        
+        return self._build_result(site_analysis, final_selectors, method, confidence, notes,
+                                  article_soups, fallbacks, homepage_soup)
+    
+    def _sample_urls(self, homepage_analysis: Dict[str, Any]) -> List[str]:
+        """Analyzed sample articles plus an even spread over all discovered article URLs."""
+        article_urls = homepage_analysis['article_links']
+        step = max(1, len(article_urls) // DETECTION_SAMPLE_SIZE)
+        sample = dict.fromkeys(homepage_analysis['sample_article_urls'] + article_urls[::step])
+        return list(sample)[:DETECTION_SAMPLE_SIZE]
+    
+    def _learn_url_patterns(self, homepage_soup: Optional[BeautifulSoup], article_links_selector: str,
+                            article_urls: List[str]) -> List[str]:
+        """Article URL templates learned from homepage article containers and analyzed article URLs.
+        
+        Templates matching none of the article URLs found during analysis are
+        dropped (e.g. category cards sharing the article container). Returns
+        no templates, so generic URL heuristics stay in use, when the learned
+        ones miss too many of those URLs.
+        """
+        urls = list(article_urls)
+        if homepage_soup is not None:
+            try:
+                links = select(homepage_soup, article_links_selector)
+            except InvalidSelectorError:
+                links = []
+            for link in links:
+                url = urljoin(self.base_url, link.get('href') or '')
+                if link.get('href') and urlparse(url).netloc == self.analyzer.domain:
+                    urls.append(url)
+        
+        templates = learn_url_patterns(urls)
+        if article_urls:
+            templates = [t for t in templates if URLPattern([t]).coverage(article_urls) > 0]
+        if not templates or (article_urls and URLPattern(templates).coverage(article_urls) < MIN_PATTERN_COVERAGE):
+            return []
+        return templates
+    
+    def _build_result(self, site_analysis: Dict[str, Any], final_selectors: Dict[str, str],
+                      method: str, confidence: str, notes: str, article_soups: List[BeautifulSoup],
+                      fallbacks: Optional[Dict[str, List[str]]] = None,
+                      homepage_soup: Optional[BeautifulSoup] = None) -> Dict[str, Any]:
+        """Assemble and report the final selector result with its measured page coverage."""
+        coverage = self.detector.measure_coverage(final_selectors, article_soups)
+        url_patterns = self._learn_url_patterns(
+            homepage_soup, final_selectors.get('article_links', 'a'), site_analysis['homepage']['article_links']
+        )
         result = {
             'selectors': final_selectors,
+            'fallbacks': fallbacks or {},
+            'url_patterns': url_patterns,
+            'canonical_rules': infer_rules(site_analysis['homepage']['article_links']),
+            'coverage': coverage,
             'method': method,
             'confidence': confidence,
             'notes': notes,
@@ -142,6 +231,12 @@ class SelectorEnhancer:
         print(f"   Confidence: {confidence}")
         print(f"   Articles found: {result['total_articles']}")
         print(f"   Selectors: {final_selectors}")
+        print(f"   Coverage over {len(article_soups)} pages: "
+              + ', '.join(f"{name} {rate:.0%}" for name, rate in coverage.items()))
+        if fallbacks:
+            print(f"   Fallbacks: {fallbacks}")
+        if url_patterns:
+            print(f"   Article URL patterns: {url_patterns}")
         if notes:
             print(f"   Notes: {notes}")
         
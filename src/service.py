@@ -0,0 +1,179 @@
+from typing import Dict, Any, Callable, Optional, Tuple
+from concurrent.futures import Future
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import json
+import sys
+import threading
+import time
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait for and share its result (or exception) instead of repeating
+    the work.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+
+    def do(self, key: str, function: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, bool]:
+        """Run function(*args, **kwargs) once per key at a time.
+
+        Returns:
+            (result, shared) where shared is True for callers that joined
+            a call already in flight
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = function(*args, **kwargs)
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        """Number of keys currently being computed."""
+        with self._lock:
+            return len(self._calls)
+
+
+class ScraperService:
+    """Long-running scraping service behind a local HTTP/JSON API.
+
+    One process serves every request, so scrapers (src.main's scraper
+    cache), pooled HTTP connections, compiled selectors and the database
+    connection stay warm between calls. Concurrent requests for the same
+    site and mode are coalesced into a single generation and crawl.
+    """
+
+    def __init__(self):
+        """Warm up the shared HTTP client and database."""
+        from src.database import get_database
+        from src.fetch import get_client
+        get_client()
+        get_database()
+        self.flights = SingleFlight()
+        self.started = time.time()
+
+    def articles(self, homepage_url: str, incremental: bool = False) -> Dict[str, Any]:
+        """Scrape a site (coalescing with identical requests in flight)."""
+        from src.main import get_articles, _create_site_id
+
+        site_id = _create_site_id(homepage_url)
+        key = f"{site_id}:{'incremental' if incremental else 'full'}"
+        articles, coalesced = self.flights.do(key, get_articles, homepage_url, incremental)
+        return {
+            'site_id': site_id,
+            'count': len(articles),
+            'coalesced': coalesced,
+            'articles': [asdict(article) for article in articles]
+        }
+
+    def health(self) -> Dict[str, Any]:
+        """Service status and warm caches."""
+        from src.main import _scraper_cache
+        from src.selector_cache import selector_cache
+
+        return {
+            'status': 'ok',
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'cached_scrapers': sorted(_scraper_cache),
+            'in_flight': self.flights.in_flight(),
+            'selector_cache': selector_cache.stats()
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """JSON endpoints: GET /health, GET /articles?url=...&incremental=1, POST /articles."""
+
+    service: ScraperService
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _articles(self, homepage_url: Optional[str], incremental: bool):
+        if not homepage_url or not homepage_url.startswith('http'):
+            self._send_json(400, {'error': "An absolute 'url' of the site homepage is required"})
+            return
+        try:
+            self._send_json(200, self.service.articles(homepage_url, incremental))
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == '/health':
+            self._send_json(200, self.service.health())
+        elif parsed.path == '/articles':
+            query = parse_qs(parsed.query)
+            self._articles(query.get('url', [None])[0],
+                           query.get('incremental', ['0'])[0].lower() in ('1', 'true'))
+        else:
+            self._send_json(404, {'error': f"Unknown endpoint {parsed.path}"})
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/articles':
+            self._send_json(404, {'error': f"Unknown endpoint {self.path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except (ValueError, json.JSONDecodeError):
+            request = None
+        if not isinstance(request, dict):
+            self._send_json(400, {'error': 'Request body must be a JSON object'})
+            return
+        if not isinstance(request.get('url'), str):
+            self._send_json(400, {'error': "An absolute 'url' of the site homepage is required"})
+            return
+        self._articles(request['url'], bool(request.get('incremental', False)))
+
+    def log_message(self, format: str, *args: Any):
+        print(f"🌐 {self.address_string()} {format % args}")
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+    """Run the scraping service until interrupted."""
+    service = ScraperService()
+    handler = type('Handler', (_Handler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"🚀 Scraping service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    """Command line interface: python -m src.service [port] [host]"""
+    serve(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_HOST,
+          int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT)
@@ -0,0 +1,139 @@
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from collections import Counter, defaultdict
+from urllib.parse import urlparse
+import re
+
+
+# Template segment placeholders
+NUM = '{num}'    # Digits only (ids, years, months)
+SLUG = '{slug}'  # Any single path segment
+
+# Learned templates must be backed by at least this many distinct URLs
+MIN_SUPPORT = 3
+# Recurring values kept literal at one path position (e.g. 'reviews', 'index.html')
+MAX_LITERALS = 3
+
+_END = ''  # Trie key marking the end of a template
+
+# Paths of pages that are not articles (checked by the generic URL heuristics)
+EXCLUDE_PATTERNS = re.compile('|'.join([
+    r'/about',
+    r'/contact',
+    r'/privacy',
+    r'/terms',
+    r'/category',
+    r'/categories',
+    r'/tag',
+    r'/tags',
+    r'/author',
+    r'/authors',
+    r'/page/\d+',  # pagination
+    r'/(blog|articles|posts|reviews|stories)/?$',  # index pages
+]))
+
+
+def is_excluded(url: str) -> bool:
+    """Whether a URL looks like a non-article page (about, tag, pagination, ...)."""
+    return EXCLUDE_PATTERNS.search(url.lower()) is not None
+
+
+def has_literal(template: str) -> bool:
+    """Whether a template has a literal segment ('/reviews/{slug}', not '/{slug}')."""
+    return any(segment not in (NUM, SLUG) for segment in template.strip('/').split('/'))
+
+
+def path_segments(url: str) -> Tuple[str, ...]:
+    """Non-empty path segments of a URL, ignoring the trailing slash, query and fragment."""
+    return tuple(segment for segment in urlparse(url).path.lower().split('/') if segment)
+
+
+def _partition(paths: List[Tuple[str, ...]], i: int, prefix: Tuple[str, ...], templates: Counter):
+    """Split same-depth paths position by position into literal and placeholder branches."""
+    if i == len(paths[0]):
+        templates['/' + '/'.join(prefix)] += len(paths)
+        return
+
+    counts = Counter(path[i] for path in paths)
+    repeated = [value for value, count in counts.items() if count > 1 and not value.isdigit()]
+    if len(repeated) > MAX_LITERALS:
+        repeated = []  # Many recurring values (e.g. category names) are a variable segment too
+
+    branches: Dict[str, List[Tuple[str, ...]]] = defaultdict(list)
+    for path in paths:
+        value = path[i]
+        if value in repeated:
+            branches[value].append(path)
+        else:
+            branches[NUM if value.isdigit() else SLUG].append(path)
+    for key, branch in branches.items():
+        _partition(branch, i + 1, prefix + (key,), templates)
+
+
+def learn_url_patterns(urls: Iterable[str], min_support: int = MIN_SUPPORT) -> List[str]:
+    """Infer compact path templates (e.g. '/reviews/{slug}') from known article URLs.
+
+    URLs are grouped by path depth and split position by position: values
+    that recur across URLs (section names, 'index.html') stay literal,
+    numeric values become {num} (so next year's date paths still match) and
+    all others {slug}. Templates backed by fewer than min_support distinct
+    URLs are dropped.
+    """
+    groups: Dict[int, List[Tuple[str, ...]]] = defaultdict(list)
+    for segments in {path_segments(url) for url in urls}:
+        if segments:
+            groups[len(segments)].append(segments)
+
+    templates: Counter = Counter()
+    for paths in groups.values():
+        _partition(paths, 0, (), templates)
+
+    return sorted(template for template, support in templates.items() if support >= min_support)
+
+
+class URLPattern:
+    """Compiled set of article URL path templates.
+
+    Templates are merged into a trie of path segments, so classifying a URL
+    walks its path once instead of running a list of regexes over it.
+    Templates made of placeholders only ('/{slug}') also fit about, tag and
+    other section pages, so URLs only they match must pass is_excluded too.
+    """
+
+    def __init__(self, templates: List[str]):
+        """Compile templates such as '/blog/{slug}' or '/{num}/{num}/{slug}'."""
+        self.templates = list(templates)
+        self._trie: Dict[str, Any] = {}
+        for template in self.templates:
+            node = self._trie
+            for segment in template.strip('/').split('/'):
+                node = node.setdefault(segment, {})
+            node[_END] = has_literal(template)
+
+    def __bool__(self) -> bool:
+        return bool(self.templates)
+
+    def matches(self, url: str) -> bool:
+        """Whether a URL's path fits one of the templates."""
+        match = self._match(self._trie, path_segments(url), 0)
+        return match is True or (match is False and not is_excluded(url))
+
+    def _match(self, node: Dict[str, Any], segments: Tuple[str, ...], i: int) -> Optional[bool]:
+        """None if no template fits, else whether one with a literal segment does."""
+        if i == len(segments):
+            return node.get(_END)
+        segment = segments[i]
+        found = None
+        for key in (segment, NUM if segment.isdigit() else None, SLUG):
+            if key is not None and key in node:
+                match = self._match(node[key], segments, i + 1)
+                if match:
+                    return True
+                if match is not None:
+                    found = False
+        return found
+
+    def coverage(self, urls: List[str]) -> float:
+        """Share of URLs the pattern matches."""
+        if not urls:
+            return 0.0
+        return sum(1 for url in urls if self.matches(url)) / len(urls)
@@ -0,0 +1,122 @@
+from typing import Dict, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import io
+import os
+import time
+from src.engine import ScraperSpec, extract_article
+from src.parsing import parse_html, sniff_encoding
+from src.selector_cache import select_one, InvalidSelectorError
+
+
+# Below this many pages, worker start-up costs more than it saves
+MIN_PARALLEL_PAGES = 8
+# Share of pages whose primary selectors must match for a spec to pass
+MIN_PRIMARY_RATE = 0.8
+# Discovered article pages a spec is validated on at most
+MAX_VALIDATION_PAGES = 100
+
+FIELDS = ('title', 'content')
+
+
+def _validate_page(spec_json: str, url: str, html: bytes) -> Dict[str, Any]:
+    """Check one cached page against a spec (runs in a worker process)."""
+    spec = ScraperSpec.from_json(spec_json)
+    result: Dict[str, Any] = {'url': url}
+
+    encoding = sniff_encoding(html) if isinstance(html, bytes) else None
+    soup = parse_html(html, from_encoding=encoding)
+    for name in FIELDS:
+        try:
+            element = select_one(soup, spec.selectors.get(name, ''))
+        except InvalidSelectorError:
+            element = None
+        result[f'{name}_hit'] = element is not None
+        result[f'{name}_empty'] = element is not None and not element.get_text(strip=True)
+
+    # Time the same extraction path production runs use, without its per-page warnings
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            article = extract_article(spec, html, url, encoding=encoding)
+        except Exception:
+            article = None
+    result['seconds'] = time.perf_counter() - start
+    result['extracted'] = article is not None
+    return result
+
+
+def validate_spec(spec: ScraperSpec, pages: Dict[str, bytes],
+                  max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """Run a spec's selectors against every cached page before the spec is saved.
+
+    Args:
+        spec: Candidate scraper spec
+        pages: URL -> HTML of article pages fetched during analysis
+        max_workers: Worker processes (defaults to the CPU count)
+
+    Returns:
+        Report with per-field hit and empty-text rates, the primary rate (pages
+        both primary selectors match with text), the extraction rate (also
+        counting fallback-chain and content-extractor rescues), extraction
+        time per page and up to 10 URLs that failed to extract
+    """
+    if not pages:
+        return {'pages': 0, 'fields': {}, 'primary_rate': 0.0, 'extraction_rate': 0.0,
+                'ms_per_page': 0.0, 'failed_urls': []}
+
+    spec_json = spec.to_json()
+    urls = list(pages)
+    htmls = [pages[url] for url in urls]
+
+    if len(urls) < MIN_PARALLEL_PAGES:
+        results = [_validate_page(spec_json, url, html) for url, html in zip(urls, htmls)]
+    else:
+        workers = max_workers or min(os.cpu_count() or 1, len(urls))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                _validate_page, [spec_json] * len(urls), urls, htmls,
+                chunksize=max(1, len(urls) // (workers * 4))
+            ))
+
+    count = len(results)
+    fields = {}
+    for name in FIELDS:
+        hits = sum(1 for r in results if r[f'{name}_hit'])
+        fields[name] = {
+            'selector': spec.selectors.get(name),
+            'hit_rate': hits / count,
+            'empty_rate': sum(1 for r in results if r[f'{name}_empty']) / max(hits, 1)
+        }
+
+    primary = sum(1 for r in results
+                  if all(r[f'{name}_hit'] and not r[f'{name}_empty'] for name in FIELDS))
+    return {
+        'pages': count,
+        'fields': fields,
+        'primary_rate': primary / count,
+        'extraction_rate': sum(1 for r in results if r['extracted']) / count,
+        'ms_per_page': 1000 * sum(r['seconds'] for r in results) / count,
+        'failed_urls': [r['url'] for r in results if not r['extracted']][:10]
+    }
+
+
+def validation_passed(report: Dict[str, Any], min_primary_rate: float = MIN_PRIMARY_RATE) -> bool:
+    """Whether the spec's own selectors matched enough pages (no pages means not tested).
+
+    Pages only rescued by fallback chains or the content extractor don't
+    count: they mean the primary selectors are wrong.
+    """
+    return report['pages'] == 0 or report['primary_rate'] >= min_primary_rate
+
+
+def print_report(report: Dict[str, Any]):
+    """Print a validation report."""
+    print(f"🧪 Validated spec on {report['pages']} article pages: "
+          f"{report['primary_rate']:.0%} matched by primary selectors, "
+          f"{report['extraction_rate']:.0%} extracted, {report['ms_per_page']:.1f} ms/page")
+    for name, stats in report['fields'].items():
+        print(f"   {name} '{stats['selector']}': {stats['hit_rate']:.0%} hit, "
+              f"{stats['empty_rate']:.0%} empty")
+    if report['failed_urls']:
+        print(f"   Failed: {', '.join(report['failed_urls'][:3])}")
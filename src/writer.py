@@ -0,0 +1,116 @@
+from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import Future
+import atexit
+import queue
+import threading
+import time
+from src.database import Database, get_database
+
+
+MAX_PENDING = 1000      # Articles waiting to be written before producers block
+BATCH_SIZE = 200        # Articles per transaction
+FLUSH_INTERVAL = 0.25   # Seconds a batch waits for more articles before committing
+
+_STOP = object()
+
+
+class ArticleWriter:
+    """Single background thread that owns all article writes.
+
+    Fetch workers submit articles instead of saving them themselves, so
+    SQLite's write lock is taken by one thread only and articles are
+    committed in batches of up to `batch_size`, or after `flush_interval`
+    seconds, whichever comes first. The queue is bounded: when the writer
+    falls behind, submit() blocks, slowing producers down to the rate the
+    database sustains.
+    """
+
+    def __init__(self, database: Optional[Database] = None, max_pending: int = MAX_PENDING,
+                 batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        """Initialize writer and start its thread."""
+        self.database = database or get_database()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name='article-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, url: str, title: str, content: str, site: str,
+               session_id: Optional[int] = None, page_url: Optional[str] = None,
+               replace: bool = False) -> Future:
+        """Queue an article, blocking while the queue is full.
+
+        Returns a future of the article ID, or None if the URL was already
+        stored (like Database.save_article). With session_id the fetched
+        page_url is marked done in that session in the same transaction.
+        With replace an already stored article is overwritten (changed pages).
+        """
+        future: Future = Future()
+        item = {'url': url, 'title': title, 'content': content, 'site': site,
+                'session_id': session_id, 'page_url': page_url, 'replace': replace}
+        self._queue.put((item, future))
+        return future
+
+    def _next_batch(self) -> Tuple[List[Tuple[Dict[str, Any], Future]], bool]:
+        """Wait for an article, then collect more until the batch is full or due."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _write(self, batch: List[Tuple[Dict[str, Any], Future]]):
+        try:
+            results = self.database.save_article_batch([item for item, _ in batch])
+        except Exception as e:
+            print(f"❌ Article batch write failed ({len(batch)} articles): {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def close(self):
+        """Write everything queued so far and stop the thread."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+
+_writers: Dict[str, ArticleWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(database: Optional[Database] = None) -> ArticleWriter:
+    """Return the process-wide writer of a database (the shared one by default)."""
+    database = database or get_database()
+    key = str(database.db_path)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = ArticleWriter(database)
+        return writer
+
+
+@atexit.register
+def _close_writers():
+    for writer in list(_writers.values()):
+        writer.close()
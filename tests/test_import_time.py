@@ -0,0 +1,57 @@
+import json
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Seconds importing the modules of a cached-scraper run may take (about 0.035 s measured)
+IMPORT_BUDGET = 0.06
+RUNS = 3
+
+# Only needed to generate scrapers, or (bs4, soupsieve) loaded on the first parse;
+# must not load while importing the scraping path
+DEFERRED_MODULES = ['openai', 'dotenv', 'src.pipeline', 'src.llm_client', 'src.selector_enhancer',
+                    'bs4', 'soupsieve']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {modules}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def _import_in_fresh_interpreter(modules: str):
+    """Import modules in a new interpreter, return (seconds, deferred modules that got loaded)."""
+    code = PROBE.format(modules=modules, deferred=DEFERRED_MODULES)
+    output = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, capture_output=True,
+                            text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result['elapsed'], result['loaded']
+
+
+class TestImportTime(unittest.TestCase):
+    """Heavy dependencies stay lazy so cached-scraper runs start fast."""
+
+    def test_main_does_not_load_generation_dependencies(self):
+        _, loaded = _import_in_fresh_interpreter('src.main')
+        self.assertEqual(loaded, [])
+
+    def test_scraping_path_does_not_load_generation_dependencies(self):
+        _, loaded = _import_in_fresh_interpreter('src.main, src.engine, src.database, src.checkpoint')
+        self.assertEqual(loaded, [])
+
+    def test_scraping_path_import_budget(self):
+        # Best of several runs, so a busy machine does not fail the budget
+        elapsed = min(_import_in_fresh_interpreter('src.main, src.engine, src.database, src.checkpoint')[0]
+                      for _ in range(RUNS))
+        self.assertLess(elapsed, IMPORT_BUDGET,
+                        f"Importing the scraping path took {elapsed:.3f}s (budget {IMPORT_BUDGET}s)")
+
+
+if __name__ == '__main__':
+    unittest.main()